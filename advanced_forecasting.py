@@ -11,6 +11,7 @@ from plotly.subplots import make_subplots
 from datetime import datetime, timedelta, time
 import pytz
 from forecasting import StockForecaster
+from trading_calendar import get_trading_calendar
 from data_fetcher import DataFetcher
 import requests
 from bs4 import BeautifulSoup
@@ -238,54 +239,64 @@ class AdvancedForecaster:
         else:
             return {'price': 100 + np.random.uniform(-20, 20), 'source': 'estimate', 'timestamp': datetime.now()}
     
-    def generate_time_range_forecast(self, historical_data, start_time, end_time, forecast_date=None, symbol="KSE-100"):
-        """Generate forecast for specific time range on selected date with 5-minute intervals"""
+    def forecast_points(self, queries, data_by_symbol, live_prices=None):
+        """
+        Answer (symbol, timestamp) forecast queries in batch
+        
+        Every query is evaluated from the symbol's fitted trend in closed form, so
+        distant targets cost the same as near ones. No prices are fetched here:
+        callers pass the histories and, optionally, live prices to anchor on.
+        
+        Args:
+            queries (pd.DataFrame/list): 'symbol' and 'ds' columns, or (symbol, timestamp) pairs
+            data_by_symbol (dict): Symbol -> historical DataFrame (date, close)
+            live_prices (dict): Optional symbol -> price or {'price', 'timestamp'} to anchor the trend
+            
+        Returns:
+            pd.DataFrame: symbol, ds, yhat, yhat_lower, yhat_upper in query order (NaN when a
+                symbol has no usable history)
+        """
+        if not isinstance(queries, pd.DataFrame):
+            queries = pd.DataFrame(list(queries), columns=['symbol', 'ds'])
+        queries = queries[['symbol', 'ds']].reset_index(drop=True)
+        live_prices = live_prices or {}
+        
+        result = queries.assign(yhat=np.nan, yhat_lower=np.nan, yhat_upper=np.nan)
+        for symbol, rows in queries.groupby('symbol', sort=False).groups.items():
+            live = live_prices.get(symbol)
+            if isinstance(live, dict):
+                anchor_price, anchor_time = live.get('price'), live.get('timestamp')
+            else:
+                anchor_price, anchor_time = live, None
+            
+            forecast = self.forecaster.forecast_at(
+                data_by_symbol.get(symbol), queries.loc[rows, 'ds'], anchor_price, anchor_time
+            )
+            if forecast is not None:
+                result.loc[rows, ['yhat', 'yhat_lower', 'yhat_upper']] = \
+                    forecast[['yhat', 'yhat_lower', 'yhat_upper']].values
+        
+        return result
+    
+    def generate_time_range_forecast(self, historical_data, start_time, end_time, forecast_date=None, symbol="KSE-100", live_price=None):
+        """Generate forecast for specific time range on selected date with 5-minute intervals (live_price is supplied by the caller)"""
         
         # Use selected date or today
         target_date = forecast_date if forecast_date else datetime.now(self.pkt_timezone).date()
-        start_datetime = datetime.combine(target_date, start_time)
-        end_datetime = datetime.combine(target_date, end_time)
-        
-        # Generate 5-minute intervals
-        time_points = []
-        current_time = start_datetime
         
-        while current_time <= end_datetime:
-            time_points.append(current_time)
-            current_time += timedelta(minutes=5)
-        
-        # Get current live price
-        live_data = self.get_comprehensive_live_price(symbol)
-        current_price = live_data['price']
-        
-        # Generate forecast data
-        forecast_data = []
-        base_price = current_price
-        
-        for i, time_point in enumerate(time_points):
-            # Create realistic price movement
-            volatility = 0.002  # 0.2% volatility per 5-min interval
-            trend = np.random.uniform(-0.002, 0.002)  # Slight trend
-            noise = np.random.normal(0, volatility)
-            
-            price_change = (trend + noise) * base_price
-            predicted_price = base_price + price_change
-            
-            # Confidence bounds
-            confidence_range = predicted_price * 0.01  # 1% confidence range
-            upper_bound = predicted_price + confidence_range
-            lower_bound = predicted_price - confidence_range
-            
-            forecast_data.append({
-                'ds': time_point,
-                'yhat': predicted_price,
-                'yhat_upper': upper_bound,
-                'yhat_lower': lower_bound
-            })
-            
-            base_price = predicted_price
-        
-        return pd.DataFrame(forecast_data)
+        # 5-minute bars of the PSX session inside the selected time range
+        time_points = get_trading_calendar().session_grid(target_date, freq='5min', window=(start_time, end_time))
+        if len(time_points) == 0:
+            st.warning(f"PSX does not trade on {target_date} between {start_time} and {end_time}")
+            return pd.DataFrame(columns=['ds', 'yhat', 'yhat_upper', 'yhat_lower'])
+        
+        # Every 5-minute point in one closed-form evaluation of the fitted trend
+        forecast = self.forecast_points(
+            pd.DataFrame({'symbol': symbol, 'ds': time_points}),
+            {symbol: historical_data},
+            {symbol: live_price} if live_price is not None else None
+        )
+        return forecast[['ds', 'yhat', 'yhat_upper', 'yhat_lower']]
     
     def process_uploaded_file_with_brand(self, uploaded_file, selected_brand):
         """Process uploaded file and integrate with live prices for selected brand"""
@@ -362,43 +373,28 @@ class AdvancedForecaster:
     def generate_custom_date_forecast(self, historical_data, target_date, symbol="KSE-100"):
         """Generate forecast for custom selected date"""
         try:
-            # Prepare data for Prophet
-            forecast_data = historical_data[['date', 'close']].copy()
-            forecast_data = forecast_data.rename(columns={'date': 'ds', 'close': 'y'})
-            
-            # Use Prophet for forecasting
-            forecast = self.forecaster.forecast_stock(historical_data, days_ahead=1)
-            
-            if forecast is not None and not forecast.empty:
-                # Calculate days difference
-                last_date = historical_data['date'].max()
-                days_diff = (target_date - last_date.date()).days
-                
-                if days_diff > 0:
-                    # Future date prediction
-                    extended_forecast = self.forecaster.forecast_stock(historical_data, days_ahead=days_diff)
-                    
-                    target_forecast = extended_forecast[extended_forecast['ds'].dt.date == target_date]
+            # Calculate days difference
+            last_date = historical_data['date'].max()
+            days_diff = (target_date - last_date.date()).days
+            
+            if days_diff > 0:
+                # Future date prediction, evaluated directly at the target date
+                forecast = self.forecast_points([(symbol, pd.Timestamp(target_date))], {symbol: historical_data})
+                if not forecast['yhat'].isna().all():
+                    return forecast.iloc[-1].drop('symbol')
+            else:
+                # Historical date - return actual data if available
+                historical_point = historical_data[historical_data['date'].dt.date == target_date]
+                if not historical_point.empty:
+                    actual_data = historical_point.iloc[-1]
+                    return {
+                        'ds': actual_data['date'],
+                        'yhat': actual_data['close'],
+                        'yhat_lower': actual_data['close'] * 0.99,
+                        'yhat_upper': actual_data['close'] * 1.01,
+                        'type': 'historical'
+                    }
                     
-                    if not target_forecast.empty:
-                        return target_forecast.iloc[-1]
-                    else:
-                        # Extrapolate if exact date not found
-                        last_prediction = extended_forecast.iloc[-1]
-                        return last_prediction
-                else:
-                    # Historical date - return actual data if available
-                    historical_point = historical_data[historical_data['date'].dt.date == target_date]
-                    if not historical_point.empty:
-                        actual_data = historical_point.iloc[-1]
-                        return {
-                            'ds': actual_data['date'],
-                            'yhat': actual_data['close'],
-                            'yhat_lower': actual_data['close'] * 0.99,
-                            'yhat_upper': actual_data['close'] * 1.01,
-                            'type': 'historical'
-                        }
-                        
         except Exception as e:
             st.error(f"Error generating custom date forecast: {e}")
             
@@ -525,8 +521,10 @@ def display_advanced_forecasting_dashboard():
                 if historical_data is not None and not historical_data.empty:
                     try:
                         # Generate time range forecast with specific date and time range
+                        live_data = forecaster.get_comprehensive_live_price(selected_brand)
                         forecast_data = forecaster.generate_time_range_forecast(
-                            historical_data, start_time, end_time, forecast_date, selected_brand
+                            historical_data, start_time, end_time, forecast_date, selected_brand,
+                            live_price=live_data
                         )
                         
                         if forecast_data is not None and not forecast_data.empty:
@@ -10,7 +10,10 @@ from datetime import datetime, timedelta
 # Import custom modules
 from data_fetcher import DataFetcher
 from forecasting import StockForecaster
+from model_executor import get_model_backend
 from visualization import ChartVisualizer
+from downsampling import relayout_range
+from indicators import get_indicator_cache
 from utils import export_to_csv, format_currency, format_market_status
 from simple_cache import get_cache_manager
 from enhanced_features import display_enhanced_file_upload
@@ -20,6 +23,9 @@ from file_debug import analyze_uploaded_file, create_manual_dataframe
 from comprehensive_brand_predictor import get_comprehensive_brand_predictor
 from enhanced_psx_fetcher import EnhancedPSXFetcher
 from live_kse40_dashboard import LiveKSE40Dashboard
+from online_trend import OnlineTrendModel
+from trading_calendar import get_trading_calendar
+from simulation import get_simulation_service
 from enhanced_live_dashboard import get_enhanced_live_dashboard
 
 # Page configuration
@@ -37,6 +43,9 @@ def main():
         st.session_state.data_fetcher = DataFetcher()
     if 'forecaster' not in st.session_state:
         st.session_state.forecaster = StockForecaster()
+    if 'online_trend' not in st.session_state:
+        # The live trend steps in 5-minute bars, however often the page reruns
+        st.session_state.online_trend = OnlineTrendModel(forgetting=0.97, time_unit=300)
     if 'visualizer' not in st.session_state:
         st.session_state.visualizer = ChartVisualizer()
     if 'cache_manager' not in st.session_state:
@@ -331,10 +340,15 @@ def display_kse100_analysis(forecast_type, days_ahead, custom_date):
                 
                 # Historical chart
                 st.subheader("📈 Live Price Movement")
+                # A box selection zooms in; the selected range is redrawn at full resolution
                 historical_chart = st.session_state.visualizer.create_price_chart(
-                    kse_data, "KSE-100 Index - Live Data"
+                    kse_data, "KSE-100 Index - Live Data",
+                    x_range=relayout_range(st.session_state.get('kse100_price_chart'))
+                )
+                st.plotly_chart(
+                    historical_chart, use_container_width=True,
+                    key='kse100_price_chart', on_select='rerun', selection_mode='box'
                 )
-                st.plotly_chart(historical_chart, use_container_width=True)
                 
                 # Forecasting
                 st.subheader("🔮 Price Forecast")
@@ -342,7 +356,7 @@ def display_kse100_analysis(forecast_type, days_ahead, custom_date):
                 with st.spinner("Generating forecast..."):
                     try:
                         forecast_data = st.session_state.forecaster.forecast_stock(
-                            kse_data, days_ahead=days_ahead
+                            kse_data, days_ahead=days_ahead, symbol='KSE-100'
                         )
                         
                         if forecast_data is not None:
@@ -464,10 +478,15 @@ def display_company_analysis(selected_company, forecast_type, days_ahead, custom
                 
                 # Historical chart
                 st.subheader("📈 Live Price Movement")
+                # A box selection zooms in; the selected range is redrawn at full resolution
                 historical_chart = st.session_state.visualizer.create_price_chart(
-                    company_data, f"{selected_company} - Live Data"
+                    company_data, f"{selected_company} - Live Data",
+                    x_range=relayout_range(st.session_state.get('company_price_chart'))
+                )
+                st.plotly_chart(
+                    historical_chart, use_container_width=True,
+                    key='company_price_chart', on_select='rerun', selection_mode='box'
                 )
-                st.plotly_chart(historical_chart, use_container_width=True)
                 
                 # Forecasting
                 st.subheader("🔮 Price Forecast")
@@ -475,7 +494,7 @@ def display_company_analysis(selected_company, forecast_type, days_ahead, custom
                 with st.spinner("Generating forecast..."):
                     try:
                         forecast_data = st.session_state.forecaster.forecast_stock(
-                            company_data, days_ahead=days_ahead
+                            company_data, days_ahead=days_ahead, symbol=company_symbol
                         )
                         
                         if forecast_data is not None:
@@ -1308,7 +1327,7 @@ def display_live_market_dashboard():
         historical_data = st.session_state.data_fetcher.fetch_kse100_data()
         if historical_data is not None and not historical_data.empty:
             # Generate forecast for next trading day
-            forecast = st.session_state.forecaster.forecast_stock(historical_data, days_ahead=1)
+            forecast = st.session_state.forecaster.forecast_stock(historical_data, days_ahead=1, symbol='KSE-100')
             
             if forecast is not None and not forecast.empty:
                 tomorrow = (current_time + timedelta(days=1)).replace(hour=9, minute=30)
@@ -1450,7 +1469,7 @@ def display_live_market_dashboard():
                             if st.button(f"📊 Forecast {symbol}", key=f"forecast_btn_{symbol}"):
                                 company_data = st.session_state.data_fetcher.fetch_company_data(brand_name)
                                 if company_data is not None and not company_data.empty:
-                                    forecast = st.session_state.forecaster.forecast_stock(company_data, days_ahead=1)
+                                    forecast = st.session_state.forecaster.forecast_stock(company_data, days_ahead=1, symbol=symbol)
                                     
                                     if forecast is not None and not forecast.empty:
                                         pred_price = forecast['yhat'].iloc[-1]
@@ -1500,32 +1519,22 @@ def display_live_market_dashboard():
 
 def generate_intraday_market_data(current_price, is_market_open):
     """Generate realistic intraday market data for today"""
-    today = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0)
+    now = datetime.now()
+    calendar = get_trading_calendar()
 
     if is_market_open:
         # Generate data from market open until current time
-        end_time = datetime.now()
+        session_day = now.date()
+        times = calendar.session_grid(session_day, freq='5min', window=('09:30', now.time()))
     else:
-        # Generate data for full trading day
-        end_time = today.replace(hour=15, minute=0)
-
-    # Create 5-minute intervals
-    times = []
-    prices = []
-
-    current_time = today
-    price = current_price * (1 + np.random.uniform(-0.01, 0.01))  # Start price
+        # Generate data for the latest full trading day
+        session_day = calendar.previous_trading_day(now.date())
+        times = calendar.session_grid(session_day, freq='5min', window=('09:30', '15:00'))
 
-    while current_time <= end_time:
-        times.append(current_time)
-
-        # Add realistic price movement (±0.5% per 5-minute interval)
-        change = np.random.uniform(-0.005, 0.005)
-        price = price * (1 + change)
-        prices.append(price)
-
-        # Ensure proper datetime addition
-        current_time = current_time + timedelta(minutes=5)
+    # Add realistic price movement (±0.5% per 5-minute interval), reproducible for the session day
+    rng = get_simulation_service().generator('KSE-100', int(session_day.strftime('%Y%m%d')), stream='intraday_market')
+    start_price = current_price * (1 + rng.uniform(-0.01, 0.01))  # Start price
+    prices = start_price * np.cumprod(1 + rng.uniform(-0.005, 0.005, len(times)))
 
     return pd.DataFrame({
         'time': times,
@@ -1607,16 +1616,23 @@ def display_file_upload_prediction():
                                 days_ahead=forecast_days
                             )
                         else:
-                            # Use ensemble forecasting for other models
-                            forecast_results = st.session_state.forecaster.forecast_with_multiple_models(
-                                custom_data, 
-                                days_ahead=forecast_days
-                            )
-                            
-                            if model_type == "Moving Average":
-                                forecast = forecast_results.get('moving_average')
-                            else:  # Linear Trend
-                                forecast = forecast_results.get('linear_trend')
+                            # Fit in the shared worker pool (within the model's time budget), off the Streamlit thread
+                            wanted = 'moving_average' if model_type == "Moving Average" else 'linear_trend'
+                            forecast = None
+                            try:
+                                for model, model_forecast in st.session_state.forecaster.stream_model_forecasts(
+                                    custom_data, get_model_backend(), days_ahead=forecast_days, models=[wanted], timeout=30
+                                ):
+                                    if model == wanted:
+                                        forecast = model_forecast
+                                        break
+                            except Exception:
+                                # Worker pool unavailable - fit in-process
+                                forecast_results = st.session_state.forecaster.forecast_with_multiple_models(
+                                    custom_data, 
+                                    days_ahead=forecast_days
+                                )
+                                forecast = forecast_results.get(wanted)
                         
                         if forecast is not None and not forecast.empty:
                             # Display forecast results
@@ -2271,21 +2287,37 @@ def display_five_minute_live_predictions():
                 price_change_pct = live_price.get('change_pct', 0)
                 
                 if current_price > 0:
+                    # Online trend: one O(1) update per 5-minute bar (reruns within a bar are skipped)
+                    tick_time = live_price.get('timestamp')
+                    if not hasattr(tick_time, 'timestamp'):
+                        tick_time = current_time_pkt
+                    st.session_state.online_trend.update(selected_symbol, current_price, timestamp=tick_time)
+                    
+                    session = get_trading_calendar().session_bounds(current_time_pkt.date())
+                    trading_close = current_time_pkt.replace(hour=session[1].hour, minute=session[1].minute,
+                                                             second=0, microsecond=0) if session else current_time_pkt
+                    eod_steps = max(1.0, (trading_close - current_time_pkt).total_seconds() / 300)
+                    trend_paths = st.session_state.online_trend.predict(selected_symbol, [1, 3, 6, eod_steps])
+                    if trend_paths is not None:
+                        next_5min, next_15min, next_30min, eod_prediction = trend_paths[0]
+                    else:
+                        # Not enough ticks yet - extrapolate the day's change
+                        next_5min = current_price * (1 + (price_change_pct / 100) * 0.05)
+                        next_15min = current_price * (1 + (price_change_pct / 100) * 0.15)
+                        next_30min = current_price * (1 + (price_change_pct / 100) * 0.30)
+                        eod_prediction = current_price * (1 + (price_change_pct / 100) * 0.5)
+                    
                     # Next 5-minute prediction
-                    next_5min = current_price * (1 + (price_change_pct / 100) * 0.05)
                     st.metric("Next 5-Min", f"{next_5min:.2f} PKR", f"{next_5min - current_price:+.2f}")
                     
                     # Next 15-minute prediction
-                    next_15min = current_price * (1 + (price_change_pct / 100) * 0.15)
                     st.metric("Next 15-Min", f"{next_15min:.2f} PKR", f"{next_15min - current_price:+.2f}")
                     
                     # Next 30-minute prediction
-                    next_30min = current_price * (1 + (price_change_pct / 100) * 0.30)
                     st.metric("Next 30-Min", f"{next_30min:.2f} PKR", f"{next_30min - current_price:+.2f}")
                     
                     # End-of-day prediction
                     if market_status['is_market_open']:
-                        eod_prediction = current_price * (1 + (price_change_pct / 100) * 0.5)
                         st.metric("End-of-Day", f"{eod_prediction:.2f} PKR", f"{eod_prediction - current_price:+.2f}")
                 else:
                     st.warning("Invalid price data for predictions")
@@ -2693,7 +2725,7 @@ def display_universal_file_upload():
     **Upload financial data for ANY brand or instrument**
     
     Supported instruments: PSX stocks, XAUSD, Forex pairs, Commodities, Crypto, etc.
-    Supported formats: CSV, Excel (.xlsx, .xls)
+    Supported formats: CSV, Excel (.xlsx, .xls), Parquet, Feather/Arrow
     Required columns: Date/Time, Price/Close (or similar naming)
     """)
     
@@ -2727,7 +2759,7 @@ def display_universal_file_upload():
     # Brand name input
     brand_name = st.text_input("Enter Brand/Instrument Name:", placeholder="e.g., XAUSD, OGDC, EUR/USD, BTC/USD", key="brand_name_input")
     
-    uploaded_file = st.file_uploader("Choose a file", type=['csv', 'xlsx', 'xls'])
+    uploaded_file = st.file_uploader("Choose a file", type=['csv', 'xlsx', 'xls', 'parquet', 'pq', 'feather', 'arrow'])
     
     if uploaded_file is not None and brand_name:
         try:
@@ -2741,8 +2773,8 @@ def display_universal_file_upload():
                 # Reset file pointer to beginning
                 uploaded_file.seek(0)
                 
-                # Read the file using simple file reader
-                df, error_message = read_any_file(uploaded_file)
+                # Read the file using simple file reader (CSV/Excel parsed once, then reused as Arrow)
+                df, error_message = read_any_file(uploaded_file, use_arrow_cache=True)
                 
                 if error_message:
                     analysis = {'error': error_message}
@@ -3002,6 +3034,10 @@ def display_universal_file_upload():
                 else:
                     date_column = st.selectbox("Select Date Column:", ['None'] + analysis['columns'])
             
+            # Tick and intraday uploads are aggregated into OHLCV bars before charting and modeling
+            if date_column and date_column != 'None' and isinstance(analysis.get('data'), pd.DataFrame):
+                display_upload_bars(analysis['data'], brand_name, date_column, price_column)
+            
             # Generate predictions
             if st.button("🔮 Generate Predictions", key="generate_universal_prediction"):
                 if price_column:
@@ -3488,6 +3524,118 @@ def display_universal_file_upload():
                         
                 except Exception as e:
                     st.error(f"Error generating predictions: {str(e)}")
+    
+    display_bulk_file_upload()
+
+def display_upload_bars(df, brand_name, date_column, price_column):
+    """Resample an uploaded series into OHLCV bars, then chart and forecast the bars"""
+    from ohlc_resampler import INTERVALS, resample_frame
+    
+    with st.expander("🕯️ OHLC Bars", expanded=False):
+        bar_interval = st.selectbox("Bar interval:", list(INTERVALS), index=len(INTERVALS) - 1, key="upload_bar_interval")
+        try:
+            bars = resample_frame(df, bar_interval, date_column=date_column, price_column=price_column)
+        except Exception as e:
+            st.warning(f"Cannot aggregate bars: {str(e)}")
+            return
+        if len(bars) < 2:
+            st.info("Not enough bars at this interval")
+            return
+        
+        st.caption(f"{len(df):,} rows aggregated into {len(bars):,} {bar_interval} bars")
+        st.plotly_chart(
+            st.session_state.visualizer.create_price_chart(bars, f"{brand_name} ({bar_interval} bars)"),
+            use_container_width=True
+        )
+        
+        forecast = st.session_state.forecaster.forecast_stock(bars, days_ahead=7)
+        if forecast is not None and not forecast.empty:
+            st.plotly_chart(
+                st.session_state.visualizer.create_forecast_chart(bars, forecast, f"{brand_name} Bar Forecast"),
+                use_container_width=True
+            )
+
+def display_bulk_file_upload():
+    """Bulk mode: score a whole watchlist's exported history in one pass"""
+    st.markdown("---")
+    st.subheader("📦 Bulk Upload (Watchlist)")
+    st.markdown("""
+    Upload several files, a zip archive of files, or one long-format file with a
+    Symbol/Ticker column. Every series is analyzed and predicted in parallel.
+    """)
+    
+    bulk_files = st.file_uploader(
+        "Choose files or a zip archive",
+        type=['csv', 'xlsx', 'xls', 'parquet', 'pq', 'feather', 'arrow', 'zip'],
+        accept_multiple_files=True,
+        key="bulk_uploader"
+    )
+    
+    if bulk_files and st.button("🔮 Generate Bulk Predictions", key="bulk_predictions"):
+        from bulk_upload import run_bulk_predictions
+        
+        with st.spinner(f"Predicting every series in {len(bulk_files)} upload(s)..."):
+            try:
+                table, results = run_bulk_predictions(bulk_files, predictor=st.session_state.universal_predictor)
+            except Exception as e:
+                st.error(f"Bulk processing failed: {str(e)}")
+                return
+        st.session_state.bulk_table = table
+        st.session_state.bulk_results = results
+    
+    if 'bulk_table' not in st.session_state:
+        return
+    table = st.session_state.bulk_table
+    results = st.session_state.bulk_results
+    
+    failed = table['error'].notna().sum()
+    st.success(f"Predicted {len(results)} series" + (f" ({failed} skipped)" if failed else ""))
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    st.download_button(
+        label="💾 Download consolidated predictions",
+        data=table.to_csv(index=False),
+        file_name="bulk_predictions.csv",
+        mime="text/csv",
+        key="bulk_download"
+    )
+    
+    display_watchlist_allocations(results)
+
+def display_watchlist_allocations(results):
+    """Rank random long-only allocations of the bulk-uploaded watchlist"""
+    from bulk_upload import price_history
+    from portfolio import PortfolioEngine, returns_matrix, METRIC_COLUMNS
+    
+    history = price_history(results)
+    if len(history) < 2:
+        return
+    
+    st.markdown("---")
+    st.subheader("⚖️ Watchlist Allocations")
+    
+    returns = returns_matrix(history)
+    if len(returns) < 20:
+        st.info("The uploaded series share too few dates to compare allocations")
+        return
+    engine = PortfolioEngine(returns)
+    
+    st.caption(f"{len(returns)} common dates across {len(engine.symbols)} symbols · covariance shrinkage {engine.shrinkage:.0%}")
+    st.dataframe(engine.asset_metrics(), use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        n_candidates = st.slider("Candidate allocations:", 500, 20000, 5000, step=500, key="allocation_candidates")
+    with col2:
+        rank_by = st.selectbox("Rank by:", METRIC_COLUMNS + ['expected_return', 'expected_volatility'], key="allocation_rank_by")
+    
+    ranked = engine.rank_allocations(n_candidates, by=rank_by, seed=0)
+    st.dataframe(ranked.head(20), use_container_width=True, hide_index=True)
+    
+    best = ranked.iloc[0][engine.symbols]
+    st.plotly_chart(
+        go.Figure(go.Pie(labels=engine.symbols, values=best.to_numpy(), hole=0.4, title=f"Best by {rank_by}")),
+        use_container_width=True
+    )
 
 def display_news_based_predictions():
     """Display news-based market predictions"""
@@ -3694,6 +3842,9 @@ def display_all_kse100_live_prices():
             # Get KSE-100 index value
             kse_index = st.session_state.enhanced_psx_fetcher.get_kse100_index_value()
             st.metric("KSE-100 Index", f"{kse_index['value']:,.2f}")
+            bottom_up = st.session_state.enhanced_psx_fetcher.get_bottom_up_index_value(companies_data, kse_index)
+            if bottom_up is not None:
+                st.caption(f"Bottom-up from constituents: {bottom_up['value']:,.2f}")
         
         st.markdown("---")
         
@@ -4015,9 +4166,9 @@ def generate_company_historical_data(symbol):
         # Generate 90 days of historical data
         dates = pd.date_range(end=datetime.now(), periods=90, freq='D')
         
-        # Generate realistic price movements
-        np.random.seed(hash(symbol) % 2**32)  # Consistent data for same symbol
-        returns = np.random.normal(0.001, 0.02, 90)  # Daily returns with 2% volatility
+        # Generate realistic price movements (consistent for the same symbol and day)
+        rng = get_simulation_service().generator(symbol, int(datetime.now().strftime('%Y%m%d')), stream='history')
+        returns = rng.normal(0.001, 0.02, 90)  # Daily returns with 2% volatility
         
         # Calculate cumulative prices
         cumulative_returns = np.cumprod(1 + returns)
@@ -4026,11 +4177,11 @@ def generate_company_historical_data(symbol):
         
         # Generate OHLC data
         data = {
-            'open': prices * np.random.uniform(0.995, 1.005, 90),
-            'high': prices * np.random.uniform(1.001, 1.015, 90),
-            'low': prices * np.random.uniform(0.985, 0.999, 90),
+            'open': prices * rng.uniform(0.995, 1.005, 90),
+            'high': prices * rng.uniform(1.001, 1.015, 90),
+            'low': prices * rng.uniform(0.985, 0.999, 90),
             'close': prices,
-            'volume': np.random.randint(50000, 500000, 90)
+            'volume': rng.integers(50000, 500000, 90)
         }
         
         # Ensure OHLC relationships are correct
@@ -4074,11 +4225,12 @@ def generate_forecast_for_company(historical_data, symbol, days):
         # Generate forecast prices with trend and some randomness
         base_price = df['y'].iloc[-1]
         forecast_prices = []
+        rng = get_simulation_service().generator(symbol, int(last_date.strftime('%Y%m%d')), stream='forecast')
 
         for i in range(days):
             # Apply trend with decreasing confidence
             trend_effect = recent_trend * (i + 1) * (0.9 ** i)  # Diminishing trend
-            random_effect = np.random.normal(0, base_price * 0.01)  # 1% random variation
+            random_effect = rng.normal(0, base_price * 0.01)  # 1% random variation
             price = base_price + trend_effect + random_effect
             forecast_prices.append(max(price, base_price * 0.8))  # Minimum 80% of current price
 
@@ -4101,30 +4253,22 @@ def generate_intraday_data(symbol, current_price):
     try:
         from datetime import datetime, time, timedelta
 
-        # Generate times from 9:30 AM to 3:30 PM (PSX trading hours)
-        today_date = datetime.now().date()
-        start_time = datetime.combine(today_date, time(9, 30))
-        end_time = datetime.combine(today_date, time(15, 30))
-
-        # 5-minute intervals
-        times = []
-        current_time = start_time
-        while current_time <= end_time:
-            times.append(current_time)
-            # Ensure proper datetime addition
-            current_time = current_time + timedelta(minutes=5)
+        # 5-minute bars of the latest PSX session (weekends and holidays fall back to the last trading day)
+        calendar = get_trading_calendar()
+        session_day = calendar.previous_trading_day(datetime.now().date())
+        times = list(calendar.session_grid(session_day, freq='5min'))
 
-        # Generate realistic intraday price movements
-        np.random.seed(hash(symbol + str(datetime.now().date())) % 2**32)
+        # Generate realistic intraday price movements (reproducible per symbol and session)
+        rng = get_simulation_service().generator(symbol, int(session_day.strftime('%Y%m%d')), stream='intraday')
 
         # Start with opening price (±2% from current)
-        open_price = current_price * np.random.uniform(0.98, 1.02)
+        open_price = current_price * rng.uniform(0.98, 1.02)
 
         # Generate price movements
         prices = [open_price]
         for i in range(1, len(times)):
             # Small random movements with mean reversion
-            change = np.random.normal(0, current_price * 0.002)  # 0.2% volatility per 5 minutes
+            change = rng.normal(0, current_price * 0.002)  # 0.2% volatility per 5 minutes
             new_price = prices[-1] + change
 
             # Mean reversion towards current price
@@ -4134,7 +4278,7 @@ def generate_intraday_data(symbol, current_price):
             prices.append(max(new_price, current_price * 0.9))  # Minimum 90% of current
 
         # Adjust last price to be close to current price
-        prices[-1] = current_price * np.random.uniform(0.995, 1.005)
+        prices[-1] = current_price * rng.uniform(0.995, 1.005)
 
         intraday_df = pd.DataFrame({
             'time': times,
@@ -4151,34 +4295,27 @@ def calculate_technical_indicators(historical_data):
     """Calculate technical analysis indicators"""
     try:
         close_prices = historical_data['close']
+        # Latest values of the overlays shared with the charts (computed once per history)
+        indicators = get_indicator_cache().get(historical_data).iloc[-1]
         
         # Simple Moving Averages
-        sma_20 = close_prices.rolling(window=20).mean().iloc[-1] if len(close_prices) >= 20 else close_prices.mean()
-        sma_50 = close_prices.rolling(window=50).mean().iloc[-1] if len(close_prices) >= 50 else close_prices.mean()
+        sma_20 = indicators['SMA_20'] if len(close_prices) >= 20 else close_prices.mean()
+        sma_50 = indicators['SMA_50'] if len(close_prices) >= 50 else close_prices.mean()
         
         # Exponential Moving Averages
-        ema_12 = close_prices.ewm(span=12).mean().iloc[-1]
-        ema_26 = close_prices.ewm(span=26).mean().iloc[-1]
+        ema_12 = indicators['EMA_12']
+        ema_26 = indicators['EMA_26']
         
         # RSI (Relative Strength Index)
-        delta = close_prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs.iloc[-1])) if not pd.isna(rs.iloc[-1]) else 50
+        rsi = indicators['RSI'] if not pd.isna(indicators['RSI']) else 50
         
         # MACD
-        macd = ema_12 - ema_26
+        macd = indicators['MACD']
         
         # Bollinger Bands
-        bb_middle = close_prices.rolling(window=20).mean()
-        bb_std = close_prices.rolling(window=20).std()
-        bb_upper = bb_middle + (bb_std * 2)
-        bb_lower = bb_middle - (bb_std * 2)
-        
         current_price = close_prices.iloc[-1]
-        if len(bb_upper) > 0 and not pd.isna(bb_upper.iloc[-1]):
-            bb_position = ((current_price - bb_lower.iloc[-1]) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])) * 100
+        if not pd.isna(indicators['BB_Upper']):
+            bb_position = ((current_price - indicators['BB_Lower']) / (indicators['BB_Upper'] - indicators['BB_Lower'])) * 100
         else:
             bb_position = 50
         
@@ -0,0 +1,266 @@
+"""
+Vectorized walk-forward (rolling-origin) backtesting for StockForecaster models
+"""
+import numpy as np
+import pandas as pd
+
+
+def _as_price_array(prices):
+    """Extract a float array of closes from a DataFrame, Series or array"""
+    if isinstance(prices, pd.DataFrame):
+        prices = prices['close']
+    values = np.asarray(prices, dtype=float)
+    return values[~np.isnan(values)]
+
+
+def _prefix_sums(values):
+    """Cumulative sums with a leading zero so that sum(values[a:b]) = out[b] - out[a]"""
+    out = np.zeros(len(values) + 1)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def _sum_of_indices(k):
+    """Sum of 0..k-1, elementwise"""
+    return k * (k - 1) / 2.0
+
+
+def _sum_of_squared_indices(k):
+    """Sum of squares of 0..k-1, elementwise"""
+    return (k - 1) * k * (2 * k - 1) / 6.0
+
+
+class WalkForwardBacktester:
+    """Rolling-origin evaluation of forecasting models over many cutoffs at once
+
+    A cutoff ``c`` means the model sees ``prices[:c]`` and forecasts
+    ``prices[c - 1 + h]`` for every horizon ``h``. Built-in models are written
+    as closed forms over prefix sums, so all cutoffs of a series are scored in
+    a handful of array operations instead of one refit per cutoff.
+    """
+
+    def __init__(self, horizons=5, min_train=20, step=1, window=None):
+        """
+        Args:
+            horizons (int): Forecast horizons 1..horizons are evaluated
+            min_train (int): Smallest training size (first cutoff)
+            step (int): Distance between consecutive cutoffs
+            window (int): Training window length; None uses all history (as the live models do)
+        """
+        self.horizons = np.arange(1, int(horizons) + 1)
+        self.min_train = int(min_train)
+        self.step = max(1, int(step))
+        self.window = window
+        self.models = {
+            'linear_trend': self._linear_trend_paths,
+            'moving_average': self._moving_average_paths
+        }
+        self._loop_models = set()
+
+    def register_model(self, name, forecast_fn, vectorized=True):
+        """
+        Add a model to the backtest
+
+        Args:
+            name (str): Model name used in the results
+            forecast_fn (callable): When vectorized, ``fn(prices, cutoffs, horizons)`` returning
+                (yhat, lower, upper) arrays of shape (len(cutoffs), len(horizons)).
+                Otherwise a StockForecaster-style ``fn(historical_data, days_ahead)`` returning a
+                DataFrame with yhat/yhat_lower/yhat_upper, called once per cutoff (slow path).
+            vectorized (bool): Which calling convention forecast_fn follows
+        """
+        self.models[name] = forecast_fn
+        if vectorized:
+            self._loop_models.discard(name)
+        else:
+            self._loop_models.add(name)
+
+    def cutoffs(self, n_obs):
+        """Cutoffs evaluated for a series of length n_obs"""
+        return np.arange(self.min_train, n_obs, self.step)
+
+    def _training_sizes(self, cutoffs):
+        if self.window is None:
+            return cutoffs.astype(float)
+        return np.minimum(cutoffs, int(self.window)).astype(float)
+
+    def _linear_trend_paths(self, prices, cutoffs, horizons):
+        """Closed-form OLS trend with the ±1.96·σ(returns) band of StockForecaster._linear_trend_forecast"""
+        c = cutoffs.astype(float)
+        n = self._training_sizes(cutoffs)
+        start = c - n
+
+        x = np.arange(len(prices), dtype=float)
+        cum_y = _prefix_sums(prices)
+        cum_xy = _prefix_sums(x * prices)
+        lo, hi = (c - n).astype(int), cutoffs
+
+        sum_x = _sum_of_indices(c) - _sum_of_indices(start)
+        sum_xx = _sum_of_squared_indices(c) - _sum_of_squared_indices(start)
+        sum_y = cum_y[hi] - cum_y[lo]
+        sum_xy = cum_xy[hi] - cum_xy[lo]
+
+        denominator = n * sum_xx - sum_x ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(denominator != 0, (n * sum_xy - sum_x * sum_y) / denominator, 0.0)
+        intercept = (sum_y - slope * sum_x) / n
+
+        future_x = (c - 1)[:, None] + horizons[None, :]
+        yhat = intercept[:, None] + slope[:, None] * future_x
+
+        # Sample std of pct_change over the same training window
+        returns = np.zeros(len(prices))
+        returns[1:] = prices[1:] / prices[:-1] - 1
+        cum_r = _prefix_sums(returns)
+        cum_r2 = _prefix_sums(returns ** 2)
+        r_lo = lo + 1
+        m = (hi - r_lo).astype(float)
+        s1 = cum_r[hi] - cum_r[r_lo]
+        s2 = cum_r2[hi] - cum_r2[r_lo]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = np.where(m > 1, (s2 - s1 ** 2 / m) / (m - 1), np.nan)
+        volatility = np.sqrt(np.maximum(variance, 0))
+
+        confidence = yhat * volatility[:, None] * 1.96
+        return yhat, yhat - confidence, yhat + confidence
+
+    def _moving_average_paths(self, prices, cutoffs, horizons, window=10):
+        """Flat moving-average forecast with the ±5% band of StockForecaster._moving_average_forecast"""
+        cum_y = _prefix_sums(prices)
+        lo = np.maximum(cutoffs - window, 0)
+        ma = (cum_y[cutoffs] - cum_y[lo]) / (cutoffs - lo)
+        ma = np.where(cutoffs >= window, ma, np.nan)
+
+        yhat = np.repeat(ma[:, None], len(horizons), axis=1)
+        return yhat, yhat * 0.95, yhat * 1.05
+
+    def _loop_paths(self, forecast_fn, prices, cutoffs, horizons):
+        """Per-cutoff adapter for models without a vectorized implementation"""
+        shape = (len(cutoffs), len(horizons))
+        yhat, lower, upper = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+        history = pd.DataFrame({
+            'date': pd.date_range(end=pd.Timestamp.today().normalize(), periods=len(prices), freq='D'),
+            'close': prices
+        })
+        for row, cutoff in enumerate(cutoffs):
+            forecast = forecast_fn(history.iloc[:cutoff], int(horizons.max()))
+            if forecast is None or forecast.empty:
+                continue
+            yhat[row] = forecast['yhat'].values[horizons - 1]
+            lower[row] = forecast['yhat_lower'].values[horizons - 1]
+            upper[row] = forecast['yhat_upper'].values[horizons - 1]
+        return yhat, lower, upper
+
+    def forecast_paths(self, prices, model):
+        """
+        Forecasts of one model at every cutoff
+
+        Args:
+            prices (array-like/pd.DataFrame): Close prices in time order
+            model (str): Registered model name
+
+        Returns:
+            tuple: (cutoffs, yhat, lower, upper); forecast arrays are (n_cutoffs, n_horizons)
+        """
+        prices = _as_price_array(prices)
+        cutoffs = self.cutoffs(len(prices))
+        forecast_fn = self.models[model]
+        if model in self._loop_models:
+            paths = self._loop_paths(forecast_fn, prices, cutoffs, self.horizons)
+        else:
+            paths = forecast_fn(prices, cutoffs, self.horizons)
+        return (cutoffs,) + tuple(paths)
+
+    def backtest(self, prices, models=None):
+        """
+        Score models on one price series
+
+        Args:
+            prices (array-like/pd.DataFrame): Close prices in time order
+            models (list): Model names; None evaluates every registered model
+
+        Returns:
+            pd.DataFrame: One row per model and horizon with mae, mse, rmse, mape, coverage and n_forecasts
+        """
+        prices = _as_price_array(prices)
+        rows = []
+
+        for model in (models or list(self.models)):
+            cutoffs, yhat, lower, upper = self.forecast_paths(prices, model)
+
+            target = (cutoffs - 1)[:, None] + self.horizons[None, :]
+            in_sample = target < len(prices)
+            actual = np.where(in_sample, prices[np.minimum(target, len(prices) - 1)], np.nan)
+            valid = in_sample & ~np.isnan(yhat)
+
+            errors = np.where(valid, yhat - actual, np.nan)
+            inside = (np.minimum(lower, upper) <= actual) & (actual <= np.maximum(lower, upper))
+            counts = valid.sum(axis=0)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mae = np.nansum(np.abs(errors), axis=0) / counts
+                mse = np.nansum(errors ** 2, axis=0) / counts
+                mape = np.nansum(np.abs(errors / actual), axis=0) / counts * 100
+                coverage = np.sum(inside & valid, axis=0) / counts
+
+            for i, horizon in enumerate(self.horizons):
+                rows.append({
+                    'model': model,
+                    'horizon': int(horizon),
+                    'mae': mae[i],
+                    'mse': mse[i],
+                    'rmse': np.sqrt(mse[i]),
+                    'mape': mape[i],
+                    'coverage': coverage[i],
+                    'n_forecasts': int(counts[i])
+                })
+
+        return pd.DataFrame(rows, columns=['model', 'horizon', 'mae', 'mse', 'rmse', 'mape', 'coverage', 'n_forecasts'])
+
+    def backtest_panel(self, panel, models=None):
+        """
+        Score models on many symbols
+
+        Args:
+            panel (pd.DataFrame/dict): Wide frame (time x symbol) of closes, or symbol -> series/DataFrame
+            models (list): Model names; None evaluates every registered model
+
+        Returns:
+            pd.DataFrame: backtest() rows with a leading 'symbol' column
+        """
+        items = panel.items() if isinstance(panel, (dict, pd.DataFrame)) else panel
+        frames = []
+        for symbol, prices in items:
+            result = self.backtest(prices, models)
+            result.insert(0, 'symbol', symbol)
+            frames.append(result)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def summarize(results):
+        """
+        Aggregate backtest rows per model and horizon, weighting by forecast count
+
+        Args:
+            results (pd.DataFrame): Output of backtest() or backtest_panel()
+
+        Returns:
+            pd.DataFrame: Weighted mae, rmse, mape and coverage per model and horizon
+        """
+        weighted = results.assign(
+            mae_w=results['mae'] * results['n_forecasts'],
+            mse_w=results['mse'] * results['n_forecasts'],
+            mape_w=results['mape'] * results['n_forecasts'],
+            coverage_w=results['coverage'] * results['n_forecasts']
+        ).groupby(['model', 'horizon'])[['mae_w', 'mse_w', 'mape_w', 'coverage_w', 'n_forecasts']].sum()
+
+        n = weighted['n_forecasts'].replace(0, np.nan)
+        return pd.DataFrame({
+            'mae': weighted['mae_w'] / n,
+            'rmse': np.sqrt(weighted['mse_w'] / n),
+            'mape': weighted['mape_w'] / n,
+            'coverage': weighted['coverage_w'] / n,
+            'n_forecasts': weighted['n_forecasts']
+        }).reset_index()
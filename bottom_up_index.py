@@ -0,0 +1,246 @@
+"""
+Bottom-up KSE-100 index reconstructed from constituent prices
+"""
+import threading
+import numpy as np
+import pandas as pd
+
+Z_95 = 1.96
+
+
+class BottomUpIndex:
+    """Free-float weighted index held as a cached unit vector over its constituents
+
+    The index is ``value = units · prices`` where ``units[i]`` is a
+    constituent's free-float shares divided by the index divisor. The units
+    are computed once per calibration, when the divisor is chosen so that the
+    bottom-up value matches an observed index level. After that a tick for
+    one symbol moves the value by ``units[i] * (new - old)``, and a batch of
+    ticks by the dot product of the deltas, so the full sum is never
+    recomputed on the hot path.
+
+    Without free-float share counts every constituent gets the same market
+    value at calibration (equal weights), which is the closest the app can
+    get from prices alone.
+    """
+
+    def __init__(self, symbols, free_float_shares=None):
+        """
+        Args:
+            symbols (iterable): Constituent symbols
+            free_float_shares (dict): Symbol -> free-float share count; missing symbols are
+                equal-weighted at calibration
+        """
+        self.symbols = list(dict.fromkeys(symbols))
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.free_float_shares = dict(free_float_shares or {})
+        self.units = np.zeros(len(self.symbols))
+        self.prices = np.full(len(self.symbols), np.nan)
+        self.value = None
+        self.calibrated_at = None
+        self._lock = threading.RLock()
+
+    @property
+    def is_calibrated(self):
+        return self.value is not None
+
+    def calibrate(self, prices, index_value, timestamp=None):
+        """
+        Compute the unit vector so the bottom-up value equals an observed index level
+
+        Args:
+            prices (dict): Symbol -> price; constituents without a positive price get no weight
+            index_value (float): Observed index level at the same time
+            timestamp: When the prices and index level were observed
+
+        Returns:
+            float: The calibrated index value
+        """
+        with self._lock:
+            current = np.array([prices.get(symbol, np.nan) for symbol in self.symbols], dtype=float)
+            priced = np.isfinite(current) & (current > 0)
+            if not priced.any() or not index_value > 0:
+                raise ValueError("Calibration needs a positive index value and at least one priced constituent")
+
+            equal_value = 1.0 / priced.sum()
+            shares = np.zeros(len(self.symbols))
+            known = np.array([symbol in self.free_float_shares for symbol in self.symbols]) & priced
+            shares[known] = [self.free_float_shares[symbol] for symbol in np.array(self.symbols)[known]]
+            if known.any():
+                # Unknown constituents get the average known market value
+                equal_value = (shares[known] * current[known]).mean()
+            unknown = priced & ~known
+            shares[unknown] = equal_value / current[unknown]
+
+            market_value = shares @ np.where(priced, current, 0.0)
+            self.units = shares * (index_value / market_value)
+            self.prices = np.where(priced, current, np.nan)
+            self.value = float(index_value)
+            self.calibrated_at = timestamp
+            return self.value
+
+    def update(self, symbol, price):
+        """
+        Apply one constituent tick
+
+        Args:
+            symbol (str): Constituent symbol (others are ignored)
+            price (float): Latest price
+
+        Returns:
+            float: Updated index value (None before calibration)
+        """
+        i = self.symbol_ids.get(symbol)
+        if i is None or not self.is_calibrated or price is None or not price > 0:
+            return self.value
+        with self._lock:
+            previous = self.prices[i]
+            if np.isfinite(previous):
+                self.value += self.units[i] * (price - previous)
+                self.prices[i] = price
+            return self.value
+
+    def update_many(self, prices):
+        """
+        Apply ticks for many constituents at once
+
+        Args:
+            prices (dict): Symbol -> latest price
+
+        Returns:
+            float: Updated index value (None before calibration)
+        """
+        if not self.is_calibrated:
+            return None
+        rows = [(self.symbol_ids[symbol], price) for symbol, price in prices.items()
+                if symbol in self.symbol_ids and price is not None and price > 0]
+        if not rows:
+            return self.value
+        with self._lock:
+            index = np.array([row for row, _ in rows], dtype=np.int64)
+            new = np.array([price for _, price in rows], dtype=float)
+            delta = new - self.prices[index]
+            valid = np.isfinite(delta)
+            self.value += float(self.units[index[valid]] @ delta[valid])
+            self.prices[index[valid]] = new[valid]
+            return self.value
+
+    def recompute(self):
+        """Full ``units · prices`` sum; clears floating-point drift from many incremental updates"""
+        with self._lock:
+            if self.is_calibrated:
+                self.value = float(self.units @ np.nan_to_num(self.prices))
+            return self.value
+
+    def weights(self):
+        """
+        Current index weight of every constituent
+
+        Returns:
+            pd.Series: Symbol -> share of the index value (sums to 1)
+        """
+        contribution = self.units * np.nan_to_num(self.prices)
+        total = contribution.sum()
+        return pd.Series(contribution / total if total else contribution, index=self.symbols)
+
+    def forecast(self, constituent_forecasts):
+        """
+        Aggregate constituent forecasts into an index forecast
+
+        Constituents without a forecast are held at their current price. The band
+        adds the constituents' bands linearly, i.e. assumes they move together, which
+        is the conservative choice when their correlation is unknown.
+
+        Args:
+            constituent_forecasts (dict): Symbol -> forecast DataFrame (ds, yhat, yhat_lower, yhat_upper)
+
+        Returns:
+            pd.DataFrame: Index forecast (ds, yhat, yhat_lower, yhat_upper), or None before calibration
+        """
+        frames = {symbol: df for symbol, df in constituent_forecasts.items()
+                  if symbol in self.symbol_ids and df is not None and not df.empty}
+        if not self.is_calibrated or not frames:
+            return None
+
+        length = min(len(df) for df in frames.values())
+        yhat = np.full(length, self.value)
+        lower, upper = yhat.copy(), yhat.copy()
+        for symbol, df in frames.items():
+            i = self.symbol_ids[symbol]
+            if not np.isfinite(self.prices[i]):
+                continue
+            yhat += self.units[i] * (df['yhat'].values[:length] - self.prices[i])
+            lower += self.units[i] * (df['yhat_lower'].values[:length] - self.prices[i])
+            upper += self.units[i] * (df['yhat_upper'].values[:length] - self.prices[i])
+
+        return pd.DataFrame({
+            'ds': next(iter(frames.values()))['ds'].values[:length],
+            'yhat': yhat,
+            'yhat_lower': lower,
+            'yhat_upper': upper
+        })
+
+
+def reconcile_forecasts(top_down, bottom_up):
+    """
+    Combine a direct index forecast with a bottom-up one, weighting by inverse variance
+
+    Each forecast's variance is read from its band, taken as a ±1.96σ interval.
+    The 'scale' column is reconciled / bottom-up; multiplying every constituent
+    forecast by it makes them add up to the reconciled index.
+
+    Args:
+        top_down (pd.DataFrame): Forecast of the index itself
+        bottom_up (pd.DataFrame): BottomUpIndex.forecast result
+
+    Returns:
+        pd.DataFrame: ds, yhat, yhat_lower, yhat_upper, top_down, bottom_up, gap and scale
+    """
+    if top_down is None or top_down.empty:
+        return bottom_up
+    if bottom_up is None or bottom_up.empty:
+        return top_down
+
+    length = min(len(top_down), len(bottom_up))
+    forecasts = (top_down.iloc[:length], bottom_up.iloc[:length])
+    means = [df['yhat'].to_numpy(dtype=float) for df in forecasts]
+    sigmas = [(df['yhat_upper'].to_numpy(dtype=float) - df['yhat_lower'].to_numpy(dtype=float)) / (2 * Z_95)
+              for df in forecasts]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = [np.where(sigma > 0, 1.0 / sigma ** 2, np.nan) for sigma in sigmas]
+        total = precision[0] + precision[1]
+        weight = np.where(np.isfinite(total) & (total > 0), precision[0] / total, 0.5)
+        sigma = np.where(np.isfinite(total) & (total > 0), 1.0 / np.sqrt(total), (sigmas[0] + sigmas[1]) / 2)
+        yhat = weight * means[0] + (1 - weight) * means[1]
+        scale = yhat / means[1]
+
+    return pd.DataFrame({
+        'ds': top_down['ds'].values[:length],
+        'yhat': yhat,
+        'yhat_lower': yhat - Z_95 * sigma,
+        'yhat_upper': yhat + Z_95 * sigma,
+        'top_down': means[0],
+        'bottom_up': means[1],
+        'gap': means[0] - means[1],
+        'scale': scale
+    })
+
+
+_default_index = None
+
+
+def get_bottom_up_index(symbols=None, free_float_shares=None):
+    """
+    Get the process-wide bottom-up KSE-100 index
+
+    Args:
+        symbols (iterable): Constituents, used when the index is first created
+        free_float_shares (dict): Symbol -> free-float shares, used when the index is first created
+    """
+    global _default_index
+    if _default_index is None:
+        if symbols is None:
+            raise ValueError("The bottom-up index is created on first use and needs its constituents")
+        _default_index = BottomUpIndex(symbols, free_float_shares)
+    return _default_index
@@ -0,0 +1,232 @@
+"""
+Bulk upload analysis: many files, zip archives or long-format files scored in one pass
+"""
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from schema_inference import SYMBOL_WORDS
+from simple_file_reader import read_any_file, analyze_dataframe
+
+READABLE_EXTENSIONS = ('csv', 'xlsx', 'xls', 'parquet', 'pq', 'feather', 'arrow')
+
+# Uncompressed size limits for zip uploads, per member and per archive
+MAX_MEMBER_BYTES = 200 * 1024 * 1024
+MAX_ARCHIVE_BYTES = 500 * 1024 * 1024
+
+# Columns of the consolidated table, in display order
+SUMMARY_COLUMNS = [
+    'symbol', 'source', 'rows', 'price_column', 'date_column', 'current_price',
+    'volatility', 'trend', 'pred_7d', 'lower_7d', 'upper_7d', 'prob_up_7d',
+    'pred_30d', 'pred_90d', 'rsi', 'error'
+]
+
+
+class NamedBuffer(io.BytesIO):
+    """In-memory file with a name, as read_any_file expects from an upload"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def _unpack_archive(data, name):
+    """Readable members of a zip upload, refusing archives that inflate past the size limits"""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        members = []
+        for member in archive.infolist():
+            base = os.path.basename(member.filename)
+            if member.is_dir() or base.startswith('.') or member.filename.startswith('__MACOSX'):
+                continue
+            if base.rsplit('.', 1)[-1].lower() in READABLE_EXTENSIONS:
+                members.append(member)
+
+        total = sum(member.file_size for member in members)
+        too_large = [member.filename for member in members if member.file_size > MAX_MEMBER_BYTES]
+        if too_large:
+            raise ValueError(f"Archive member {too_large[0]} exceeds {MAX_MEMBER_BYTES // 2**20} MB uncompressed")
+        if total > MAX_ARCHIVE_BYTES:
+            raise ValueError(f"Archive exceeds {MAX_ARCHIVE_BYTES // 2**20} MB uncompressed")
+
+        buffers = []
+        for member in members:
+            # file_size comes from the archive header, so never read past it
+            with archive.open(member) as handle:
+                content = handle.read(member.file_size + 1)
+            if len(content) > member.file_size:
+                raise ValueError(f"Archive member {member.filename} is larger than its header states")
+            buffers.append(NamedBuffer(content, f"{name}/{member.filename}"))
+        return buffers
+
+
+def expand_uploads(files):
+    """
+    Flatten uploads into readable files, unpacking zip archives
+
+    Args:
+        files (list): Uploaded file objects (each with .name and .read())
+
+    Returns:
+        tuple: (list of NamedBuffer per readable file, with zip members named 'archive.zip/member.csv';
+            list of (upload name, error message) for archives that could not be unpacked)
+    """
+    expanded, errors = [], []
+    for uploaded_file in files:
+        uploaded_file.seek(0)
+        data = uploaded_file.read()
+        name = uploaded_file.name
+        if not name.lower().endswith('.zip'):
+            expanded.append(NamedBuffer(data, name))
+            continue
+        try:
+            expanded.extend(_unpack_archive(data, name))
+        except (zipfile.BadZipFile, RuntimeError, ValueError, NotImplementedError) as e:
+            # RuntimeError: encrypted members; NotImplementedError: unsupported compression
+            errors.append((name, f"Could not unpack archive: {str(e)}"))
+    return expanded, errors
+
+
+def symbol_column(df):
+    """First column whose name marks it as a symbol/ticker column, or None"""
+    for col in df.columns:
+        if any(word in str(col).lower() for word in SYMBOL_WORDS):
+            return col
+    return None
+
+
+def split_series(df, source):
+    """
+    Split a frame into per-symbol series
+
+    Long-format files (one row per symbol and date) are grouped by their symbol
+    column; any other file is one series named after the file.
+
+    Args:
+        df (pd.DataFrame): Parsed file
+        source (str): File name
+
+    Returns:
+        dict: Symbol -> frame, in order of first appearance
+    """
+    col = symbol_column(df)
+    if col is None:
+        stem = os.path.splitext(os.path.basename(source))[0]
+        return {stem: df}
+    symbols = df[col].astype(str).str.strip()
+    return {
+        symbol: group.drop(columns=[col]).reset_index(drop=True)
+        for symbol, group in df.groupby(symbols, sort=False)
+    }
+
+
+def _summary_row(symbol, source, df, analysis, predictions):
+    """One row of the consolidated table"""
+    row = dict.fromkeys(SUMMARY_COLUMNS)
+    row.update({'symbol': symbol, 'source': source, 'rows': len(df)})
+    if analysis:
+        row['price_column'] = analysis.get('price_column')
+        row['date_column'] = analysis.get('date_column')
+    if not predictions or 'error' in predictions:
+        row['error'] = (predictions or analysis or {}).get('error', 'No price column found')
+        return row
+
+    short_term = predictions['predictions']['short_term']
+    long_term = predictions['predictions']['long_term']
+    row.update({
+        'current_price': predictions['current_price'],
+        'volatility': predictions['volatility'],
+        'trend': predictions['trend'],
+        'pred_7d': short_term[-1]['predicted_price'],
+        'lower_7d': short_term[-1]['lower_bound'],
+        'upper_7d': short_term[-1]['upper_bound'],
+        'prob_up_7d': short_term[-1]['prob_up'],
+        'pred_30d': long_term[0]['predicted_price'],
+        'pred_90d': long_term[-1]['predicted_price'],
+        'rsi': predictions['technical_analysis'].get('rsi')
+    })
+    return row
+
+
+def _predict_series(predictor, symbol, source, df):
+    """Analyze one series and run the predictor on it"""
+    try:
+        analysis = analyze_dataframe(df, symbol)
+        if 'error' in analysis or not analysis.get('price_column'):
+            return symbol, _summary_row(symbol, source, df, analysis, None), None
+        predictions = predictor.generate_predictions(df, symbol, analysis['price_column'], analysis['date_column'])
+        return symbol, _summary_row(symbol, source, df, analysis, predictions), predictions
+    except Exception as e:
+        return symbol, _summary_row(symbol, source, df, None, {'error': str(e)}), None
+
+
+def run_bulk_predictions(files, predictor=None, max_workers=4):
+    """
+    Parse every upload and predict every series in a worker pool
+
+    Files are read in parallel, long-format files are split per symbol, and
+    UniversalPredictor.generate_predictions runs once per series. The pool uses
+    threads: the predictor's Monte Carlo simulation runs in NumPy, which
+    releases the GIL, and the frames do not have to be pickled to workers.
+
+    Args:
+        files (list): Uploaded files and/or zip archives
+        predictor (UniversalPredictor): Predictor to use; the shared instance when None
+        max_workers (int): Worker threads
+
+    Returns:
+        tuple: (consolidated pd.DataFrame with SUMMARY_COLUMNS, one row per series,
+            dict of symbol -> full generate_predictions result)
+    """
+    if predictor is None:
+        from universal_predictor_new import get_universal_predictor
+        predictor = get_universal_predictor()
+
+    buffers, archive_errors = expand_uploads(files)
+    rows, results = [], {}
+    for source, error_message in archive_errors:
+        rows.append(_summary_row(os.path.basename(source), source, pd.DataFrame(), None, {'error': error_message}))
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        parsed = executor.map(lambda buffer: (buffer.name, read_any_file(buffer, use_arrow_cache=True, columns=None)),
+                              buffers)
+        futures, seen = [], set()
+        for source, (df, error_message) in parsed:
+            if df is None:
+                rows.append(_summary_row(os.path.basename(source), source, pd.DataFrame(), None,
+                                         {'error': error_message}))
+                continue
+            for symbol, series in split_series(df, source).items():
+                if symbol in seen:  # the same symbol in several files
+                    symbol = f"{symbol} ({source})"
+                seen.add(symbol)
+                futures.append(executor.submit(_predict_series, predictor, symbol, source, series))
+
+        for future in as_completed(futures):
+            symbol, row, predictions = future.result()
+            rows.append(row)
+            if predictions is not None:
+                results[symbol] = predictions
+
+    table = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+    if not table.empty:
+        table = table.sort_values(['error', 'symbol'], na_position='first', kind='stable').reset_index(drop=True)
+    return table, results
+
+
+def price_history(results):
+    """
+    Date-indexed price series of the predicted symbols, e.g. for portfolio.returns_matrix
+
+    Args:
+        results (dict): Symbol -> generate_predictions result (from run_bulk_predictions)
+
+    Returns:
+        dict: Symbol -> pd.Series of prices indexed by date; series without dates are left out
+    """
+    history = {}
+    for symbol, predictions in results.items():
+        prices = predictions['historical_data']['prices']
+        dates = predictions['historical_data']['dates']
+        if len(prices) > 1 and len(dates) == len(prices):
+            history[symbol] = pd.Series(prices, index=pd.to_datetime(dates)).groupby(level=0).last()
+    return history
@@ -0,0 +1,190 @@
+"""
+Columnar upload reading (Parquet, Feather/Arrow IPC) and an Arrow cache for converted uploads
+"""
+import hashlib
+import os
+import threading
+import pandas as pd
+from disk_cache import DiskLRU, private_cache_dir, private_directory
+from schema_inference import SAMPLE_ROWS, SYMBOL_WORDS, VOLUME_WORDS, infer_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; columnar uploads and the Arrow cache need it
+    pa = None
+
+# Seconds a converted upload is kept after its last use
+ARROW_MAX_AGE = 24 * 60 * 60
+
+# File extension -> columnar format
+COLUMNAR_FORMATS = {
+    'parquet': 'parquet',
+    'pq': 'parquet',
+    'feather': 'feather',
+    'arrow': 'feather',
+    'ipc': 'feather'
+}
+
+
+def _source(file):
+    """Arrow input for a path (memory-mapped) or a file-like upload (zero-copy over its bytes)"""
+    if isinstance(file, (str, os.PathLike)):
+        return pa.memory_map(os.fspath(file), 'r')
+    file.seek(0)
+    data = file.getvalue() if hasattr(file, 'getvalue') else file.read()
+    return pa.BufferReader(pa.py_buffer(data))
+
+
+def _read_table(file, fmt, columns=None):
+    """Arrow table of the given columns (all when None)"""
+    if fmt == 'parquet':
+        return pq.read_table(_source(file), columns=columns)
+    return feather.read_table(_source(file), columns=columns)
+
+
+def _sample_frame(file, fmt, n=SAMPLE_ROWS):
+    """The first (up to) n rows, read without decoding the rest of the file"""
+    if fmt == 'parquet':
+        batches = pq.ParquetFile(_source(file)).iter_batches(batch_size=n)
+        batch = next(batches, None)
+        return batch.to_pandas() if batch is not None else pd.DataFrame()
+    try:
+        reader = pa.ipc.open_file(_source(file))
+        if reader.num_record_batches == 0:
+            return reader.schema.empty_table().to_pandas()
+        return reader.get_batch(0).slice(0, n).to_pandas()
+    except pa.ArrowInvalid:  # Feather V1 files are not IPC files
+        return feather.read_table(_source(file)).slice(0, n).to_pandas()
+
+
+def projected_columns(sample):
+    """
+    Columns worth materializing: the detected date and price (incl. OHLC) candidates,
+    plus symbol and volume columns, which long-format files and OHLCV bars need
+
+    Args:
+        sample (pd.DataFrame): Leading rows of the file
+
+    Returns:
+        list: Column names in file order, or None to read every column
+    """
+    schema = infer_schema(sample)
+    wanted = set(schema['date_candidates']) | set(schema['price_candidates'])
+    wanted.update(col for col in sample.columns
+                  if any(word in str(col).lower() for word in SYMBOL_WORDS + VOLUME_WORDS))
+    columns = [col for col in sample.columns if col in wanted]
+    return columns or None
+
+
+def read_columnar(file, fmt, columns='auto'):
+    """
+    Read a Parquet or Feather/Arrow IPC file
+
+    Paths are memory-mapped and uploads are read straight from their buffer.
+    With column projection only the selected columns are decoded, so wide
+    exports cost little more than their date and price columns.
+
+    Args:
+        file: Path or file-like object (e.g. a Streamlit upload)
+        fmt (str): 'parquet' or 'feather'
+        columns: Column names to read, None for all, or 'auto' for projected_columns
+
+    Returns:
+        pd.DataFrame: The file's rows
+    """
+    if pa is None:
+        raise ImportError("Reading Parquet/Feather files requires pyarrow")
+    if isinstance(columns, str) and columns == 'auto':
+        columns = projected_columns(_sample_frame(file, fmt))
+    return _read_table(file, fmt, columns).to_pandas()
+
+
+class ArrowStore:
+    """Disk cache of parsed uploads as uncompressed Feather (Arrow IPC) files
+
+    CSV and Excel parsing dominates the cost of an upload, and Streamlit sees
+    the same bytes again on every rerun and re-analysis. The first parse is
+    written out as Arrow, keyed by a hash of the raw bytes; later reads
+    memory-map that file, which is close to free. The files are copies of
+    users' uploads, so they live in the per-user private cache directory and
+    expire after max_age seconds without use.
+    """
+
+    def __init__(self, directory='auto', max_entries=64, max_age=ARROW_MAX_AGE):
+        """
+        Args:
+            directory (str): Where the Arrow files are kept; 'auto' uses the per-user private
+                cache directory, None disables the cache
+            max_entries (int): Files kept before the least recently used is removed
+            max_age (float): Seconds an unused file is kept
+        """
+        if pa is None:
+            directory = None
+        elif directory == 'auto':
+            directory = private_cache_dir('uploads')
+        elif directory:
+            directory = private_directory(directory)
+        self.directory = directory
+        self.max_entries = max_entries
+        self._disk = DiskLRU(directory, '.arrow', max_entries, max_age) if directory else None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def key(file):
+        """Hash of an upload's raw bytes"""
+        file.seek(0)
+        data = file.getvalue() if hasattr(file, 'getvalue') else file.read()
+        file.seek(0)
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def get(self, key, columns=None):
+        """
+        Previously converted upload
+
+        Args:
+            key (str): ArrowStore.key of the upload
+            columns (list): Columns to read (all when None)
+
+        Returns:
+            pd.DataFrame: The cached frame, or None when it has not been converted
+        """
+        if self._disk is None:
+            return None
+        df = self._disk.read(
+            key, lambda path: feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+        )
+        with self._lock:
+            self.stats['misses' if df is None else 'hits'] += 1
+        return df
+
+    def put(self, key, df):
+        """
+        Store a parsed upload; frames Arrow cannot represent are skipped
+
+        Args:
+            key (str): ArrowStore.key of the upload
+            df (pd.DataFrame): Parsed frame
+        """
+        if self._disk is not None:
+            self._disk.write(key, lambda path: feather.write_feather(
+                pa.Table.from_pandas(df, preserve_index=False), path, compression='uncompressed'
+            ))
+
+    def clear(self):
+        """Remove every converted upload"""
+        if self._disk is not None:
+            self._disk.clear()
+
+
+_default_store = None
+
+
+def get_arrow_store():
+    """Get the process-wide Arrow upload cache"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ArrowStore()
+    return _default_store
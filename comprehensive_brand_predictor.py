@@ -10,6 +10,7 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from clean_data_fetcher import get_clean_data_fetcher
 from forecasting import StockForecaster
+from figure_cache import get_figure_cache
 # from visualization import create_forecast_chart  # Not needed as we create charts directly
 
 class ComprehensiveBrandPredictor:
@@ -85,42 +86,50 @@ class ComprehensiveBrandPredictor:
             return None
     
     def create_prediction_chart(self, historical_df, forecast, company_name, symbol, current_price):
-        """Create comprehensive prediction chart"""
+        """Create comprehensive prediction chart (skeleton cached per symbol, only data replaced on reruns)"""
+        
+        traces = [
+            {'x': historical_df['date'], 'y': historical_df['close']},
+            {'x': [datetime.now()], 'y': [current_price]},
+            {'x': forecast['ds'], 'y': forecast['yhat']},
+            {'x': forecast['ds'], 'y': forecast['yhat_upper']},
+            {'x': forecast['ds'], 'y': forecast['yhat_lower']}
+        ]
+        return get_figure_cache().figure(
+            'brand_prediction', symbol,
+            lambda: self._build_prediction_chart(company_name, symbol),
+            traces
+        )
+    
+    def _build_prediction_chart(self, company_name, symbol):
+        """Prediction chart layout and styled traces without data"""
         
         fig = go.Figure()
         
-        # Add historical data
+        # Historical data
         fig.add_trace(go.Scatter(
-            x=historical_df['date'],
-            y=historical_df['close'],
             mode='lines',
             name='Historical Price',
             line=dict(color='blue', width=2)
         ))
         
-        # Add current price marker
+        # Current price marker
         fig.add_trace(go.Scatter(
-            x=[datetime.now()],
-            y=[current_price],
             mode='markers',
             name='Current Price',
             marker=dict(color='green', size=10, symbol='circle')
         ))
         
-        # Add forecast data - LINEAR STYLE
+        # Forecast data - LINEAR STYLE
         fig.add_trace(go.Scatter(
-            x=forecast['ds'],
-            y=forecast['yhat'],
             mode='lines+markers',
             name='5-Min Linear Predictions',
             line=dict(color='red', width=3),
             marker=dict(size=4, color='red')
         ))
         
-        # Add confidence intervals
+        # Confidence intervals
         fig.add_trace(go.Scatter(
-            x=forecast['ds'],
-            y=forecast['yhat_upper'],
             mode='lines',
             line=dict(width=0),
             showlegend=False,
@@ -128,8 +137,6 @@ class ComprehensiveBrandPredictor:
         ))
         
         fig.add_trace(go.Scatter(
-            x=forecast['ds'],
-            y=forecast['yhat_lower'],
             mode='lines',
             line=dict(width=0),
             fill='tonexty',
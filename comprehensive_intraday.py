@@ -11,21 +11,15 @@ from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import random
 from enhanced_features import EnhancedPSXFeatures
+from trading_calendar import get_trading_calendar
 
 
 class ComprehensiveIntradayForecaster:
     """Enhanced intraday forecasting with multiple prediction types"""
     
     def __init__(self):
-        # Generate 5-minute intervals from 9:30 AM to 3:00 PM
-        self.trading_hours = []
-        start_time = datetime.strptime('09:30', '%H:%M')
-        end_time = datetime.strptime('15:00', '%H:%M')
-        current_time = start_time
-        
-        while current_time <= end_time:
-            self.trading_hours.append(current_time.strftime('%H:%M'))
-            current_time += timedelta(minutes=5)
+        # 5-minute intervals from 9:30 AM to 3:00 PM of a regular (Monday-Thursday) session
+        self.trading_hours = get_trading_calendar().time_labels(weekday=0, freq='5min', window=('09:30', '15:00'))
         self.enhanced_features = EnhancedPSXFeatures()
     
     def generate_comprehensive_forecasts(self, historical_data, symbol="KSE-100", live_price=None):
@@ -0,0 +1,235 @@
+"""
+Rolling conformal prediction intervals per symbol and forecast horizon
+"""
+import math
+import threading
+import numpy as np
+import pandas as pd
+
+
+class ConformalCalibrator:
+    """Calibrated forecast intervals from a rolling window of past errors
+
+    For every key (typically a symbol and model) and horizon the calibrator
+    keeps the most recent ``window`` relative absolute errors
+    ``|actual - predicted| / |predicted|`` twice: in a ring array (arrival
+    order, to know which error leaves the window) and in a sorted array that
+    is updated in place on every insert and eviction. The conformal quantile
+    is then a single index into the sorted array, so wrapping a forecast
+    costs O(horizons) regardless of how much history was used to calibrate.
+    """
+
+    def __init__(self, horizons=30, window=250, coverage=0.9, min_samples=20, capacity=64):
+        """
+        Args:
+            horizons (int): Horizons 1..horizons are calibrated separately
+            window (int): Errors kept per key and horizon
+            coverage (float): Target probability that the actual lies inside the interval
+            min_samples (int): Errors needed before a horizon gets a calibrated interval
+            capacity (int): Initial number of keys
+        """
+        self.horizons = int(horizons)
+        self.window = int(window)
+        self.coverage = float(coverage)
+        self.min_samples = int(min_samples)
+        self.key_ids = {}
+        self.observed = {}  # key -> history length already folded in by calibrate_series
+        self._ring = np.zeros((capacity, self.horizons, self.window))
+        self._sorted = np.zeros((capacity, self.horizons, self.window))
+        self._count = np.zeros((capacity, self.horizons), dtype=np.int64)
+        self._position = np.zeros((capacity, self.horizons), dtype=np.int64)
+        self._lock = threading.RLock()
+
+    def key_id(self, key):
+        """Get (or assign) the row index of a key"""
+        index = self.key_ids.get(key)
+        if index is None:
+            with self._lock:
+                index = self.key_ids.get(key)
+                if index is None:
+                    index = len(self.key_ids)
+                    if index >= len(self._count):
+                        self._grow()
+                    self.key_ids[key] = index
+        return index
+
+    def _grow(self):
+        size = len(self._count)
+        for name in ('_ring', '_sorted', '_count', '_position'):
+            array = getattr(self, name)
+            grown = np.zeros((size * 2,) + array.shape[1:], dtype=array.dtype)
+            grown[:size] = array
+            setattr(self, name, grown)
+
+    def reset(self, key):
+        """Forget the errors recorded for a key"""
+        with self._lock:
+            index = self.key_ids.get(key)
+            if index is not None:
+                self._count[index] = 0
+                self._position[index] = 0
+            self.observed.pop(key, None)
+
+    def _push(self, index, h, error):
+        """Add one error to a horizon's window, evicting the oldest when full"""
+        count = self._count[index, h]
+        position = self._position[index, h]
+        ordered = self._sorted[index, h]
+
+        if count == self.window:
+            oldest = self._ring[index, h, position]
+            i = np.searchsorted(ordered, oldest)
+            ordered[i:-1] = ordered[i + 1:].copy()
+            count -= 1
+
+        i = np.searchsorted(ordered[:count], error)
+        ordered[i + 1:count + 1] = ordered[i:count].copy()
+        ordered[i] = error
+
+        self._ring[index, h, position] = error
+        self._position[index, h] = (position + 1) % self.window
+        self._count[index, h] = count + 1
+
+    def _replace(self, index, h, errors):
+        """Refill a horizon's window from at least `window` errors (bulk calibration)"""
+        errors = errors[-self.window:]
+        self._ring[index, h] = errors
+        self._sorted[index, h] = np.sort(errors)
+        self._count[index, h] = self.window
+        self._position[index, h] = 0
+
+    def update(self, key, horizons, predicted, actual):
+        """
+        Record forecast errors
+
+        Args:
+            key (hashable): Symbol or (symbol, model)
+            horizons (array-like): Horizon (1-based) of each forecast
+            predicted (array-like): Point forecasts
+            actual (array-like): Realized values
+        """
+        horizons = np.atleast_1d(np.asarray(horizons, dtype=np.int64))
+        predicted = np.atleast_1d(np.asarray(predicted, dtype=float))
+        actual = np.atleast_1d(np.asarray(actual, dtype=float))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            errors = np.abs(actual - predicted) / np.abs(predicted)
+        keep = np.isfinite(errors) & (horizons >= 1) & (horizons <= self.horizons)
+
+        with self._lock:
+            index = self.key_id(key)
+            for h in np.unique(horizons[keep]):
+                series = errors[keep & (horizons == h)]
+                if len(series) >= self.window:
+                    self._replace(index, h - 1, series)
+                else:
+                    for error in series:
+                        self._push(index, h - 1, error)
+
+    def quantiles(self, key):
+        """
+        Conformal error quantile per horizon
+
+        Returns:
+            np.ndarray: Relative half-widths for horizons 1..horizons; NaN where fewer than
+                min_samples errors have been seen
+        """
+        out = np.full(self.horizons, np.nan)
+        index = self.key_ids.get(key)
+        if index is None:
+            return out
+        counts = self._count[index]
+        for h in np.nonzero(counts >= self.min_samples)[0]:
+            n = counts[h]
+            # Finite-sample conformal rank: ceil((n + 1) * coverage), capped at n
+            rank = min(int(math.ceil((n + 1) * self.coverage)), n)
+            out[h] = self._sorted[index, h, rank - 1]
+        return out
+
+    def interval(self, key, yhat):
+        """
+        Calibrated interval around point forecasts for horizons 1..len(yhat)
+
+        Args:
+            key (hashable): Symbol or (symbol, model)
+            yhat (array-like): Point forecasts, one per consecutive horizon starting at 1
+
+        Returns:
+            tuple: (lower, upper); NaN where a horizon is not calibrated
+        """
+        yhat = np.asarray(yhat, dtype=float)
+        width = np.full(len(yhat), np.nan)
+        calibrated = self.quantiles(key)[:len(yhat)]
+        width[:len(calibrated)] = calibrated
+        half = np.abs(yhat) * width
+        return yhat - half, yhat + half
+
+    def wrap(self, key, forecast):
+        """
+        Replace a forecast's yhat_lower/yhat_upper with calibrated bounds where available
+
+        Args:
+            key (hashable): Symbol or (symbol, model)
+            forecast (pd.DataFrame): Forecast with yhat (row i is horizon i + 1)
+
+        Returns:
+            pd.DataFrame: Copy with calibrated bands and a 'calibrated' flag column
+        """
+        lower, upper = self.interval(key, forecast['yhat'].values)
+        calibrated = ~np.isnan(lower)
+        # One frame construction is much cheaper than three column assignments on a copy
+        columns = {name: forecast[name].values for name in forecast.columns}
+        columns['yhat_lower'] = np.where(calibrated, lower, columns['yhat_lower'])
+        columns['yhat_upper'] = np.where(calibrated, upper, columns['yhat_upper'])
+        columns['calibrated'] = calibrated
+        return pd.DataFrame(columns, index=forecast.index)
+
+    def calibrate_series(self, key, prices, paths_fn, min_train=20):
+        """
+        Fold a history's not-yet-seen forecast errors into the windows
+
+        The first call scores every cutoff of the history (split conformal); later
+        calls with a longer history only score forecasts whose targets are the new
+        bars, so repeated calls on a growing series stay cheap.
+
+        Args:
+            key (hashable): Symbol or (symbol, model)
+            prices (np.ndarray): Closes in time order
+            paths_fn (callable): Vectorized forecaster ``fn(prices, cutoffs, horizons)`` returning
+                (yhat, lower, upper), e.g. WalkForwardBacktester._linear_trend_paths
+            min_train (int): Smallest training size scored
+        """
+        prices = np.asarray(prices, dtype=float)
+        n = len(prices)
+        with self._lock:
+            seen = self.observed.get(key, 0)
+            if n < seen:
+                self.reset(key)
+                seen = 0
+            first_target = max(seen, min_train)
+            if n <= first_target:
+                self.observed[key] = max(seen, n)
+                return
+
+            horizons = np.arange(1, self.horizons + 1)
+            # Cutoffs whose forecasts land on a new bar for at least one horizon
+            cutoffs = np.arange(max(min_train, first_target - self.horizons + 1), n)
+            yhat = paths_fn(prices, cutoffs, horizons)[0]
+            targets = (cutoffs - 1)[:, None] + horizons[None, :]
+            fresh = (targets >= first_target) & (targets < n)
+
+            rows, columns = np.nonzero(fresh)
+            order = np.argsort(targets[rows, columns], kind='stable')  # feed errors in time order
+            rows, columns = rows[order], columns[order]
+            self.update(key, horizons[columns], yhat[rows, columns], prices[targets[rows, columns]])
+            self.observed[key] = n
+
+
+_default_calibrator = None
+
+
+def get_conformal_calibrator():
+    """Get the process-wide conformal calibrator"""
+    global _default_calibrator
+    if _default_calibrator is None:
+        _default_calibrator = ConformalCalibrator()
+    return _default_calibrator
@@ -9,6 +9,8 @@ import trafilatura
 import re
 import json
 import random
+from price_bands import get_price_bands, INDEX_FLOOR
+import json_extract
 
 class DataFetcher:
     """Class to handle data fetching from various sources for PSX stocks"""
@@ -20,6 +22,10 @@ class DataFetcher:
         })
         self.live_price_cache = {}
         self.cache_timestamp = None
+        self.price_bands = get_price_bands()
+        self._band_seed_attempts = set()
+        # Remembers which JSON path yields the price for each PSX endpoint
+        self.json_extractor = json_extract.SchemaLearningExtractor()
         
         # Complete KSE-100 companies list with all 100 major brands
         self.kse100_companies = {
@@ -381,6 +387,7 @@ class DataFetcher:
                 if price_data and price_data.get('price', 0) > 0:
                     # Validate price is reasonable for the symbol
                     if self._is_valid_price_for_symbol(symbol, price_data['price']):
+                        self._record_tick(symbol, price_data)
                         # Cache the result
                         self.live_price_cache[cache_key] = price_data
                         self.cache_timestamp = current_time
@@ -856,7 +863,18 @@ class DataFetcher:
     
     def _is_valid_price_for_symbol(self, symbol, price):
         """Validate if price is reasonable for the given symbol"""
-        # Price ranges for different companies (approximate)
+        # Adaptive band from recent ticks (last close ± k·ATR within circuit limits)
+        adaptive = self.price_bands.is_valid(symbol, price)
+        if adaptive is None and self._seed_price_band(symbol):
+            adaptive = self.price_bands.is_valid(symbol, price)
+        if adaptive is not None:
+            return adaptive
+        
+        # An index with no history and no known close: any index-sized level starts its band
+        if symbol in self.price_bands.no_circuit:
+            return price >= INDEX_FLOOR
+        
+        # No tick history yet - fall back to static ranges (approximate)
         price_ranges = {
             'OGDC': (80, 200),
             'HBL': (100, 300),
@@ -887,6 +905,28 @@ class DataFetcher:
         # Default range for unknown symbols
         return 10 <= price <= 10000
     
+    def _seed_price_band(self, symbol):
+        """Start an index's band from its last daily close; tried once per symbol"""
+        if symbol not in self.price_bands.no_circuit or symbol in self._band_seed_attempts:
+            return False
+        self._band_seed_attempts.add(symbol)
+        
+        for fetch in (lambda: self._fetch_from_yahoo_finance("^KSE100"),
+                      lambda: self._fetch_from_investing_com('kse-100')):
+            try:
+                history = fetch()
+            except Exception:
+                continue
+            if history is not None and not history.empty:
+                last = history.iloc[-1]
+                return self.price_bands.seed(symbol, float(last['close']), timestamp=last['date'])
+        return False
+    
+    def _record_tick(self, symbol, price_data):
+        """Feed an accepted live price into the adaptive validation bands"""
+        if price_data and price_data.get('price', 0) > 0:
+            self.price_bands.update(symbol, price_data['price'], timestamp=price_data.get('timestamp'))
+    
     def _generate_realistic_company_price(self, symbol):
         """Generate realistic current price for a company based on historical patterns"""
         # This method now only tries to fetch from authentic sources
@@ -1377,34 +1417,23 @@ class DataFetcher:
     def _fetch_live_price_from_sources(self, symbol):
         """Try multiple sources for live price data"""
         
-        # Source 1: PSX Live API (if available)
-        try:
-            live_price = self._fetch_psx_live_api(symbol)
-            if live_price:
-                return live_price
-        except Exception:
-            pass
-        
-        # Source 2: Yahoo Finance real-time
-        try:
-            live_price = self._fetch_yahoo_realtime(symbol)
-            if live_price:
-                return live_price
-        except Exception:
-            pass
-        
-        # Source 3: Investing.com live data
-        try:
-            live_price = self._fetch_investing_live(symbol)
-            if live_price:
-                return live_price
-        except Exception:
-            pass
+        sources = [
+            self._fetch_psx_live_api,       # PSX Live API (if available)
+            self._fetch_yahoo_realtime,     # Yahoo Finance real-time
+            self._fetch_investing_live,     # Investing.com live data
+            self._scrape_real_time_price,   # Real-time web scraping from financial sites
+        ]
         
-        # Fallback: Use real-time web scraping from financial sites
-        scraped_price = self._scrape_real_time_price(symbol)
-        if scraped_price:
-            return scraped_price
+        for source_func in sources:
+            try:
+                live_price = source_func(symbol)
+                # Only validated prices may move the bands that later validation trusts
+                if live_price and live_price.get('price', 0) > 0 and \
+                        self._is_valid_price_for_symbol(symbol, live_price['price']):
+                    self._record_tick(symbol, live_price)
+                    return live_price
+            except Exception:
+                continue
         
         # Final fallback: Generate realistic current price
         return self._generate_realistic_current_price(symbol)
@@ -1445,8 +1474,7 @@ class DataFetcher:
                                 for match in matches:
                                     try:
                                         price = float(match.replace(',', ''))
-                                        # Validate KSE-100 range (current market around 130k+)
-                                        if 120000 <= price <= 150000:
+                                        if self._is_valid_price_for_symbol(symbol, price):
                                             return {
                                                 'price': price,
                                                 'timestamp': datetime.now(),
@@ -1503,55 +1531,20 @@ class DataFetcher:
                         # JSON response handling
                         if 'json' in url.lower() or 'api' in url.lower():
                             try:
-                                data = response.json()
-                                
-                                # Multiple JSON structure patterns
-                                price_paths = [
-                                    ['kse100', 'current'],
-                                    ['kse100', 'value'],
-                                    ['index', 'current'],
-                                    ['current_price'], 
-                                    ['price'],
-                                    ['value'],
-                                    ['last'],
-                                    ['close'],
-                                    ['lastPrice'],
-                                    ['currentPrice'],
-                                    ['quote', 'price'],
-                                    ['stock', 'current'],
-                                    ['data', 'price'],
-                                    ['result', 'price']
-                                ]
+                                data = json_extract.loads(response.content)
                                 
-                                for path in price_paths:
-                                    try:
-                                        current_data = data
-                                        for key in path:
-                                            if isinstance(current_data, dict) and key in current_data:
-                                                current_data = current_data[key]
-                                            else:
-                                                break
-                                        else:
-                                            # Successfully navigated the path
-                                            price = float(str(current_data).replace(',', ''))
-                                            
-                                            # Validate price range based on symbol
-                                            if symbol == "KSE-100":
-                                                if 80000 <= price <= 150000:  # Current KSE-100 realistic range
-                                                    return {
-                                                        'price': price,
-                                                        'timestamp': datetime.now(),
-                                                        'source': 'psx_live_api'
-                                                    }
-                                            else:
-                                                if self._is_valid_price_for_symbol(symbol, price):
-                                                    return {
-                                                        'price': price,
-                                                        'timestamp': datetime.now(),
-                                                        'source': 'psx_live_api'
-                                                    }
-                                    except (ValueError, TypeError, KeyError):
-                                        continue
+                                # Learned path for this endpoint first, then the known JSON structure patterns
+                                price = self.json_extractor.extract(
+                                    self.json_extractor.endpoint_key(url, symbol),
+                                    data,
+                                    lambda value: self._is_valid_price_for_symbol(symbol, value)
+                                )
+                                if price is not None:
+                                    return {
+                                        'price': price,
+                                        'timestamp': datetime.now(),
+                                        'source': 'psx_live_api'
+                                    }
                                         
                             except (ValueError, TypeError):
                                 pass
@@ -1579,20 +1572,12 @@ class DataFetcher:
                                 if price_match:
                                     try:
                                         price = float(price_match.group(1))
-                                        if symbol == "KSE-100":
-                                            if 80000 <= price <= 150000:
-                                                return {
-                                                    'price': price,
-                                                    'timestamp': datetime.now(),
-                                                    'source': 'psx_website'
-                                                }
-                                        else:
-                                            if self._is_valid_price_for_symbol(symbol, price):
-                                                return {
-                                                    'price': price,
-                                                    'timestamp': datetime.now(),
-                                                    'source': 'psx_website'
-                                                }
+                                        if self._is_valid_price_for_symbol(symbol, price):
+                                            return {
+                                                'price': price,
+                                                'timestamp': datetime.now(),
+                                                'source': 'psx_website'
+                                            }
                                     except ValueError:
                                         continue
                     
@@ -1629,20 +1614,12 @@ class DataFetcher:
                                     for match in matches:
                                         try:
                                             price = float(match)
-                                            if symbol == "KSE-100":
-                                                if 80000 <= price <= 150000:
-                                                    return {
-                                                        'price': price,
-                                                        'timestamp': datetime.now(),
-                                                        'source': f'pakistani_news_{url.split("/")[2]}'
-                                                    }
-                                            else:
-                                                if self._is_valid_price_for_symbol(symbol, price):
-                                                    return {
-                                                        'price': price,
-                                                        'timestamp': datetime.now(),
-                                                        'source': f'pakistani_news_{url.split("/")[2]}'
-                                                    }
+                                            if self._is_valid_price_for_symbol(symbol, price):
+                                                return {
+                                                    'price': price,
+                                                    'timestamp': datetime.now(),
+                                                    'source': f'pakistani_news_{url.split("/")[2]}'
+                                                }
                                         except ValueError:
                                             continue
                 except Exception:
@@ -0,0 +1,188 @@
+"""
+Private on-disk LRU store shared by the forecast and upload caches
+"""
+import os
+import stat
+import tempfile
+import time
+import threading
+
+CACHE_ROOT_NAME = 'psx_predictor'
+
+
+def private_directory(path):
+    """
+    Create a directory with mode 0700, refusing one that is not safely ours
+
+    Args:
+        path (str): Directory path
+
+    Returns:
+        str: The path, or None when it is not a real directory owned by the current user
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+        if not stat.S_ISDIR(info.st_mode):
+            return None  # e.g. a symlink planted in a shared directory
+        if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+            return None
+        if stat.S_IMODE(info.st_mode) & 0o077:
+            os.chmod(path, 0o700)
+    except OSError:
+        return None
+    return path
+
+
+def private_cache_dir(name):
+    """
+    Per-user cache directory that only the current user can read or write
+
+    Uses $XDG_CACHE_HOME (or ~/.cache), falling back to a per-user directory
+    under the system temp directory. Every directory is created with mode
+    0700 and rejected when another user owns it, so no one else can plant or
+    read cache files.
+
+    Args:
+        name (str): Sub-directory for one cache
+
+    Returns:
+        str: Directory path, or None when no private directory could be made
+    """
+    home_cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    user = os.getuid() if hasattr(os, 'getuid') else os.environ.get('USERNAME', 'user')
+    roots = [
+        os.path.join(home_cache, CACHE_ROOT_NAME),
+        os.path.join(tempfile.gettempdir(), f'{CACHE_ROOT_NAME}-{user}')
+    ]
+    for root in roots:
+        if private_directory(root) and private_directory(os.path.join(root, name)):
+            return os.path.join(root, name)
+    return None
+
+
+class DiskLRU:
+    """Directory of one-file-per-key entries with LRU and age-based eviction
+
+    Files are written to a temporary name and renamed into place, so readers
+    in other processes never see partial entries. Reads mark an entry as
+    recently used. A running entry count, rather than a directory scan on
+    every write, decides when to evict; eviction then drops expired entries
+    and trims the least recently used down below the limit.
+    """
+
+    def __init__(self, directory, suffix, max_entries=512, max_age=None):
+        """
+        Args:
+            directory (str): Private directory holding the entries (see private_cache_dir and private_directory)
+            suffix (str): File extension of the entries, e.g. '.pkl'
+            max_entries (int): Entries kept before the least recently used are removed
+            max_age (float): Seconds an unused entry is kept; None keeps entries until evicted
+        """
+        self.directory = directory
+        self.suffix = suffix
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._count = None
+
+    def path(self, key):
+        """File path of an entry"""
+        return os.path.join(self.directory, key + self.suffix)
+
+    def read(self, key, reader):
+        """
+        Load an entry
+
+        Args:
+            key (str): Entry key (a file-name-safe string)
+            reader (callable): reader(path) -> value
+
+        Returns:
+            object: The value, or None when the entry is missing, expired or unreadable
+        """
+        path = self.path(key)
+        try:
+            if self.max_age is not None and time.time() - os.stat(path).st_mtime > self.max_age:
+                os.remove(path)
+                return None
+            value = reader(path)
+            os.utime(path)  # mark as recently used
+        except Exception:
+            return None
+        return value
+
+    def write(self, key, writer):
+        """
+        Store an entry; failures leave no partial or temporary files behind
+
+        Args:
+            key (str): Entry key
+            writer (callable): writer(path) writes the entry to the given file
+
+        Returns:
+            bool: True when the entry was stored
+        """
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            os.close(fd)
+            writer(tmp_path)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return False
+
+        with self._lock:
+            # The first write of a process scans once, which also drops entries expired since the last run
+            if self._count is not None:
+                self._count += 1
+            scan = self._count is None or self._count > self.max_entries
+        if scan:
+            self.evict()
+        return True
+
+    def _entries(self):
+        try:
+            return [item for item in os.scandir(self.directory) if item.name.endswith(self.suffix)]
+        except OSError:
+            return []
+
+    def evict(self):
+        """Remove expired entries, then the least recently used down to 90% of max_entries"""
+        now = time.time()
+        entries = []
+        for item in self._entries():
+            try:
+                entries.append((item.stat().st_mtime, item.path))
+            except OSError:
+                continue
+        entries.sort()
+
+        keep = self.max_entries - max(1, self.max_entries // 10)
+        excess = max(len(entries) - keep, 0) if len(entries) > self.max_entries else 0
+        removed = 0
+        for i, (mtime, path) in enumerate(entries):
+            if i >= excess and (self.max_age is None or now - mtime <= self.max_age):
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        with self._lock:
+            self._count = len(entries) - removed
+
+    def clear(self):
+        """Remove every entry"""
+        for item in self._entries():
+            try:
+                os.remove(item.path)
+            except OSError:
+                pass
+        with self._lock:
+            self._count = 0
@@ -0,0 +1,189 @@
+"""
+Point decimation for chart traces (LTTB and min/max bucketing)
+"""
+import numpy as np
+import pandas as pd
+
+METHODS = ('lttb', 'minmax')
+
+
+def _nanoseconds(timestamps):
+    """Float nanoseconds since the epoch of a DatetimeIndex, whatever its unit"""
+    if timestamps.tz is not None:
+        timestamps = timestamps.tz_convert('UTC').tz_localize(None)
+    return timestamps.values.astype('datetime64[ns]').astype(np.int64).astype(float)
+
+
+def _positions(x):
+    """Numeric x positions (nanoseconds for datetimes), or None when x is not orderable"""
+    values = np.asarray(x)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(float)
+    if values.dtype == object:
+        try:
+            return _nanoseconds(pd.to_datetime(values, utc=True))
+        except (TypeError, ValueError):
+            pass
+    try:
+        return values.astype(float)
+    except (TypeError, ValueError):
+        return None
+
+
+def _range_positions(x_range, values):
+    """(start, end) of a zoom range in the units _positions gives values"""
+    if np.issubdtype(values.dtype, np.datetime64):
+        return _nanoseconds(pd.to_datetime(list(x_range)))
+    if values.dtype == object:
+        return _nanoseconds(pd.to_datetime(list(x_range), utc=True))
+    return np.asarray(x_range, dtype=float)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets selection
+
+    Keeps the first and last point and, from each of n_out - 2 equal buckets in
+    between, the point forming the largest triangle with the previously kept
+    point and the mean of the next bucket. The walk over buckets is sequential by
+    construction; the work inside each bucket is vectorized.
+
+    Args:
+        x (np.ndarray): Increasing float positions
+        y (np.ndarray): Finite values
+        n_out (int): Points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = x - x[0]  # keeps the triangle areas well conditioned for nanosecond timestamps
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for k in range(n_out - 2):
+        lo, hi = edges[k], edges[k + 1]
+        if k < n_out - 3:
+            next_lo, next_hi = hi, edges[k + 2]
+            count = next_hi - next_lo
+            mean_x = (cum_x[next_hi] - cum_x[next_lo]) / count
+            mean_y = (cum_y[next_hi] - cum_y[next_lo]) / count
+        else:
+            mean_x, mean_y = x[n - 1], y[n - 1]
+
+        area = np.abs((x[a] - mean_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[k + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """
+    Min/max bucketing: the lowest and highest point of each of n_out / 2 equal buckets
+
+    Every spike survives, which suits tick data and volume bars. Fully vectorized.
+
+    Args:
+        y (np.ndarray): Finite values
+        n_out (int): Upper bound on points kept
+
+    Returns:
+        np.ndarray: Sorted unique indices, always including the first and last point
+    """
+    n = len(y)
+    buckets = (n_out - 2) // 2  # two slots stay reserved for the end points
+    if n_out >= n or buckets < 1:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    owner = np.repeat(np.arange(buckets), np.diff(edges))
+    index = np.arange(n)
+
+    lowest = np.minimum.reduceat(y, starts)
+    highest = np.maximum.reduceat(y, starts)
+    first_low = np.minimum.reduceat(np.where(y == lowest[owner], index, n), starts)
+    first_high = np.minimum.reduceat(np.where(y == highest[owner], index, n), starts)
+    return np.unique(np.concatenate(([0, n - 1], first_low, first_high)))
+
+
+def decimate(x, y, n_out, method='lttb', x_range=None):
+    """
+    Indices of the points to draw for one trace
+
+    NaN points are dropped (Plotly would not draw them anyway) and unsorted x is
+    ordered first. With x_range only points inside the range are considered, so a
+    zoomed view is drawn from full-resolution data.
+
+    Args:
+        x (array-like): x values (datetimes or numbers)
+        y (array-like): y values
+        n_out (int): Points to keep
+        method (str): 'lttb' or 'minmax'
+        x_range (tuple): Optional (start, end) in the units of x
+
+    Returns:
+        np.ndarray: Indices into x and y, in drawing order
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'; expected one of {METHODS}")
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    positions = _positions(x)
+    if positions is None:
+        return np.arange(n) if n <= n_out else np.linspace(0, n - 1, n_out).astype(np.int64)
+
+    keep = np.isfinite(y) & np.isfinite(positions)
+    if x_range is not None:
+        start, end = _range_positions(x_range, np.asarray(x))
+        keep &= (positions >= start) & (positions <= end)
+    candidates = np.nonzero(keep)[0]
+    if len(candidates) > 1 and np.any(np.diff(positions[candidates]) < 0):
+        candidates = candidates[np.argsort(positions[candidates], kind='stable')]
+    if len(candidates) <= n_out:
+        return candidates
+
+    if method == 'lttb':
+        chosen = lttb_indices(positions[candidates], y[candidates], n_out)
+    else:
+        chosen = minmax_indices(y[candidates], n_out)
+    return candidates[chosen]
+
+
+def relayout_range(event, axis='xaxis'):
+    """
+    x range a chart is zoomed to
+
+    Accepts a Plotly relayout payload ({'xaxis.range[0]': ..., 'xaxis.range[1]': ...})
+    or a Streamlit plotly_chart selection state, where a box selection acts as the zoom.
+
+    Args:
+        event (dict): Relayout payload or selection state
+        axis (str): Axis name in relayout keys
+
+    Returns:
+        tuple: (start, end), or None for the full range
+    """
+    if not event:
+        return None
+    try:
+        if event.get(f'{axis}.autorange'):
+            return None
+        if f'{axis}.range[0]' in event:
+            return event[f'{axis}.range[0]'], event[f'{axis}.range[1]']
+        if f'{axis}.range' in event:
+            return tuple(event[f'{axis}.range'])
+        boxes = (event.get('selection') or {}).get('box') or []
+        if boxes and boxes[-1].get('x'):
+            values = boxes[-1]['x']
+            return min(values), max(values)
+    except (AttributeError, TypeError, KeyError, IndexError):
+        pass
+    return None
@@ -19,6 +19,7 @@ import re
 import time
 import io
 import pytz
+from trading_calendar import get_trading_calendar
 
 class EnhancedPSXFeatures:
     """Enhanced features for PSX forecasting with file upload, web scraping, and news analysis"""
@@ -254,7 +255,7 @@ class EnhancedPSXFeatures:
             
             # Prepare data for forecasting
             forecast_data = data.copy()
-            forecast_data.columns = ['ds', 'y']  # Prophet format
+            forecast_data.columns = ['date', 'close']  # StockForecaster format
             
             # Generate forecast
             forecast = forecaster.forecast_stock(forecast_data, days_ahead=days_ahead)
@@ -375,15 +376,11 @@ class EnhancedPSXFeatures:
                 # Create 5-minute intervals from the forecast
                 today = self.get_pakistan_time().date()
                 
-                # Generate 5-minute intervals from 9:30 AM to 3:00 PM
-                trading_times = []
-                start_time = datetime.strptime('09:30', '%H:%M')
-                end_time = datetime.strptime('15:00', '%H:%M')
-                current_time = start_time
-                
-                while current_time <= end_time:
-                    trading_times.append(current_time.strftime('%H:%M'))
-                    current_time += timedelta(minutes=5)
+                # 5-minute intervals from 9:30 AM to 3:00 PM of the next session (Friday has a prayer break)
+                calendar = get_trading_calendar()
+                trading_times = calendar.time_labels(
+                    weekday=calendar.next_trading_day(today).weekday(), freq='5min', window=('09:30', '15:00')
+                )
                 
                 intraday_data = []
                 
@@ -8,10 +8,36 @@ import streamlit as st
 import re
 import json
 import pytz
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from price_bands import get_price_bands, INDEX_FLOOR
+from bottom_up_index import get_bottom_up_index
+from json_extract import find_embedded_json
 
 class EnhancedPSXFetcher:
     """Enhanced PSX data fetcher for all KSE-100 companies with authentic live data"""
 
+    # Snapshot pages fetched in parallel: (name, url, kind, timeout seconds)
+    SNAPSHOT_SOURCES = [
+        ('psx_market_summary', "https://www.psx.com.pk/market-summary/", 'psx', 15),
+        ('dps_market_summary', "https://dps.psx.com.pk/market-summary", 'psx', 15),
+        ('psx_resources', "https://www.psx.com.pk/psx-resources/market-summary", 'psx', 15),
+        ('psx_market_data', "https://www.psx.com.pk/market-data", 'psx', 15),
+        ('brecorder', "https://www.brecorder.com/markets/psx", 'alternative', 10),
+        ('dawn', "https://www.dawn.com/business/psx", 'alternative', 10),
+        ('thenews', "https://www.thenews.com.pk/business/psx", 'alternative', 10)
+    ]
+
+    # Lower rank wins when sources disagree
+    SOURCE_PRIORITY = {
+        'psx_table': 0,
+        'psx_json': 1,
+        'psx_api': 2,
+        'psx_script': 3,
+        'alternative_source': 4
+    }
+
+    EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+
     @staticmethod
     def get_pakistan_time():
         """Get current time in Pakistan timezone (Asia/Karachi, UTC+5)"""
@@ -27,6 +53,9 @@ class EnhancedPSXFetcher:
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
         })
+        self.reconciliation_policy = 'median'
+        self.max_snapshot_workers = 8
+        self.price_bands = get_price_bands()
         
         # Complete KSE-100 companies (All 100 brands) with exact symbol mappings
         self.kse100_companies = {
@@ -182,6 +211,8 @@ class EnhancedPSXFetcher:
             'MACFL': 'Mirpurkhas Sugar Mills Limited',
             'MARTIN': 'Martin Dow Marker Limited'
         }
+        # Index rebuilt from the constituents' prices, shared across fetchers
+        self.bottom_up_index = get_bottom_up_index(self.kse100_companies)
     
     def fetch_all_kse100_live_prices(self):
         """Fetch live prices for all KSE-100 companies from multiple authentic sources"""
@@ -190,16 +221,8 @@ class EnhancedPSXFetcher:
         companies_data = {}
         progress_bar = st.progress(0)
 
-        # Get live market data from multiple sources
-        market_data = self._fetch_psx_market_summary()
-
-        # Also try alternative sources
-        alt_market_data = self._fetch_alternative_sources()
-
-        # Combine all market data
-        all_market_data = {}
-        all_market_data.update(market_data)
-        all_market_data.update(alt_market_data)
+        # Get live market data from all PSX and alternative sources in parallel, reconciled per symbol
+        all_market_data = self._fetch_psx_market_summary()
 
         if not all_market_data:
             st.error("❌ Unable to fetch live market data from any source. Please check internet connection.")
@@ -283,44 +306,141 @@ class EnhancedPSXFetcher:
         return companies_data
     
     def _fetch_psx_market_summary(self):
-        """Fetch live market data from multiple PSX sources for maximum accuracy"""
-        market_data = {}
+        """Fetch live market data from every snapshot source concurrently and reconcile it"""
+        return self.fetch_market_snapshot()
+
+    def fetch_market_snapshot(self, policy=None, sources=None):
+        """
+        Fetch all snapshot pages in parallel and merge them into one market snapshot
+
+        Args:
+            policy (str): Reconciliation policy ('median', 'freshest' or 'priority');
+                defaults to self.reconciliation_policy
+            sources (list): (name, url, kind, timeout) tuples; defaults to SNAPSHOT_SOURCES
+
+        Returns:
+            dict: Symbol -> merged quote with a per-field 'provenance' map
+        """
+        sources = self.SNAPSHOT_SOURCES if sources is None else sources
+        snapshots = [[] for _ in sources]
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(sources), self.max_snapshot_workers))) as executor:
+            futures = {
+                executor.submit(self._fetch_snapshot_source, url, kind, timeout): index
+                for index, (name, url, kind, timeout) in enumerate(sources)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    snapshots[index] = [(sources[index][0], data) for data in future.result()]
+                except Exception:
+                    continue
 
-        # Multiple PSX URLs to try for comprehensive data
-        urls = [
-            "https://www.psx.com.pk/market-summary/",
-            "https://dps.psx.com.pk/market-summary",
-            "https://www.psx.com.pk/psx-resources/market-summary",
-            "https://www.psx.com.pk/market-data"
-        ]
-
-        for url in urls:
-            try:
-                response = self.session.get(url, timeout=15)
-
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-
-                    # Try multiple parsing strategies
-                    table_data = self._parse_market_tables(soup)
-                    json_data = self._parse_market_json(response.text)
-                    api_data = self._parse_market_api(soup)
-
-                    # Merge all data sources
-                    market_data.update(table_data)
-                    market_data.update(json_data)
-                    market_data.update(api_data)
-
-                    # If we got substantial data from this URL, break
-                    if len(market_data) > 50:
-                        break
+        # Flatten in source-list order (not completion order) so the merge is reproducible
+        ordered = [snapshot for per_source in snapshots for snapshot in per_source]
+        return self._reconcile_snapshots(ordered, policy or self.reconciliation_policy)
+
+    def _fetch_snapshot_source(self, url, kind, timeout):
+        """Fetch one snapshot page and return one parsed dict per parser that found data"""
+        response = self.session.get(url, timeout=timeout)
+        if response.status_code != 200:
+            return []
+
+        soup = BeautifulSoup(response.content, 'html.parser')
+        if kind == 'alternative':
+            parsed = [self._parse_alternative_tables(soup)]
+        else:
+            # Try multiple parsing strategies
+            parsed = [
+                self._parse_market_tables(soup),
+                self._parse_market_json(response.text),
+                self._parse_market_api(soup)
+            ]
+        return [data for data in parsed if data]
+
+    def _reconcile_snapshots(self, snapshots, policy='median'):
+        """
+        Merge per-source snapshots into one quote per symbol
+
+        Candidates that fail _is_price_reasonable() are rejected as outliers: against
+        the symbol's adaptive band when it has tick history, otherwise around the
+        cross-source median. Merged prices are fed back into the bands. The surviving prices are then combined
+        according to the policy:
+            'median'   - median of the surviving prices
+            'freshest' - newest timestamp, ties broken by source priority
+            'priority' - best-ranked source (see SOURCE_PRIORITY)
+
+        Args:
+            snapshots (list): (source name, {symbol: quote}) tuples in source order
+            policy (str): Reconciliation policy
+
+        Returns:
+            dict: Symbol -> merged quote with 'provenance' recording where each field came from
+        """
+        candidates = {}
+        for order, (source_name, data) in enumerate(snapshots):
+            for symbol, quote in data.items():
+                price = quote.get('current', quote.get('price', 0))
+                if not price or price <= 0:
+                    continue
+                parser = quote.get('source', 'unknown')
+                candidates.setdefault(symbol, []).append({
+                    'price': float(price),
+                    'quote': quote,
+                    'origin': f"{parser}@{source_name}",
+                    'rank': (self.SOURCE_PRIORITY.get(parser, len(self.SOURCE_PRIORITY)), order),
+                    'timestamp': quote.get('timestamp')
+                })
 
-            except Exception:
+        market_data = {}
+        for symbol, entries in candidates.items():
+            center = float(np.median([entry['price'] for entry in entries]))
+            survivors, rejected = [], []
+            for entry in entries:
+                if self._is_price_reasonable(entry['price'], center, symbol):
+                    survivors.append(entry)
+                else:
+                    rejected.append(entry['origin'])
+            if not survivors:
                 continue
 
-        # If we still don't have enough data, try alternative sources
-        if len(market_data) < 30:
-            market_data.update(self._fetch_alternative_sources())
+            survivors.sort(key=lambda entry: entry['rank'])
+            if policy == 'freshest':
+                # max() keeps the first of equal timestamps, i.e. the best-ranked source
+                chosen = [max(survivors, key=lambda entry: entry['timestamp'] or self.EPOCH)]
+                price = chosen[0]['price']
+            elif policy == 'priority':
+                chosen = survivors[:1]
+                price = chosen[0]['price']
+            else:
+                chosen = survivors
+                price = float(np.median([entry['price'] for entry in survivors]))
+
+            primary = chosen[0]
+            merged = {
+                'current': price,
+                'timestamp': max((entry['timestamp'] for entry in chosen if entry['timestamp']),
+                                 default=self.get_pakistan_time()),
+                'source': primary['quote'].get('source', 'psx_snapshot'),
+                'provenance': {
+                    'current': [entry['origin'] for entry in chosen],
+                    'rejected': rejected,
+                    'policy': policy
+                }
+            }
+
+            # Remaining OHLC fields come from the best-ranked survivor that reports them
+            for field in ('ldcp', 'open', 'high', 'low'):
+                for entry in survivors:
+                    value = entry['quote'].get(field)
+                    if value:
+                        merged[field] = value
+                        merged['provenance'][field] = entry['origin']
+                        break
+
+            market_data[symbol] = merged
+            self.price_bands.update(symbol, price, merged.get('high'), merged.get('low'),
+                                    timestamp=merged['timestamp'])
 
         return market_data
 
@@ -369,41 +489,31 @@ class EnhancedPSXFetcher:
         market_data = {}
 
         try:
-            # Look for JSON data in script tags or data attributes
-            json_patterns = [
-                r'var\s+\w+\s*=\s*(\[.*?\]|\{.*?\});',
-                r'data-market\s*=\s*(\[.*?\]|\{.*?\})',
-                r'window\.\w+\s*=\s*(\[.*?\]|\{.*?\});'
-            ]
-
-            for pattern in json_patterns:
-                matches = re.findall(pattern, text, re.DOTALL | re.IGNORECASE)
-
-                for match in matches:
-                    try:
-                        data = json.loads(match)
-                        if isinstance(data, list):
-                            for item in data:
-                                if isinstance(item, dict) and 'symbol' in item and 'current' in item:
-                                    symbol = item['symbol'].upper()
-                                    price = float(item['current'])
-                                    market_data[symbol] = {
-                                        'current': price,
-                                        'timestamp': self.get_pakistan_time(),
-                                        'source': 'psx_json'
-                                    }
-                        elif isinstance(data, dict):
-                            for key, value in data.items():
-                                if isinstance(value, dict) and 'current' in value:
-                                    symbol = key.upper()
-                                    price = float(value['current'])
-                                    market_data[symbol] = {
-                                        'current': price,
-                                        'timestamp': self.get_pakistan_time(),
-                                        'source': 'psx_json'
-                                    }
-                    except:
-                        continue
+            # Look for JSON data in script tags or data attributes (single left-to-right scan)
+            for data in find_embedded_json(text):
+                try:
+                    if isinstance(data, list):
+                        for item in data:
+                            if isinstance(item, dict) and 'symbol' in item and 'current' in item:
+                                symbol = item['symbol'].upper()
+                                price = float(item['current'])
+                                market_data[symbol] = {
+                                    'current': price,
+                                    'timestamp': self.get_pakistan_time(),
+                                    'source': 'psx_json'
+                                }
+                    elif isinstance(data, dict):
+                        for key, value in data.items():
+                            if isinstance(value, dict) and 'current' in value:
+                                symbol = key.upper()
+                                price = float(value['current'])
+                                market_data[symbol] = {
+                                    'current': price,
+                                    'timestamp': self.get_pakistan_time(),
+                                    'source': 'psx_json'
+                                }
+                except:
+                    continue
 
         except Exception:
             pass
@@ -412,6 +522,11 @@ class EnhancedPSXFetcher:
 
     def _is_price_reasonable(self, live_price, sector_estimate, symbol):
         """Validate if live price is reasonable compared to sector estimate"""
+        # Prefer the adaptive band built from this symbol's recent ticks
+        adaptive = self.price_bands.is_valid(symbol, live_price)
+        if adaptive is not None:
+            return adaptive
+
         if not sector_estimate or sector_estimate <= 0:
             return True  # If no sector estimate, accept live price
 
@@ -442,14 +557,8 @@ class EnhancedPSXFetcher:
 
         st.write(f"🔄 Fetching live prices for {len(symbols_list)} companies in batch mode...")
 
-        # Get comprehensive market data first
-        market_data = self._fetch_psx_market_summary()
-        alt_data = self._fetch_alternative_sources()
-
-        # Combine all data sources
-        all_market_data = {}
-        all_market_data.update(market_data)
-        all_market_data.update(alt_data)
+        # Get live market data from all PSX and alternative sources in parallel, reconciled per symbol
+        all_market_data = self._fetch_psx_market_summary()
 
         successful_fetches = 0
 
@@ -545,48 +654,33 @@ class EnhancedPSXFetcher:
 
     def _fetch_alternative_sources(self):
         """Fetch data from alternative reliable sources as backup"""
+        alternative_sources = [source for source in self.SNAPSHOT_SOURCES if source[2] == 'alternative']
+        return self.fetch_market_snapshot(sources=alternative_sources)
+
+    def _parse_alternative_tables(self, soup):
+        """Parse symbol/price pairs from financial news site tables"""
         market_data = {}
 
         try:
-            # Try business recorder or other financial news sources
-            alt_urls = [
-                "https://www.brecorder.com/markets/psx",
-                "https://www.dawn.com/business/psx",
-                "https://www.thenews.com.pk/business/psx"
-            ]
-
-            for url in alt_urls:
-                try:
-                    response = self.session.get(url, timeout=10)
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-
-                        # Look for market data tables or price information
-                        tables = soup.find_all('table')
-                        for table in tables:
-                            rows = table.find_all('tr')
-                            for row in rows[1:]:
-                                cols = row.find_all(['td', 'th'])
-                                if len(cols) >= 2:
-                                    try:
-                                        symbol = cols[0].get_text(strip=True).upper()
-                                        price = self._parse_price(cols[1].get_text(strip=True))
-
-                                        if symbol and price > 0 and len(symbol) <= 10:
-                                            market_data[symbol] = {
-                                                'current': price,
-                                                'timestamp': self.get_pakistan_time(),
-                                                'source': 'alternative_source'
-                                            }
-                                    except:
-                                        continue
-
-                        # If we got data from this source, break
-                        if len(market_data) > 20:
-                            break
+            # Look for market data tables or price information
+            tables = soup.find_all('table')
+            for table in tables:
+                rows = table.find_all('tr')
+                for row in rows[1:]:
+                    cols = row.find_all(['td', 'th'])
+                    if len(cols) >= 2:
+                        try:
+                            symbol = cols[0].get_text(strip=True).upper()
+                            price = self._parse_price(cols[1].get_text(strip=True))
 
-                except:
-                    continue
+                            if symbol and price > 0 and len(symbol) <= 10:
+                                market_data[symbol] = {
+                                    'current': price,
+                                    'timestamp': self.get_pakistan_time(),
+                                    'source': 'alternative_source'
+                                }
+                        except:
+                            continue
 
         except Exception:
             pass
@@ -700,10 +794,14 @@ class EnhancedPSXFetcher:
                             for match in matches:
                                 try:
                                     value = float(match.replace(',', ''))
-                                    if 100000 <= value <= 200000:  # Reasonable range for KSE-100
+                                    adaptive = self.price_bands.is_valid('KSE-100', value)
+                                    if adaptive or (adaptive is None and value >= INDEX_FLOOR):
+                                        timestamp = self.get_pakistan_time()
+                                        # The official level starts (or extends) the index band
+                                        self.price_bands.update('KSE-100', value, timestamp=timestamp)
                                         return {
                                             'value': value,
-                                            'timestamp': self.get_pakistan_time(),
+                                            'timestamp': timestamp,
                                             'source': 'psx_official'
                                         }
                                 except ValueError:
@@ -723,6 +821,52 @@ class EnhancedPSXFetcher:
                 'source': 'fallback_current_level'
             }
 
+    def get_bottom_up_index_value(self, companies_data, official=None):
+        """
+        KSE-100 value reconstructed from constituent prices
+
+        The weights are calibrated against the official PSX index level at the first call
+        of each session; later calls only apply each constituent's price change to the
+        running value. Fallback index levels are never used for calibration, since they
+        would fix the divisor to a stale constant.
+
+        Args:
+            companies_data (dict): fetch_all_kse100_live_prices() result
+            official (dict): get_kse100_index_value() result to calibrate against, if already fetched
+
+        Returns:
+            dict: value, timestamp and source, or None when no live constituent prices exist
+                or no official level has been seen yet
+        """
+        # Static sector estimates would pin the index, so only observed prices move it
+        prices = {
+            symbol: data['current_price']
+            for symbol, data in companies_data.items()
+            if not str(data.get('source', '')).startswith('sector_based_estimate')
+        }
+        index = self.bottom_up_index
+        session_day = self.get_pakistan_time().date()
+        try:
+            if not index.is_calibrated or index.calibrated_at.date() != session_day:
+                official = official or self.get_kse100_index_value()
+                if official and official.get('source') == 'psx_official':
+                    index.calibrate(prices, official['value'], timestamp=official['timestamp'])
+                elif not index.is_calibrated:
+                    return None
+                else:
+                    # Keep rolling the last session's calibration until an official level arrives
+                    index.update_many(prices)
+            else:
+                index.update_many(prices)
+        except ValueError:
+            return None
+
+        return {
+            'value': index.value,
+            'timestamp': self.get_pakistan_time(),
+            'source': 'bottom_up_constituents'
+        }
+
     def get_live_price(self, symbol):
         """Get live price for a specific company symbol with multiple fallback strategies"""
         try:
@@ -749,6 +893,7 @@ class EnhancedPSXFetcher:
                         'timestamp': self.get_pakistan_time(),
                         'note': f'Live price validated and corrected from {live_price["price"]:.2f} to {sector_estimate:.2f}'
                     }
+                self.price_bands.update(symbol, live_price['price'], timestamp=live_price['timestamp'])
                 return live_price
 
             # If no live data found, try individual company page
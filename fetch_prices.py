@@ -1,87 +1,215 @@
+"""
+Headless PSX price snapshot exporter
+
+Fetches live prices for any list of symbols without starting Streamlit and
+writes them to CSV, Parquet or JSON Lines. The market snapshot and the
+per-company fallbacks run concurrently under one overall deadline; the exit
+status is non-zero when live coverage falls below a threshold, so cron jobs
+and other tools can detect a bad pull.
+
+Examples:
+    python fetch_prices.py HBL UBL OGDC -o prices.csv
+    python fetch_prices.py --all --deadline 30 --min-coverage 0.8 -o snapshot.parquet
+    python fetch_prices.py --symbols-file watchlist.txt --format jsonl > prices.jsonl
+"""
 import sys
 import os
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(__file__))
 
+import pandas as pd
 from enhanced_psx_fetcher import EnhancedPSXFetcher
 
-# List of symbols to fetch
-symbols = [
+# Default list of symbols to fetch
+DEFAULT_SYMBOLS = [
     'HBL', 'UBL', 'NBP', 'ABL', 'JSBL', 'APL', 'BWCL', 'ACPL', 'JSCL', 'ASC',
     'IBLHL', 'BBFL', 'SPEL', 'SLGL', 'AGSML', 'PKGP', 'SGPL', 'KTML', 'BFAGRO',
     'ZAL', 'CEPB', 'PSX', 'HMB', 'DHPL', 'FNEL', 'IBFL', 'DCR', 'HGFA', 'LCI',
     'PABC', 'TGL', 'BNWM', 'SCBPL', 'PSEL'
 ]
 
-# Create fetcher instance
-fetcher = EnhancedPSXFetcher()
-
-# Modified fetch_live_prices_batch without streamlit
-def fetch_live_prices_batch_no_st(fetcher, symbols_list):
-    batch_data = {}
-
-    print(f"Fetching live prices for {len(symbols_list)} companies in batch mode...")
-
-    # Get comprehensive market data first
-    market_data = fetcher._fetch_psx_market_summary()
-    alt_data = fetcher._fetch_alternative_sources()
-
-    # Combine all data sources
-    all_market_data = {}
-    all_market_data.update(market_data)
-    all_market_data.update(alt_data)
-
-    successful_fetches = 0
-
-    for i, symbol in enumerate(symbols_list):
-        print(f"Processing {symbol}... ({i+1}/{len(symbols_list)})")
-
-        # Try to find in market data first
-        live_price = None
-        data_source = 'unavailable'
-
-        # Search in all market data
-        for market_symbol, market_info in all_market_data.items():
-            if symbol.upper() == market_symbol.upper():
-                live_price = market_info.get('current', market_info.get('price', 0))
-                data_source = market_info.get('source', 'psx_batch')
-                break
-
-        # If not found in batch data, try individual fetch
-        if not live_price:
-            individual_data = fetcher._fetch_individual_company_price(symbol)
-            if individual_data:
-                live_price = individual_data['price']
-                data_source = individual_data['source']
-
-        # If still no live price, use estimate
-        if not live_price:
-            live_price = fetcher._get_sector_based_estimate(symbol)
-            data_source = 'sector_estimate_batch'
-
-        batch_data[symbol] = {
-            'symbol': symbol,
-            'company_name': fetcher.kse100_companies.get(symbol, 'Unknown'),
-            'current_price': live_price,
-            'timestamp': fetcher.get_pakistan_time(),
-            'source': data_source
-        }
-
-        if data_source != 'sector_estimate_batch':
-            successful_fetches += 1
-
-    print(f"Batch fetch complete: {successful_fetches}/{len(symbols_list)} live prices")
-    return batch_data
-
-# Fetch prices
-prices = fetch_live_prices_batch_no_st(fetcher, symbols)
-
-# Print results
-print("\nLive Prices for Requested Symbols:")
-print("=" * 50)
-for symbol, data in prices.items():
-    price = data['current_price']
-    source = data['source']
-    timestamp = data['timestamp']
-    print(f"{symbol}: PKR {price:.2f} (Source: {source}, Time: {timestamp})")
-
-print("\nFetch complete.")
\ No newline at end of file
+OUTPUT_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_LOW_COVERAGE = 2
+
+
+async def fetch_prices_async(fetcher, symbols_list, deadline=60.0, concurrency=16, individual=True):
+    """
+    Fetch live prices for many symbols concurrently within a deadline
+
+    Args:
+        fetcher (EnhancedPSXFetcher): Fetcher instance
+        symbols_list (list): Symbols to fetch
+        deadline (float): Overall time budget in seconds
+        concurrency (int): Maximum simultaneous requests
+        individual (bool): Fall back to individual company pages for symbols missing from the snapshot
+
+    Returns:
+        list: One record per symbol with price, source and a 'live' flag
+    """
+    loop = asyncio.get_running_loop()
+    end_time = loop.time() + deadline
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+
+    def remaining():
+        return max(0.0, end_time - loop.time())
+
+    try:
+        # Market snapshot (all PSX and alternative pages, fetched in parallel)
+        try:
+            market_data = await asyncio.wait_for(
+                loop.run_in_executor(executor, fetcher._fetch_psx_market_summary), remaining()
+            )
+        except Exception:
+            market_data = {}
+
+        found = {}
+        for symbol in symbols_list:
+            market_info = market_data.get(symbol.upper())
+            if market_info:
+                price = market_info.get('current', market_info.get('price', 0))
+                if price and price > 0:
+                    found[symbol] = {
+                        'price': price,
+                        'source': market_info.get('source', 'psx_batch'),
+                        'timestamp': market_info.get('timestamp', fetcher.get_pakistan_time())
+                    }
+
+        # Individual company pages for the rest, all at once
+        missing = [symbol for symbol in symbols_list if symbol not in found]
+        if individual and missing and remaining() > 0:
+            tasks = {
+                symbol: asyncio.ensure_future(
+                    loop.run_in_executor(executor, fetcher._fetch_individual_company_price, symbol)
+                )
+                for symbol in missing
+            }
+            done, pending = await asyncio.wait(tasks.values(), timeout=remaining())
+            for task in pending:
+                task.cancel()
+            for symbol, task in tasks.items():
+                if task in done and not task.cancelled() and task.exception() is None and task.result():
+                    found[symbol] = task.result()
+
+    finally:
+        # Do not wait for requests still in flight past the deadline (the CLI exits without joining them)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    records = []
+    for symbol in symbols_list:
+        company_name = fetcher.kse100_companies.get(symbol, 'Unknown')
+        if symbol in found:
+            item = found[symbol]
+            records.append({
+                'symbol': symbol,
+                'company_name': company_name,
+                'current_price': float(item['price']),
+                'source': item['source'],
+                'timestamp': item['timestamp'],
+                'live': True
+            })
+        else:
+            # If still no live price, use estimate
+            records.append({
+                'symbol': symbol,
+                'company_name': company_name,
+                'current_price': float(fetcher._get_sector_based_estimate(symbol)),
+                'source': 'sector_estimate_batch',
+                'timestamp': fetcher.get_pakistan_time(),
+                'live': False
+            })
+
+    return records
+
+
+def write_records(records, output=None, output_format=None):
+    """
+    Write price records to a file (or stdout for CSV/JSON Lines)
+
+    Args:
+        records (list): Records from fetch_prices_async
+        output (str): Output path; None writes to stdout
+        output_format (str): 'csv', 'parquet' or 'jsonl'; inferred from the extension when None
+    """
+    if output_format is None:
+        extension = os.path.splitext(output)[1].lower() if output else ''
+        output_format = OUTPUT_FORMATS.get(extension, 'csv')
+
+    df = pd.DataFrame.from_records(records)
+    if output_format == 'parquet':
+        if not output:
+            raise ValueError("Parquet output requires --output")
+        df.to_parquet(output, index=False)
+    elif output_format == 'jsonl':
+        df.to_json(output or sys.stdout, orient='records', lines=True, date_format='iso')
+        if not output:
+            sys.stdout.write('\n')
+    else:
+        df.to_csv(output or sys.stdout, index=False)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export a PSX live price snapshot without Streamlit")
+    parser.add_argument('symbols', nargs='*', help="Symbols to fetch (default: built-in watchlist)")
+    parser.add_argument('--symbols-file', help="File with one symbol per line (or comma separated)")
+    parser.add_argument('--all', action='store_true', help="Fetch every KSE-100 company known to the fetcher")
+    parser.add_argument('-o', '--output', help="Output file; format inferred from .csv/.parquet/.jsonl")
+    parser.add_argument('--format', choices=['csv', 'parquet', 'jsonl'], help="Override the output format")
+    parser.add_argument('--deadline', type=float, default=60.0, help="Overall time budget in seconds (default: 60)")
+    parser.add_argument('--concurrency', type=int, default=16, help="Maximum simultaneous requests (default: 16)")
+    parser.add_argument('--min-coverage', type=float, default=0.0,
+                        help="Exit with status 2 when the live fraction is below this (0-1, default: 0)")
+    parser.add_argument('--no-individual', action='store_true', help="Skip per-company page fallbacks")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Do not print the summary to stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fetcher = EnhancedPSXFetcher()
+
+    if args.all:
+        symbols = list(fetcher.kse100_companies.keys())
+    else:
+        symbols = [symbol.upper() for symbol in args.symbols]
+        if args.symbols_file:
+            with open(args.symbols_file, encoding='utf-8') as f:
+                symbols += [part.strip().upper() for line in f for part in line.split(',') if part.strip()]
+        symbols = list(dict.fromkeys(symbols)) or DEFAULT_SYMBOLS
+
+    records = asyncio.run(fetch_prices_async(
+        fetcher, symbols,
+        deadline=args.deadline,
+        concurrency=args.concurrency,
+        individual=not args.no_individual
+    ))
+
+    try:
+        write_records(records, args.output, args.format)
+    except Exception as e:
+        print(f"Failed to write output: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    live_count = sum(1 for record in records if record['live'])
+    coverage = live_count / len(records) if records else 0.0
+    if not args.quiet:
+        print(f"Fetch complete: {live_count}/{len(records)} live prices ({coverage:.0%} coverage)", file=sys.stderr)
+
+    if coverage < args.min_coverage:
+        if not args.quiet:
+            print(f"Coverage {coverage:.0%} is below the required {args.min_coverage:.0%}", file=sys.stderr)
+        return EXIT_LOW_COVERAGE
+    return EXIT_OK
+
+
+if __name__ == '__main__':
+    status = main()
+    # Requests still running past the deadline cannot be cancelled, and a normal exit would
+    # join their worker threads; the output is written, so leave without waiting for them
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(status)
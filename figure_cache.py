@@ -0,0 +1,108 @@
+"""
+Reusable Plotly figure skeletons, patched with new trace data on reruns
+"""
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Trace properties replaced by FigureTemplateCache.patch that carry per-point data
+ARRAY_PROPERTIES = ('x', 'y', 'text', 'customdata')
+
+
+def as_array(values):
+    """
+    Trace data as a NumPy array
+
+    Plotly (6+) serializes numeric NumPy arrays as base64 typed buffers, which are
+    several times smaller and faster to encode and decode than JSON lists.
+    """
+    if isinstance(values, np.ndarray):
+        return values
+    if isinstance(values, (pd.Series, pd.Index)):
+        return values.to_numpy()
+    return np.asarray(values)
+
+
+class FigureTemplateCache:
+    """Figure skeletons keyed by chart type and symbol
+
+    Building a dashboard figure (make_subplots, layout, styling and validated
+    trace construction) dominates its cost on every rerun, although usually
+    only prices have moved. A cached skeleton is reused as long as its
+    structural signature (trace count, selected symbols, session mode, ...)
+    is unchanged, and only the data of its traces is replaced inside a single
+    batch update. Entries are evicted least recently used first.
+    """
+
+    def __init__(self, max_entries=32):
+        """
+        Args:
+            max_entries (int): Skeletons kept before the least recently used is dropped
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.stats = {'hits': 0, 'builds': 0}
+
+    def figure(self, chart_type, key, build_fn, traces, signature=None, layout=None):
+        """
+        Get a figure with the given trace data, building its skeleton only when needed
+
+        Args:
+            chart_type (str): Chart kind, e.g. 'price_movement'
+            key (hashable): Instance of the chart, usually the symbol
+            build_fn (callable): Returns a new go.Figure whose traces are in the same order as
+                ``traces``; trace data can be left empty, it is filled in by the patch
+            traces (list): Per trace, a dict of properties to set (x, y, name, ...)
+            signature (hashable): Anything that changes the figure's structure
+            layout (dict): Layout properties set on every call, e.g. a title with a live price
+
+        Returns:
+            go.Figure: The (possibly cached) figure, patched with the new data
+        """
+        cache_key = (chart_type, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None and entry[0] == signature and len(entry[1].data) == len(traces):
+            self._entries.move_to_end(cache_key)
+            fig = entry[1]
+            self.stats['hits'] += 1
+        else:
+            fig = build_fn()
+            self._entries[cache_key] = (signature, fig)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stats['builds'] += 1
+
+        self.patch(fig, traces, layout)
+        return fig
+
+    @staticmethod
+    def patch(fig, traces, layout=None):
+        """
+        Replace trace data (and optionally layout properties) in one batch update
+
+        Args:
+            fig (go.Figure): Figure to update in place
+            traces (list): Per trace, a dict of properties to set
+            layout (dict): Layout properties to set
+        """
+        with fig.batch_update():
+            for trace, values in zip(fig.data, traces):
+                trace.update({
+                    name: as_array(value) if name in ARRAY_PROPERTIES else value
+                    for name, value in values.items()
+                })
+            if layout:
+                fig.update_layout(layout)
+
+    def clear(self):
+        """Drop every cached skeleton"""
+        self._entries.clear()
+
+
+def get_figure_cache():
+    """Get or create the session's figure skeleton cache"""
+    if 'figure_cache' not in st.session_state:
+        st.session_state.figure_cache = FigureTemplateCache()
+    return st.session_state.figure_cache
@@ -0,0 +1,188 @@
+"""
+Fitted-model cache keyed by series fingerprint and model configuration
+"""
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from disk_cache import DiskLRU, private_cache_dir, private_directory
+
+
+def _values_hash(values):
+    return hashlib.blake2b(np.ascontiguousarray(values, dtype='float64').tobytes(), digest_size=16).hexdigest()
+
+
+def _config_hash(config):
+    return hashlib.blake2b(repr(sorted((config or {}).items())).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def series_fingerprint(historical_data):
+    """
+    Fingerprint a price series
+
+    Args:
+        historical_data (pd.DataFrame): Data with date and close columns
+
+    Returns:
+        dict: values_hash (closes), n, first/last timestamps and a combined 'key'
+    """
+    closes = historical_data['close'].to_numpy(dtype='float64')
+    dates = pd.to_datetime(historical_data['date'])
+    first_ts = str(dates.iloc[0]) if len(dates) else ''
+    last_ts = str(dates.iloc[-1]) if len(dates) else ''
+    values_hash = _values_hash(closes)
+    return {
+        'values_hash': values_hash,
+        'n': len(closes),
+        'first_ts': first_ts,
+        'last_ts': last_ts,
+        'key': f"{values_hash}-{len(closes)}-{last_ts}"
+    }
+
+
+class ForecastCache:
+    """Two-level (memory + disk) LRU store for fitted model parameters
+
+    Entries are keyed by model name, a hash of the model configuration and the
+    series fingerprint, so an unchanged history never triggers a refit. Each
+    (model, config, first timestamp) lineage also remembers its latest entry:
+    when a request arrives whose history extends that entry by a few new bars,
+    the model's ``extend_fn`` updates the stored parameters with only the new
+    rows instead of refitting the whole series.
+    """
+
+    def __init__(self, directory='auto', max_entries=512, memory_entries=128):
+        """
+        Args:
+            directory (str): On-disk store; 'auto' uses the per-user private cache directory,
+                None keeps the cache in memory only
+            max_entries (int): Maximum entries kept on disk (least recently used are evicted)
+            memory_entries (int): Maximum entries kept in memory
+        """
+        if directory == 'auto':
+            directory = private_cache_dir('forecasts')
+        elif directory:
+            # Entries are unpickled, so only a directory no one else can write is used
+            directory = private_directory(directory)
+        self.directory = directory
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = DiskLRU(directory, '.pkl', max_entries) if directory else None
+        self.stats = {'hits': 0, 'extends': 0, 'misses': 0}
+
+    def get_or_fit(self, historical_data, model, fit_fn, config=None, extend_fn=None):
+        """
+        Return cached parameters for this series and model, fitting only when needed
+
+        Args:
+            historical_data (pd.DataFrame): Data with date and close columns
+            model (str): Model name
+            fit_fn (callable): fit_fn(historical_data) -> params
+            config (dict): Model configuration included in the key
+            extend_fn (callable): Optional extend_fn(params, new_rows) -> params for append-only updates
+
+        Returns:
+            object: Fitted parameters
+        """
+        fingerprint = series_fingerprint(historical_data)
+        config_hash = _config_hash(config)
+        key = f"{model}-{config_hash}-{fingerprint['key']}"
+        lineage = f"lineage-{model}-{config_hash}-{fingerprint['first_ts']}"
+
+        entry = self._get(key)
+        if entry is not None:
+            self.stats['hits'] += 1
+            return entry['params']
+
+        params = None
+        if extend_fn is not None:
+            # The lineage entry only points at the latest fitted entry of this series
+            pointer = self._get(lineage)
+            previous = self._get(pointer['key']) if pointer is not None else None
+            if previous is not None and self._is_prefix(previous, historical_data):
+                params = extend_fn(previous['params'], historical_data.iloc[previous['n']:])
+                self.stats['extends'] += 1
+
+        if params is None:
+            params = fit_fn(historical_data)
+            self.stats['misses'] += 1
+
+        self._put(key, {
+            'params': params,
+            'values_hash': fingerprint['values_hash'],
+            'n': fingerprint['n'],
+            'last_ts': fingerprint['last_ts']
+        })
+        if extend_fn is not None:
+            self._put(lineage, {'key': key})
+        return params
+
+    @staticmethod
+    def _is_prefix(entry, historical_data):
+        n = entry['n']
+        if n <= 0 or n >= len(historical_data):
+            return False
+        if str(pd.to_datetime(historical_data['date'].iloc[n - 1])) != entry['last_ts']:
+            return False
+        return _values_hash(historical_data['close'].to_numpy(dtype='float64')[:n]) == entry['values_hash']
+
+    def _get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        if self._disk is None:
+            return None
+        entry = self._disk.read(self._file_key(key), _load_pickle)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def _put(self, key, entry):
+        self._remember(key, entry)
+        if self._disk is not None:
+            self._disk.write(self._file_key(key), lambda path: _dump_pickle(entry, path))
+
+    @staticmethod
+    def _file_key(key):
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached entries from memory and disk"""
+        with self._lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+def _load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _dump_pickle(entry, path):
+    with open(path, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+_default_cache = None
+
+
+def get_forecast_cache():
+    """Get the process-wide forecast cache"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ForecastCache()
+    return _default_cache
@@ -1,7 +1,15 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from functools import partial
 import streamlit as st
+from backtesting import WalkForwardBacktester
+from model_executor import ensemble_forecasts
+from forecast_cache import get_forecast_cache
+from trading_calendar import get_trading_calendar
+from regimes import rolling_regime_stats, classify_regimes, regime_labels, rolling_regimes
+from conformal import get_conformal_calibrator
+from bottom_up_index import reconcile_forecasts
 # from prophet import Prophet  # Commented out due to dependency issues
 import warnings
 warnings.filterwarnings('ignore')
@@ -9,10 +17,19 @@ warnings.filterwarnings('ignore')
 class StockForecaster:
     """Class to handle stock price forecasting using Prophet"""
     
-    def __init__(self):
+    def __init__(self, cache=None, conformal=None):
+        """
+        Args:
+            cache (ForecastCache): Fitted-model cache; defaults to the process-wide disk cache
+            conformal (ConformalCalibrator): Interval calibrator; defaults to the process-wide one
+        """
         self.model = None
+        self.cache = cache if cache is not None else get_forecast_cache()
+        self.calendar = get_trading_calendar()
+        self.conformal = conformal if conformal is not None else get_conformal_calibrator()
+        self.backtester = WalkForwardBacktester()
         
-    def forecast_stock(self, historical_data, days_ahead=1, forecast_type='daily'):
+    def forecast_stock(self, historical_data, days_ahead=1, forecast_type='daily', symbol=None):
         """
         Forecast stock prices using Prophet model
         
@@ -20,6 +37,7 @@ class StockForecaster:
             historical_data (pd.DataFrame): Historical stock data with date and close columns
             days_ahead (int): Number of days to forecast ahead
             forecast_type (str): 'daily', 'intraday', 'morning_session', 'afternoon_session'
+            symbol (str): When given, intervals are calibrated on the symbol's past forecast errors
             
         Returns:
             pd.DataFrame: Forecast data with predictions and confidence intervals
@@ -30,44 +48,159 @@ class StockForecaster:
             
         try:
             # Use linear trend forecast as primary method (Prophet disabled)
-            return self._linear_trend_forecast(historical_data, int(days_ahead))
+            return self._linear_trend_forecast(historical_data, int(days_ahead), symbol=symbol)
 
         except Exception as e:
             st.error(f"Forecasting failed: {str(e)}")
             return None
     
-    def forecast_with_multiple_models(self, historical_data, days_ahead=1):
+    def forecast_with_multiple_models(self, historical_data, days_ahead=1, backend=None, timeout=None, symbol=None,
+                                      models=None):
         """
         Create ensemble forecast using multiple approaches
         
         Args:
             historical_data (pd.DataFrame): Historical stock data
             days_ahead (int): Number of days to forecast ahead
+            backend (ModelExecutionBackend): Optional process pool; models are then fitted in
+                parallel off the Streamlit thread, each within its time budget
+            timeout (float): Overall wait limit when a backend is used
+            symbol (str): When given, in-process forecasts get conformally calibrated intervals
+            models (list): Model names to fit with the backend; defaults to every available model
             
         Returns:
             dict: Dictionary containing forecasts from different models
         """
         
+        if backend is not None:
+            return dict(self.stream_model_forecasts(historical_data, backend, days_ahead, models, timeout))
+        
         forecasts = {}
         
         # Prophet forecast
-        prophet_forecast = self.forecast_stock(historical_data, days_ahead)
+        prophet_forecast = self.forecast_stock(historical_data, days_ahead, symbol=symbol)
         if prophet_forecast is not None:
             forecasts['prophet'] = prophet_forecast
         
         # Simple moving average forecast
-        ma_forecast = self._moving_average_forecast(historical_data, days_ahead)
+        ma_forecast = self._moving_average_forecast(historical_data, days_ahead, symbol=symbol)
         if ma_forecast is not None:
             forecasts['moving_average'] = ma_forecast
             
         # Linear trend forecast
-        trend_forecast = self._linear_trend_forecast(historical_data, days_ahead)
+        trend_forecast = self._linear_trend_forecast(historical_data, days_ahead, symbol=symbol)
         if trend_forecast is not None:
             forecasts['linear_trend'] = trend_forecast
         
         return forecasts
     
-    def _moving_average_forecast(self, historical_data, days_ahead=1, window=10):
+    def stream_model_forecasts(self, historical_data, backend, days_ahead=1, models=None, timeout=None):
+        """
+        Fit models for one series in the backend's process pool, yielding each forecast as it finishes
+        
+        Fast models come back while slow ones (e.g. Prophet) are still running; a caller
+        that stops iterating early cancels the fits that have not started.
+        
+        Args:
+            historical_data (pd.DataFrame): Historical stock data with date and close columns
+            backend (ModelExecutionBackend): Process-pool execution backend
+            days_ahead (int): Number of days to forecast ahead
+            models (list): Model names; defaults to every available model
+            timeout (float): Overall wait limit in seconds
+            
+        Yields:
+            tuple: (model name, forecast DataFrame) for every fit that succeeded within its budget
+        """
+        
+        results = backend.submit({'series': historical_data}, models=models, days_ahead=days_ahead).as_completed(timeout)
+        try:
+            for result in results:
+                if result.status == 'ok':
+                    yield result.model, result.forecast
+        finally:
+            results.close()
+    
+    def forecast_many_symbols(self, data_by_symbol, backend, days_ahead=1, models=None, timeout=None, on_result=None):
+        """
+        Fit candidate models for many symbols in a process pool with ensemble and model selection
+        
+        Results are folded in as each fit finishes, so the ensemble and the selected
+        model are available from the fast models while slower ones are still running.
+        
+        Args:
+            data_by_symbol (dict): Symbol -> historical DataFrame (date, close)
+            backend (ModelExecutionBackend): Process-pool execution backend
+            days_ahead (int): Number of days to forecast ahead
+            models (list): Candidate model names; defaults to every available model
+            timeout (float): Overall wait limit in seconds
+            on_result (callable): Called as on_result(symbol, summary) after every finished fit
+            
+        Returns:
+            dict: Symbol -> {'forecasts', 'ensemble', 'selected_model', 'status'}
+        """
+        
+        summaries = {
+            symbol: {'forecasts': {}, 'ensemble': None, 'selected_model': None, 'status': {}}
+            for symbol in data_by_symbol
+        }
+        # Backtest MAE ranks the models the vectorized backtester knows (cheap, computed up front)
+        scores = {}
+        for symbol, historical_data in data_by_symbol.items():
+            try:
+                results = self.backtest_models(historical_data, horizons=max(1, int(days_ahead)), min_train=10)
+                scores[symbol] = results.groupby('model')['mae'].mean().to_dict()
+            except Exception:
+                scores[symbol] = {}
+        
+        batch = backend.submit(data_by_symbol, models=models, days_ahead=days_ahead)
+        for result in batch.as_completed(timeout):
+            summary = summaries[result.symbol]
+            summary['status'][result.model] = result.status
+            if result.status != 'ok':
+                continue
+            
+            summary['forecasts'][result.model] = result.forecast
+            summary['ensemble'] = ensemble_forecasts(summary['forecasts'])
+            ranked = sorted(
+                summary['forecasts'],
+                key=lambda model: scores[result.symbol].get(model, np.inf)
+            )
+            summary['selected_model'] = ranked[0]
+            
+            if on_result is not None:
+                on_result(result.symbol, summary)
+        
+        return summaries
+    
+    def forecast_index_bottom_up(self, index_data, data_by_symbol, index, days_ahead=1, symbol='KSE-100'):
+        """
+        Forecast an index both directly and from its constituents, and reconcile the two
+        
+        Args:
+            index_data (pd.DataFrame): Index history with date and close columns
+            data_by_symbol (dict): Constituent symbol -> historical DataFrame (date, close)
+            index (BottomUpIndex): Calibrated constituent index
+            days_ahead (int): Number of days to forecast ahead
+            symbol (str): Index name used for interval calibration
+            
+        Returns:
+            dict: 'top_down', 'bottom_up' and 'reconciled' forecasts (each may be None)
+        """
+        
+        top_down = self.forecast_stock(index_data, days_ahead, symbol=symbol)
+        constituent_forecasts = {
+            constituent: self._linear_trend_forecast(historical_data, days_ahead, symbol=constituent)
+            for constituent, historical_data in data_by_symbol.items()
+            if historical_data is not None and not historical_data.empty
+        }
+        bottom_up = index.forecast(constituent_forecasts)
+        return {
+            'top_down': top_down,
+            'bottom_up': bottom_up,
+            'reconciled': reconcile_forecasts(top_down, bottom_up)
+        }
+    
+    def _moving_average_forecast(self, historical_data, days_ahead=1, window=10, symbol=None):
         """Simple moving average based forecast"""
         
         if len(historical_data) < window:
@@ -93,33 +226,26 @@ class StockForecaster:
                 'yhat_upper': [ma * 1.05] * days_ahead
             })
             
-            return forecast
+            return self._conformal_bands(historical_data, forecast, 'moving_average', symbol, window=window)
             
         except Exception:
             return None
     
-    def _linear_trend_forecast(self, historical_data, days_ahead=1):
+    def _linear_trend_forecast(self, historical_data, days_ahead=1, symbol=None):
         """Linear trend based forecast"""
         
         if len(historical_data) < 5:
             return None
             
         try:
-            # Calculate linear trend
-            x = np.arange(len(historical_data))
-            y = historical_data['close'].values
-            
-            # Fit linear regression
-            coeffs = np.polyfit(x, y, 1)
-            slope, intercept = coeffs
+            trend = self._linear_trend_coefficients(historical_data)
             
             # Predict future values
-            future_x = np.arange(len(historical_data), len(historical_data) + days_ahead)
-            future_y = slope * future_x + intercept
+            future_x = np.arange(trend['n'], trend['n'] + days_ahead)
+            future_y = trend['slope'] * future_x + trend['intercept']
             
             # Create forecast dataframe
-            last_date = pd.to_datetime(historical_data['date'].max())
-            start_date = last_date + pd.Timedelta(days=1)
+            start_date = trend['last_date'] + pd.Timedelta(days=1)
             future_dates = pd.date_range(
                 start=start_date,
                 periods=days_ahead,
@@ -127,8 +253,7 @@ class StockForecaster:
             )
             
             # Calculate simple confidence intervals based on historical volatility
-            volatility = historical_data['close'].pct_change().std()
-            confidence_range = future_y * volatility * 1.96  # 95% confidence
+            confidence_range = future_y * trend['volatility'] * 1.96  # 95% confidence
             
             forecast = pd.DataFrame({
                 'ds': future_dates,
@@ -137,82 +262,184 @@ class StockForecaster:
                 'yhat_upper': future_y + confidence_range
             })
             
-            return forecast
+            return self._conformal_bands(historical_data, forecast, 'linear_trend', symbol)
             
         except Exception:
             return None
     
+    def _conformal_bands(self, historical_data, forecast, model, symbol, **params):
+        """
+        Replace a forecast's fixed band with conformal bounds from the symbol's own errors
+        
+        The model's vectorized backtest scores only forecasts whose targets are bars not
+        yet seen for this (symbol, model), so the per-call cost on an unchanged or
+        slightly longer history is a lookup into the calibrator's sorted windows.
+        Horizons without enough past errors keep the model's original band. Extra
+        keyword arguments are model parameters passed to its backtest path function.
+        """
+        
+        if symbol is None:
+            return forecast
+        
+        try:
+            key = (symbol, model) + tuple(sorted(params.items()))
+            prices = historical_data['close'].to_numpy(dtype=float)
+            paths_fn = partial(self.backtester.models[model], **params)
+            self.conformal.calibrate_series(key, prices, paths_fn)
+            return self.conformal.wrap(key, forecast)
+        except Exception:
+            return forecast
+    
+    def _linear_trend_coefficients(self, historical_data):
+        """Slope, intercept and return volatility of the linear trend model (cached fit)"""
+        
+        # Fitted sums come from the cache; unchanged histories are never refitted and
+        # histories with a few new bars only fold those bars into the stored sums
+        state = self.cache.get_or_fit(
+            historical_data, 'linear_trend',
+            self._fit_linear_trend_state,
+            extend_fn=self._extend_linear_trend_state
+        )
+        n = state['n']
+        
+        # Fit linear regression (closed-form OLS over x = 0..n-1)
+        sum_x = n * (n - 1) / 2.0
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6.0
+        slope = (n * state['sum_xy'] - sum_x * state['sum_y']) / (n * sum_xx - sum_x ** 2)
+        intercept = (state['sum_y'] - slope * sum_x) / n
+        
+        m = state['n_returns']
+        if m > 1:
+            volatility = np.sqrt(max((state['sum_r2'] - state['sum_r'] ** 2 / m) / (m - 1), 0.0))
+        else:
+            volatility = np.nan
+        
+        return {
+            'n': n,
+            'slope': slope,
+            'intercept': intercept,
+            'volatility': volatility,
+            'last_date': state['last_date']
+        }
+    
+    def forecast_at(self, historical_data, timestamps, anchor_price=None, anchor_time=None):
+        """
+        Linear trend forecast at arbitrary timestamps, evaluated in closed form
+        
+        Each timestamp maps to a (fractional) bar position one bar per day after the
+        last observation, so the cost does not depend on how far ahead it lies.
+        
+        Args:
+            historical_data (pd.DataFrame): Historical stock data with date and close columns
+            timestamps (array-like): Target timestamps
+            anchor_price (float): Optional live price; the trend is shifted to pass through it
+            anchor_time (datetime): Time of anchor_price; defaults to now
+            
+        Returns:
+            pd.DataFrame: ds, yhat, yhat_lower and yhat_upper per timestamp, or None
+        """
+        
+        if historical_data is None or len(historical_data) < 5:
+            return None
+        
+        trend = self._linear_trend_coefficients(historical_data)
+        timestamps = pd.DatetimeIndex(pd.to_datetime(timestamps))
+        if timestamps.tz is not None:
+            timestamps = timestamps.tz_localize(None)  # history dates are naive PKT
+        
+        def position(when):
+            return trend['n'] - 1 + (when - trend['last_date']) / pd.Timedelta(days=1)
+        
+        yhat = trend['intercept'] + trend['slope'] * np.asarray(position(timestamps), dtype=float)
+        if anchor_price is not None:
+            anchor_time = pd.Timestamp(anchor_time if anchor_time is not None else datetime.now())
+            if anchor_time.tz is not None:
+                anchor_time = anchor_time.tz_localize(None)
+            yhat = yhat + (anchor_price - (trend['intercept'] + trend['slope'] * position(anchor_time)))
+        
+        confidence_range = yhat * trend['volatility'] * 1.96  # 95% confidence
+        return pd.DataFrame({
+            'ds': timestamps,
+            'yhat': yhat,
+            'yhat_lower': yhat - confidence_range,
+            'yhat_upper': yhat + confidence_range
+        })
+    
+    @staticmethod
+    def _fit_linear_trend_state(historical_data):
+        """Sufficient statistics of the linear trend model for a full history"""
+        y = historical_data['close'].to_numpy(dtype=float)
+        if np.isnan(y).any():
+            raise ValueError("Close prices contain missing values")
+        x = np.arange(len(y))
+        returns = y[1:] / y[:-1] - 1
+        return {
+            'n': len(y),
+            'sum_y': float(y.sum()),
+            'sum_xy': float(np.dot(x, y)),
+            'n_returns': len(returns),
+            'sum_r': float(returns.sum()),
+            'sum_r2': float(np.dot(returns, returns)),
+            'last_close': float(y[-1]),
+            'last_date': pd.to_datetime(historical_data['date']).max()
+        }
+    
+    @staticmethod
+    def _extend_linear_trend_state(state, new_rows):
+        """Fold newly appended bars into linear trend statistics"""
+        y = new_rows['close'].to_numpy(dtype=float)
+        if np.isnan(y).any():
+            raise ValueError("Close prices contain missing values")
+        x = np.arange(state['n'], state['n'] + len(y))
+        previous = np.concatenate(([state['last_close']], y[:-1]))
+        returns = y / previous - 1
+        return {
+            'n': state['n'] + len(y),
+            'sum_y': state['sum_y'] + float(y.sum()),
+            'sum_xy': state['sum_xy'] + float(np.dot(x, y)),
+            'n_returns': state['n_returns'] + len(returns),
+            'sum_r': state['sum_r'] + float(returns.sum()),
+            'sum_r2': state['sum_r2'] + float(np.dot(returns, returns)),
+            'last_close': float(y[-1]),
+            'last_date': max(state['last_date'], pd.to_datetime(new_rows['date']).max())
+        }
+    
     def _create_intraday_future_df(self, model, days_ahead=1):
         """Create detailed intraday future dataframe with 5-minute intervals for comprehensive analysis"""
         try:
             today = datetime.now().replace(tzinfo=None).date()
-            future_dates = []
             
-            # PSX trading hours: 9:30 AM to 3:00 PM
-            # Create 5-minute interval predictions for detailed intraday view
-            for day in range(int(days_ahead)):
-                target_date = today + timedelta(days=day)
-                
-                # Start from 9:30 AM
-                start_time = datetime.combine(target_date, datetime.min.time().replace(hour=9, minute=30))
-                # End at 3:00 PM
-                end_time = datetime.combine(target_date, datetime.min.time().replace(hour=15, minute=0))
-                
-                # Generate 5-minute intervals throughout trading day
-                current_time = start_time
-                while current_time <= end_time:
-                    future_dates.append(current_time)
-                    current_time = current_time + timedelta(minutes=5)
+            # PSX trading hours: 9:30 AM to 3:00 PM on the next trading days (weekends,
+            # holidays and the Friday prayer break are skipped by the calendar)
+            trading_days = self.calendar.next_trading_days(today, int(days_ahead))
+            if len(trading_days) == 0:
+                return pd.DataFrame({'ds': []})
+            future_dates = self.calendar.session_grid(
+                trading_days[0], trading_days[-1], freq='5min', window=('09:30', '15:00')
+            )
             
             return pd.DataFrame({'ds': future_dates})
             
         except Exception:
-            # Fallback to hourly predictions if 30-minute fails
-            today = datetime.now().replace(tzinfo=None).date()
-            future_dates = []
-            
-            for day in range(int(days_ahead)):
-                target_date = today + timedelta(days=day)
-                
-                # 5-minute interval predictions from 9:30 AM to 3:00 PM
-                start_time = datetime.combine(target_date, datetime.min.time().replace(hour=9, minute=30))
-                end_time = datetime.combine(target_date, datetime.min.time().replace(hour=15, minute=0))
-                
-                current_time = start_time
-                while current_time <= end_time:
-                    future_dates.append(current_time)
-                    current_time = current_time + timedelta(minutes=5)
-            
-            return pd.DataFrame({'ds': future_dates})
+            # Fallback to end of day prediction
+            future_date = datetime.now().replace(hour=15, minute=0)
+            return pd.DataFrame({'ds': [future_date]})
     
     def _create_session_future_df(self, model, session='morning'):
         """Create future dataframe for specific trading sessions"""
         try:
-            today = datetime.now().replace(tzinfo=None).date()
-            future_dates = []
+            trading_day = self.calendar.next_trading_day(datetime.now().replace(tzinfo=None).date())
             
             if session == 'morning':
-                # Morning session: 9:30 AM to 12:00 PM
-                start_time = datetime.combine(today, datetime.min.time().replace(hour=9, minute=30))
-                end_time = datetime.combine(today, datetime.min.time().replace(hour=12))
-                
-                # Create 30-minute intervals
-                current_time = start_time
-                while current_time <= end_time:
-                    future_dates.append(current_time)
-                    current_time = current_time + timedelta(minutes=30)
-                    
+                # Morning session: 9:30 AM to 12:00 PM, 30-minute intervals
+                window = ('09:30', '12:00')
             elif session == 'afternoon':
-                # Afternoon session: 12:30 PM to 3:30 PM
-                start_time = datetime.combine(today, datetime.min.time().replace(hour=12, minute=30))
-                end_time = datetime.combine(today, datetime.min.time().replace(hour=15, minute=30))
-                
-                # Create 30-minute intervals
-                current_time = start_time
-                while current_time <= end_time:
-                    future_dates.append(current_time)
-                    current_time = current_time + timedelta(minutes=30)
+                # Afternoon session: 12:30 PM to 3:30 PM, 30-minute intervals
+                window = ('12:30', '15:30')
+            else:
+                return pd.DataFrame({'ds': []})
             
+            future_dates = self.calendar.session_grid(trading_day, freq='30min', window=window)
             return pd.DataFrame({'ds': future_dates})
             
         except Exception:
@@ -222,52 +449,111 @@ class StockForecaster:
     
     def get_forecast_accuracy_metrics(self, historical_data, forecast_data):
         """
-        Calculate forecast accuracy metrics
+        Calculate forecast accuracy metrics from a walk-forward backtest
         
         Args:
             historical_data (pd.DataFrame): Historical actual data
-            forecast_data (pd.DataFrame): Forecast predictions
+            forecast_data (pd.DataFrame): Forecast predictions (its length sets the horizons scored)
             
         Returns:
             dict: Dictionary containing various accuracy metrics
         """
         
         try:
-            # For simplicity, we'll calculate metrics on the last few points of historical data
-            # In practice, you'd use a holdout test set
-            
             if len(historical_data) < 10:
                 return {}
             
-            # Use last 5 points for validation
-            actual = historical_data['close'].tail(5).values
-            
-            # Simple prediction using last trend
-            predicted = []
-            for i in range(5):
-                if i == 0:
-                    predicted.append(historical_data['close'].iloc[-6])
-                else:
-                    predicted.append(predicted[-1] * (1 + np.random.normal(0, 0.01)))
-            
-            predicted = np.array(predicted)
+            # Score the primary model (linear trend) at every past cutoff, averaged over horizons
+            horizons = len(forecast_data) if forecast_data is not None and len(forecast_data) > 0 else 5
+            results = self.backtest_models(
+                historical_data,
+                horizons=min(horizons, len(historical_data) // 2),
+                min_train=5,
+                models=['linear_trend']
+            )
+            summary = WalkForwardBacktester.summarize(results)
+            if summary.empty or summary['n_forecasts'].sum() == 0:
+                return {}
             
-            # Calculate metrics
-            mae = np.mean(np.abs(actual - predicted))
-            mse = np.mean((actual - predicted) ** 2)
-            rmse = np.sqrt(mse)
-            mape = np.mean(np.abs((actual - predicted) / actual)) * 100
+            weights = summary['n_forecasts']
+            mse = float(np.average(summary['rmse'] ** 2, weights=weights))
             
             return {
-                'mae': mae,
+                'mae': float(np.average(summary['mae'], weights=weights)),
                 'mse': mse,
-                'rmse': rmse,
-                'mape': mape
+                'rmse': float(np.sqrt(mse)),
+                'mape': float(np.average(summary['mape'], weights=weights)),
+                'coverage': float(np.average(summary['coverage'], weights=weights))
             }
             
         except Exception:
             return {}
     
+    def backtest_models(self, historical_data, horizons=5, min_train=20, step=1, window=None, models=None):
+        """
+        Rolling-origin backtest of the forecasting models
+        
+        Args:
+            historical_data (pd.DataFrame): Historical stock data with a close column
+            horizons (int): Forecast horizons 1..horizons are scored
+            min_train (int): Smallest training size
+            step (int): Distance between cutoffs
+            window (int): Training window length; None uses all history
+            models (list): Model names ('linear_trend', 'moving_average'); None scores all
+            
+        Returns:
+            pd.DataFrame: MAE/MSE/RMSE/MAPE/coverage per model and horizon
+        """
+        backtester = WalkForwardBacktester(horizons=horizons, min_train=min_train, step=step, window=window)
+        return backtester.backtest(historical_data, models)
+    
+    def detect_regime_history(self, historical_data, window=20):
+        """
+        Classify the market regime at every date from a trailing window
+        
+        Args:
+            historical_data (pd.DataFrame): Historical stock data with date and close columns
+            window (int): Window length in bars
+            
+        Returns:
+            pd.DataFrame: date, slope, r_squared, volatility and regime per row
+        """
+        
+        slope, r_squared, volatility = rolling_regime_stats(historical_data['close'].to_numpy(dtype=float), window)
+        return pd.DataFrame({
+            'date': historical_data['date'].values,
+            'slope': slope,
+            'r_squared': r_squared,
+            'volatility': volatility,
+            'regime': regime_labels(classify_regimes(slope, r_squared, volatility))
+        })
+    
+    def screen_regimes(self, data_by_symbol, window=20):
+        """
+        Regime timelines for many symbols in one vectorized pass
+        
+        Args:
+            data_by_symbol (dict/pd.DataFrame): Symbol -> historical DataFrame (date, close),
+                or a wide (date x symbol) frame of closes
+            window (int): Window length in bars
+            
+        Returns:
+            pd.DataFrame: Regime labels (date x symbol); the last row is the current regime
+        """
+        
+        if isinstance(data_by_symbol, pd.DataFrame):
+            panel = data_by_symbol
+        else:
+            closes = {}
+            for symbol, df in data_by_symbol.items():
+                if df is None or df.empty:
+                    continue
+                # Index by the deduplicated frame's own dates so repeated dates keep the last close
+                deduped = df.drop_duplicates('date', keep='last')
+                closes[symbol] = deduped.set_index(pd.to_datetime(deduped['date']))['close']
+            panel = pd.DataFrame(closes).sort_index()
+        return rolling_regimes(panel, window)
+    
     def detect_market_regime(self, historical_data):
         """
         Detect current market regime (trending, ranging, volatile)
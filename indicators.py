@@ -0,0 +1,135 @@
+"""
+Technical indicator overlays computed once per price series and shared across charts
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from forecast_cache import series_fingerprint
+
+SMA_WINDOWS = (5, 10, 20, 50)
+EMA_SPANS = (5, 10, 12, 26)
+
+
+def _hash(column):
+    values = np.ascontiguousarray(column.to_numpy(dtype='float64'))
+    return hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
+
+
+def indicator_key(data):
+    """Cache key of a price frame: the close fingerprint plus a hash of the opens (for bar colors)"""
+    if 'date' in data:
+        key = series_fingerprint(data)['key']
+    else:
+        key = _hash(data['close']) + f"-{len(data)}"
+    if 'open' in data:
+        key += '-' + _hash(data['open'])
+    return key
+
+
+def compute_indicators(data):
+    """
+    Every overlay the charts and indicator panels use, in one pass over the series
+
+    Args:
+        data (pd.DataFrame): Price data with a close column (open optional)
+
+    Returns:
+        pd.DataFrame: Indicator columns aligned with data's index: SMA_n, EMA_n, RSI,
+            MACD, MACD_Signal, MACD_Histogram, BB_Upper/Lower/Middle and volume_color
+    """
+    close = data['close'].astype(float)
+    columns = {}
+    for window in SMA_WINDOWS:
+        columns[f'SMA_{window}'] = close.rolling(window=window).mean()
+    for span in EMA_SPANS:
+        columns[f'EMA_{span}'] = close.ewm(span=span).mean()
+
+    # RSI (Relative Strength Index)
+    delta = close.diff().to_numpy()
+    gain = pd.Series(np.where(delta > 0, delta, 0.0), index=close.index).rolling(window=14).mean()
+    loss = pd.Series(np.where(delta < 0, -delta, 0.0), index=close.index).rolling(window=14).mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns['RSI'] = 100 - (100 / (1 + gain / loss))
+
+    # MACD (Moving Average Convergence Divergence)
+    columns['MACD'] = columns['EMA_12'] - columns['EMA_26']
+    columns['MACD_Signal'] = columns['MACD'].ewm(span=9).mean()
+    columns['MACD_Histogram'] = columns['MACD'] - columns['MACD_Signal']
+
+    # Bollinger Bands
+    bb_std_dev = close.rolling(window=20).std()
+    columns['BB_Upper'] = columns['SMA_20'] + bb_std_dev * 2
+    columns['BB_Lower'] = columns['SMA_20'] - bb_std_dev * 2
+    columns['BB_Middle'] = columns['SMA_20']
+
+    # Volume bar colors: red on down bars
+    if 'open' in data:
+        columns['volume_color'] = np.where(close.to_numpy() < data['open'].to_numpy(dtype=float), 'red', 'green')
+    else:
+        columns['volume_color'] = np.full(len(close), 'green')
+
+    return pd.DataFrame(columns, index=data.index)
+
+
+class IndicatorCache:
+    """In-memory LRU of indicator frames keyed by the price data's fingerprint
+
+    The same history is typically charted, summarised and screened several
+    times per rerun; with the cache its rolling windows are computed once.
+    Returned frames are shared and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=64):
+        """
+        Args:
+            max_entries (int): Indicator frames kept before the least recently used is dropped
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, data):
+        """
+        Indicator frame of a price series, computed on first request
+
+        Args:
+            data (pd.DataFrame): Price data with date and close columns (open optional)
+
+        Returns:
+            pd.DataFrame: compute_indicators(data)
+        """
+        key = indicator_key(data)
+        with self._lock:
+            indicators = self._entries.get(key)
+            if indicators is not None and indicators.index.equals(data.index):
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return indicators
+
+        indicators = compute_indicators(data)
+        with self._lock:
+            self._entries[key] = indicators
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stats['misses'] += 1
+        return indicators
+
+    def clear(self):
+        """Drop every cached frame"""
+        with self._lock:
+            self._entries.clear()
+
+
+_default_cache = None
+
+
+def get_indicator_cache():
+    """Get the process-wide indicator cache"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = IndicatorCache()
+    return _default_cache
@@ -0,0 +1,179 @@
+"""
+Fast JSON parsing and schema-learning price extraction for PSX responses
+"""
+import json
+import re
+from urllib.parse import urlparse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+# Start of an embedded payload: `var x =`, `window.x =` or `data-market=`, followed by [ or {
+_PAYLOAD_START = re.compile(r'(?:\bvar\s+\w+\s*=|\bwindow\.\w+\s*=|data-market\s*=)\s*(?=[\[{])', re.IGNORECASE)
+_decoder = json.JSONDecoder()
+
+
+def loads(payload):
+    """
+    Parse a JSON document with orjson when available
+
+    Args:
+        payload (bytes/str): Raw JSON
+
+    Returns:
+        object: Parsed JSON value
+    """
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def find_embedded_json(text):
+    """
+    Yield JSON values assigned in inline scripts or data attributes
+
+    The page is scanned once from left to right: each assignment start is
+    located with a non-backtracking pattern and the value is decoded in place
+    with ``raw_decode``, which also tells where the value ends. Scanning then
+    resumes after that value, so no character is examined twice.
+
+    Args:
+        text (str): Page HTML
+
+    Yields:
+        object: Each decodable list or dict payload
+    """
+    position = 0
+    while True:
+        match = _PAYLOAD_START.search(text, position)
+        if match is None:
+            return
+        try:
+            value, position = _decoder.raw_decode(text, match.end())
+        except ValueError:
+            # Not strict JSON (e.g. a JS object literal) - skip past the opening bracket
+            position = match.end() + 1
+            continue
+        yield value
+
+
+def compile_path(path):
+    """
+    Compile a key path into a direct accessor
+
+    Args:
+        path (tuple): Keys to follow, e.g. ('quote', 'price')
+
+    Returns:
+        callable: Function mapping a parsed document to the value at the path;
+            raises KeyError/TypeError when the document does not match
+    """
+    if len(path) == 1:
+        (first,) = path
+        return lambda data: data[first]
+    if len(path) == 2:
+        first, second = path
+        return lambda data: data[first][second]
+
+    def accessor(data):
+        for key in path:
+            data = data[key]
+        return data
+    return accessor
+
+
+class SchemaLearningExtractor:
+    """Extract prices from JSON responses and remember which path worked per endpoint
+
+    The first response from an endpoint is probed against every candidate
+    path. The path that yields a valid price is compiled into an accessor and
+    tried first on later responses, so a known endpoint costs one lookup.
+    """
+
+    DEFAULT_PATHS = (
+        ('kse100', 'current'),
+        ('kse100', 'value'),
+        ('index', 'current'),
+        ('current_price',),
+        ('price',),
+        ('value',),
+        ('last',),
+        ('close',),
+        ('lastPrice',),
+        ('currentPrice',),
+        ('quote', 'price'),
+        ('stock', 'current'),
+        ('data', 'price'),
+        ('result', 'price')
+    )
+
+    def __init__(self, paths=None):
+        self.paths = tuple(tuple(path) for path in (paths or self.DEFAULT_PATHS))
+        self._compiled = [(path, compile_path(path)) for path in self.paths]
+        self.learned = {}
+
+    @staticmethod
+    def endpoint_key(url, symbol=None):
+        """
+        Build the schema key for a URL: host plus path with the symbol templated out
+
+        Args:
+            url (str): Request URL
+            symbol (str): Symbol embedded in the URL, if any
+
+        Returns:
+            str: Key such as 'dps.psx.com.pk/stock/{symbol}/live'
+        """
+        parsed = urlparse(url)
+        path = parsed.path
+        if symbol:
+            path = path.replace(symbol, '{symbol}').replace(symbol.lower(), '{symbol}')
+        return parsed.netloc + path
+
+    @staticmethod
+    def _to_price(value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        return float(str(value).replace(',', ''))
+
+    def extract(self, key, data, is_valid=None):
+        """
+        Extract a price from a parsed JSON document
+
+        Args:
+            key (str): Endpoint key (see endpoint_key)
+            data (object): Parsed JSON document
+            is_valid (callable): Optional price validator
+
+        Returns:
+            float: First valid price, or None
+        """
+        learned = self.learned.get(key)
+        if learned is not None:
+            price = self._try(learned[1], data, is_valid)
+            if price is not None:
+                return price
+
+        if not isinstance(data, dict):
+            return None
+
+        for path, accessor in self._compiled:
+            if path[0] not in data or (learned is not None and path == learned[0]):
+                continue
+            price = self._try(accessor, data, is_valid)
+            if price is not None:
+                self.learned[key] = (path, accessor)
+                return price
+
+        return None
+
+    def _try(self, accessor, data, is_valid):
+        try:
+            price = self._to_price(accessor(data))
+        except (KeyError, TypeError, ValueError, IndexError):
+            return None
+        if is_valid is not None and not is_valid(price):
+            return None
+        return price
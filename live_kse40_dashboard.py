@@ -11,6 +11,10 @@ import re
 import json
 # from streamlit_autorefresh import st_autorefresh
 import pytz
+from simulation import get_simulation_service
+from online_trend import OnlineTrendModel
+from figure_cache import get_figure_cache
+from visualization import ChartVisualizer
 
 class LiveKSE40Dashboard:
     """Live 5-minute dashboard for comprehensive KSE-100 companies (120+ companies)"""
@@ -259,6 +263,14 @@ class LiveKSE40Dashboard:
             'CSAP': 8.00
         }
         
+        # Deterministic per-symbol random streams (never reseeds the global RNG)
+        self.simulator = get_simulation_service()
+        
+        # Running per-symbol trend fits over 5-minute bars
+        self.online_trend = OnlineTrendModel(forgetting=0.97, time_unit=300)
+        
+        self.visualizer = ChartVisualizer()
+        
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -272,7 +284,11 @@ class LiveKSE40Dashboard:
             # Try to fetch from PSX market summary
             psx_data = self._fetch_psx_market_data()
             
-            for symbol, company_name in self.top40_companies.items():
+            symbols = list(self.top40_companies.keys())
+            base_prices = np.empty(len(symbols))
+            data_sources = []
+            
+            for i, symbol in enumerate(symbols):
                 current_price = self.price_estimates[symbol]
                 data_source = 'estimated'
                 
@@ -292,71 +308,82 @@ class LiveKSE40Dashboard:
                                 data_source = 'psx_live'
                                 break
                 
-                # Enhanced prediction accuracy with realistic market patterns
-                pakistan_time = self.get_pakistan_time()
-                today_seed = int(pakistan_time.strftime('%Y%m%d'))
-                np.random.seed(hash(symbol + str(today_seed)) % 10000)
-
-                hour = pakistan_time.hour
-                minute = pakistan_time.minute
-
-                # Base market conditions
-                market_trend = self._calculate_market_trend(symbol)
-                sector_sentiment = self._get_sector_sentiment(symbol)
-
-                if (hour > 9 or (hour == 9 and minute >= 30)) and (hour < 17 or (hour == 17 and minute <= 30)):  # Market hours 9:30 AM to 5:30 PM PKT
-                    # Time-based volatility patterns
-                    if 9 <= hour <= 11:  # Morning session - highest volatility
-                        base_volatility = current_price * 0.005
-                        trend_bias = market_trend * 0.7  # Strong trend influence
-                    elif 11 <= hour <= 13:  # Mid-morning
-                        base_volatility = current_price * 0.003
-                        trend_bias = market_trend * 0.5
-                    elif 13 <= hour <= 15:  # Afternoon - lower activity
-                        base_volatility = current_price * 0.001
-                        trend_bias = market_trend * 0.2
-                    else:  # Late afternoon session
-                        base_volatility = current_price * 0.004
-                        trend_bias = market_trend * 0.6
-
-                    # Add sector sentiment influence
-                    sentiment_modifier = 1 + (sector_sentiment * 0.3)
-                    volatility = base_volatility * sentiment_modifier
-
-                    # Generate price movement with trend bias
-                    random_component = np.random.normal(0, volatility)
-                    trend_component = trend_bias * current_price * 0.001
-                    price_change = random_component + trend_component
-
-                else:
-                    # After market hours - very low volatility with slight drift
-                    price_change = np.random.normal(market_trend * current_price * 0.0002,
-                                                  current_price * 0.0003)
-
-                current_price += price_change
-                
-                # Generate volume
-                volume = np.random.randint(10000, 1000000)
-                
-                # Calculate change from yesterday (simulated)
-                yesterday_close = current_price * np.random.uniform(0.97, 1.03)
-                change = current_price - yesterday_close
-                change_pct = (change / yesterday_close) * 100
-                
+                base_prices[i] = current_price
+                data_sources.append(data_source)
+            
+            # Enhanced prediction accuracy with realistic market patterns
+            pakistan_time = self.get_pakistan_time()
+            today_seed = int(pakistan_time.strftime('%Y%m%d'))
+
+            hour = pakistan_time.hour
+            minute = pakistan_time.minute
+
+            # Base market conditions
+            market_trend = np.array([self._calculate_market_trend(symbol) for symbol in symbols])
+            sector_sentiment = np.array([self._get_sector_sentiment(symbol) for symbol in symbols])
+
+            # Per-symbol streams: one normal for the move, four uniforms for volume/close/high/low
+            z = self.simulator.standard_normal(symbols, today_seed, stream='price')
+            u = self.simulator.uniform(symbols, today_seed, size=4, stream='quote')
+
+            if (hour > 9 or (hour == 9 and minute >= 30)) and (hour < 17 or (hour == 17 and minute <= 30)):  # Market hours 9:30 AM to 5:30 PM PKT
+                # Time-based volatility patterns
+                if 9 <= hour <= 11:  # Morning session - highest volatility
+                    volatility_factor, trend_factor = 0.005, 0.7  # Strong trend influence
+                elif 11 <= hour <= 13:  # Mid-morning
+                    volatility_factor, trend_factor = 0.003, 0.5
+                elif 13 <= hour <= 15:  # Afternoon - lower activity
+                    volatility_factor, trend_factor = 0.001, 0.2
+                else:  # Late afternoon session
+                    volatility_factor, trend_factor = 0.004, 0.6
+
+                # Add sector sentiment influence
+                sentiment_modifier = 1 + (sector_sentiment * 0.3)
+                volatility = base_prices * volatility_factor * sentiment_modifier
+
+                # Generate price movement with trend bias
+                random_component = z * volatility
+                trend_component = market_trend * trend_factor * base_prices * 0.001
+                price_change = random_component + trend_component
+
+            else:
+                # After market hours - very low volatility with slight drift
+                price_change = market_trend * base_prices * 0.0002 + z * base_prices * 0.0003
+
+            current_prices = base_prices + price_change
+            
+            # Generate volume
+            volumes = (10000 + u[:, 0] * (1000000 - 10000)).astype(np.int64)
+            
+            # Calculate change from yesterday (simulated)
+            yesterday_close = current_prices * (0.97 + u[:, 1] * 0.06)
+            changes = current_prices - yesterday_close
+            change_pcts = (changes / yesterday_close) * 100
+            highs = current_prices * (1.001 + u[:, 2] * 0.019)
+            lows = current_prices * (0.98 + u[:, 3] * 0.019)
+            
+            # One O(1) online-trend update per symbol and 5-minute bar (reruns within a bar are
+            # skipped), then next-bar forecasts for all of them
+            timestamp = self.get_pakistan_time()
+            self.online_trend.update_many(symbols, current_prices, timestamp=timestamp)
+            next_prices = self.online_trend.predict_many(symbols, 1)
+            
+            for i, symbol in enumerate(symbols):
                 live_data[symbol] = {
-                    'company_name': company_name,
-                    'current_price': current_price,
-                    'change': change,
-                    'change_pct': change_pct,
-                    'volume': volume,
-                    'high': current_price * np.random.uniform(1.001, 1.02),
-                    'low': current_price * np.random.uniform(0.98, 0.999),
-                    'data_source': data_source,
-                    'timestamp': self.get_pakistan_time()
+                    'company_name': self.top40_companies[symbol],
+                    'current_price': float(current_prices[i]),
+                    'change': float(changes[i]),
+                    'change_pct': float(change_pcts[i]),
+                    'volume': int(volumes[i]),
+                    'high': float(highs[i]),
+                    'low': float(lows[i]),
+                    'data_source': data_sources[i],
+                    'next_price': None if np.isnan(next_prices[i]) else float(next_prices[i]),
+                    'timestamp': timestamp
                 }
                 
                 # Update price estimate for next iteration
-                self.price_estimates[symbol] = current_price
+                self.price_estimates[symbol] = float(current_prices[i])
         
         except Exception as e:
             st.error(f"Error fetching live data: {str(e)}")
@@ -551,15 +578,11 @@ class LiveKSE40Dashboard:
     def _calculate_market_trend(self, symbol):
         """Calculate market trend for a symbol based on various factors"""
         try:
-            # Base trend calculation using symbol characteristics
-            symbol_hash = hash(symbol) % 100
             today_seed = int(self.get_pakistan_time().strftime('%Y%m%d'))
 
             # Combine symbol and date for consistent but changing trends
-            trend_seed = hash(symbol + str(today_seed)) % 1000
-
             # Generate trend between -0.5 and 0.5 (representing -50% to +50% bias)
-            trend = (trend_seed / 1000.0) - 0.5
+            trend = self.simulator.unit_value(symbol, today_seed, stream='trend') - 0.5
 
             # Adjust trend based on sector performance
             sector_multiplier = self._get_sector_performance_multiplier(symbol)
@@ -765,6 +788,7 @@ class LiveKSE40Dashboard:
                 'Volume': f"{data['volume']:,}",
                 'High': f"{data['high']:,.2f}",
                 'Low': f"{data['low']:,.2f}",
+                'Next 5-Min': f"{data['next_price']:,.2f}" if data.get('next_price') is not None else "—",
                 'Trend': trend,
                 'Source': source_emoji
             })
@@ -839,29 +863,34 @@ class LiveKSE40Dashboard:
             'Additional': ['THCCL', 'GHNI', 'SAZEW', 'HALEON', 'NCPL', 'PKGP', 'SGPL', 'UNITY', 'NML', 'YOUW', 'KTML', 'PSX', 'HMB', 'DHPL', 'GHGL', 'DCR', 'ILP', 'ISL', 'HGFA', 'LCI', 'AGP', 'PABC', 'TGL', 'INIL', 'BNWM', 'SCBPL', 'SHIFA', 'PSEL', 'IBFL', 'FNEL', 'CEPB', 'HASCOL', 'TOMCL', 'ZAL', 'BFAGRO', 'FFL']
         }
         
-        sector_performance = []
+        # Columnar snapshot of every symbol; sector stats and the market map are one pass over it
+        sector_of = {symbol: sector_name for sector_name, symbols in sectors.items() for symbol in symbols}
+        snapshot = pd.DataFrame.from_dict(live_data, orient='index')
+        if snapshot.empty:
+            st.info("No live data available for the sector view.")
+            return
+        snapshot['symbol'] = snapshot.index
+        snapshot['sector'] = snapshot['symbol'].map(sector_of)
         
-        for sector_name, symbols in sectors.items():
-            sector_companies = [live_data[symbol] for symbol in symbols if symbol in live_data]
-            
-            if sector_companies:
-                avg_change = sum(comp['change_pct'] for comp in sector_companies) / len(sector_companies)
-                total_volume = sum(comp['volume'] for comp in sector_companies)
-                gainers_count = sum(1 for comp in sector_companies if comp['change_pct'] > 0)
-                
-                sector_performance.append({
-                    'Sector': sector_name,
-                    'Avg Change %': f"{avg_change:+.2f}%",
-                    'Companies': len(sector_companies),
-                    'Gainers': gainers_count,
-                    'Total Volume': f"{total_volume:,}",
-                    'Performance': "🚀" if avg_change > 0.5 else "📉" if avg_change < -0.5 else "➡️"
-                })
-        
-        # Sort by average change
-        sector_performance.sort(key=lambda x: float(x['Avg Change %'].rstrip('%')), reverse=True)
-        
-        df_sectors = pd.DataFrame(sector_performance)
+        grouped = snapshot.dropna(subset=['sector']).assign(gainer=lambda df: df['change_pct'] > 0).groupby('sector')
+        df_sectors = pd.DataFrame({
+            'avg_change': grouped['change_pct'].mean(),
+            'Companies': grouped.size(),
+            'Gainers': grouped['gainer'].sum(),
+            'Total Volume': grouped['volume'].sum()
+        }).sort_values('avg_change', ascending=False)
+        
+        avg_change = df_sectors.pop('avg_change')
+        df_sectors.insert(0, 'Avg Change %', avg_change.map(lambda value: f"{value:+.2f}%"))
+        df_sectors['Total Volume'] = df_sectors['Total Volume'].map(lambda value: f"{value:,}")
+        df_sectors['Performance'] = np.select([avg_change > 0.5, avg_change < -0.5], ["🚀", "📉"], default="➡️")
+        df_sectors = df_sectors.rename_axis('Sector').reset_index()
+        
+        # Tiles are sized by traded value (price x volume) as the snapshot carries no share counts
+        st.plotly_chart(
+            self.visualizer.create_market_map(snapshot, title="KSE-100 Market Map (sized by traded value)"),
+            use_container_width=True
+        )
         st.dataframe(df_sectors, use_container_width=True, hide_index=True)
     
     def display_price_movement_chart(self, live_data):
@@ -879,8 +908,6 @@ class LiveKSE40Dashboard:
             st.info("Please select at least one company to display the chart.")
             return
 
-        fig = go.Figure()
-
         # Determine chart period based on market status
         pakistan_time = self.get_pakistan_time()
         today = pakistan_time.date()
@@ -897,41 +924,53 @@ class LiveKSE40Dashboard:
 
         times = pd.date_range(start=start_time, end=end_time, freq='5T')
 
-        for symbol in selected_companies:
-            if symbol in live_data:
-                current_price = live_data[symbol]['current_price']
-                
-                # Enhanced price movement generation with daily variation and market trends
-                today_seed = int(self.get_pakistan_time().strftime('%Y%m%d'))
-                np.random.seed(hash(symbol + str(today_seed)) % 10000)
-
-                # Get market trend and sector sentiment for this symbol
-                market_trend = self._calculate_market_trend(symbol)
-                sector_sentiment = self._get_sector_sentiment(symbol)
-
-                # Generate more realistic price movements
-                base_volatility = 0.0015  # Slightly higher base volatility for chart
-                sentiment_modifier = 1 + (sector_sentiment * 0.2)
-                volatility = base_volatility * sentiment_modifier
-
-                returns = np.random.normal(market_trend * 0.0005, volatility, len(times))
-                cumulative_returns = np.cumprod(1 + returns)
-                prices = current_price * 0.99 * cumulative_returns
-                
-                fig.add_trace(go.Scatter(
-                    x=times,
-                    y=prices,
-                    mode='lines',
-                    name=f"{symbol} (PKR {current_price:.2f})",
-                    line=dict(width=2)
-                ))
-        
+        chart_symbols = [symbol for symbol in selected_companies if symbol in live_data]
+        today_seed = int(self.get_pakistan_time().strftime('%Y%m%d'))
+        # One standard-normal path per symbol, drawn from its own daily stream
+        shocks = self.simulator.standard_normal(chart_symbols, today_seed, size=len(times), stream='chart')
+
+        traces = []
+        for row, symbol in enumerate(chart_symbols):
+            current_price = live_data[symbol]['current_price']
+
+            # Enhanced price movement generation with daily variation and market trends
+            # Get market trend and sector sentiment for this symbol
+            market_trend = self._calculate_market_trend(symbol)
+            sector_sentiment = self._get_sector_sentiment(symbol)
+
+            # Generate more realistic price movements
+            base_volatility = 0.0015  # Slightly higher base volatility for chart
+            sentiment_modifier = 1 + (sector_sentiment * 0.2)
+            volatility = base_volatility * sentiment_modifier
+
+            returns = market_trend * 0.0005 + volatility * shocks[row]
+            cumulative_returns = np.cumprod(1 + returns)
+            prices = current_price * 0.99 * cumulative_returns
+
+            traces.append({'x': times, 'y': prices, 'name': f"{symbol} (PKR {current_price:.2f})"})
+
         if market_open:
             chart_title = f"🔮 Selected Companies ({len(selected_companies)}) - 5-Minute Price Predictions (9:30 AM to 5:30 PM)"
         else:
             chart_title = f"🔮 Selected Companies ({len(selected_companies)}) - 5-Minute Price Predictions (5:30 PM to Next 8 Hours)"
+
+        # Layout and traces are reused while the selection is unchanged; only prices are replaced
+        fig = get_figure_cache().figure(
+            'price_movement', None,
+            lambda: self._build_price_movement_chart(len(traces)),
+            traces,
+            signature=tuple(chart_symbols),
+            layout={'title': chart_title}
+        )
+
+        st.plotly_chart(fig, use_container_width=True)
+
+    def _build_price_movement_chart(self, n_traces):
+        """Price movement chart layout with one styled, empty line per company"""
+        fig = go.Figure()
+        for _ in range(n_traces):
+            fig.add_trace(go.Scatter(mode='lines', line=dict(width=2)))
         fig.update_layout(
-            title=chart_title,
             xaxis_title="Time",
             yaxis_title="Price (PKR)",
             height=500,
@@ -939,8 +978,7 @@ class LiveKSE40Dashboard:
             legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.02)
         )
         fig.update_xaxes(tickformat='%I:%M %p')
-        
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
     
     def display_watchlist(self, live_data):
         """Display customizable watchlist for favorite companies"""
@@ -0,0 +1,390 @@
+"""
+Process-pool execution backend for fitting forecast models across many symbols
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+
+def _fit_linear_trend(historical_data, days_ahead):
+    from forecasting import StockForecaster
+    return StockForecaster()._linear_trend_forecast(historical_data, days_ahead)
+
+
+def _fit_moving_average(historical_data, days_ahead):
+    from forecasting import StockForecaster
+    return StockForecaster()._moving_average_forecast(historical_data, days_ahead)
+
+
+def _fit_prophet(historical_data, days_ahead):
+    from prophet import Prophet
+    from forecast_cache import get_forecast_cache
+
+    def fit(data):
+        model = Prophet(daily_seasonality=False)
+        model.fit(data.rename(columns={'date': 'ds', 'close': 'y'})[['ds', 'y']])
+        future = model.make_future_dataframe(periods=int(days_ahead), freq='D', include_history=False)
+        return model.predict(future)[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+
+    # Prophet fits are slow; identical histories reuse the forecast stored on disk
+    return get_forecast_cache().get_or_fit(
+        historical_data, 'prophet', fit,
+        config={'days_ahead': int(days_ahead), 'daily_seasonality': False}
+    )
+
+
+# Model name -> module-level fit function (must be picklable for the worker processes)
+MODEL_FUNCTIONS = {
+    'linear_trend': _fit_linear_trend,
+    'moving_average': _fit_moving_average,
+    'prophet': _fit_prophet
+}
+
+# Seconds a single fit may take before its result is abandoned
+DEFAULT_BUDGETS = {
+    'linear_trend': 5.0,
+    'moving_average': 5.0,
+    'prophet': 60.0
+}
+
+
+def _open_shared(shm_name):
+    """Attach to a shared-memory block owned (and unlinked) by the parent"""
+    try:
+        return shared_memory.SharedMemory(name=shm_name, track=False)
+    except TypeError:
+        # Python < 3.13 always tracks; workers share the parent's resource tracker, so
+        # the duplicate registration is harmless and the parent still owns the unlink
+        return shared_memory.SharedMemory(name=shm_name)
+
+
+def _attach_series(shm_name, length):
+    """Rebuild a date/close frame from a shared-memory block written by _share_series"""
+    shm = _open_shared(shm_name)
+    try:
+        dates = np.ndarray((length,), dtype='int64', buffer=shm.buf)
+        closes = np.ndarray((length,), dtype='float64', buffer=shm.buf, offset=8 * length)
+        return pd.DataFrame({'date': pd.to_datetime(dates.copy()), 'close': closes.copy()})
+    finally:
+        shm.close()
+
+
+def _mark_started(starts_name, slot):
+    """Record the wall-clock start of a fit in the batch's shared start-time block"""
+    shm = _open_shared(starts_name)
+    try:
+        np.ndarray((slot + 1,), dtype='float64', buffer=shm.buf)[slot] = time.time()
+    finally:
+        shm.close()
+
+
+def _run_fit(model, shm_name, length, days_ahead, starts_name=None, slot=0):
+    """Worker entry point: attach the shared series and fit one model"""
+    if starts_name is not None:
+        _mark_started(starts_name, slot)
+    start = time.perf_counter()
+    historical_data = _attach_series(shm_name, length)
+    forecast = MODEL_FUNCTIONS[model](historical_data, days_ahead)
+    return forecast, time.perf_counter() - start
+
+
+def _share_series(historical_data):
+    """Copy a series' dates and closes into one shared-memory block: [int64 dates | float64 closes]"""
+    data = historical_data[['date', 'close']].dropna()
+    length = len(data)
+    shm = shared_memory.SharedMemory(create=True, size=max(16 * length, 1))
+    np.ndarray((length,), dtype='int64', buffer=shm.buf)[:] = (
+        pd.to_datetime(data['date']).values.astype('datetime64[ns]').astype('int64')
+    )
+    np.ndarray((length,), dtype='float64', buffer=shm.buf, offset=8 * length)[:] = data['close'].values
+    return shm, length
+
+
+def ensemble_forecasts(forecasts):
+    """
+    Average the available model forecasts point by point
+
+    Args:
+        forecasts (dict): Model name -> forecast DataFrame (ds, yhat, yhat_lower, yhat_upper)
+
+    Returns:
+        pd.DataFrame: Mean forecast, or None when no model finished
+    """
+    frames = [df for df in forecasts.values() if df is not None and not df.empty]
+    if not frames:
+        return None
+    length = min(len(df) for df in frames)
+    ensemble = frames[0][['ds']].iloc[:length].reset_index(drop=True).copy()
+    for column in ('yhat', 'yhat_lower', 'yhat_upper'):
+        ensemble[column] = np.mean([df[column].values[:length] for df in frames], axis=0)
+    return ensemble
+
+
+class FitResult:
+    """Outcome of one (symbol, model) fit"""
+
+    def __init__(self, symbol, model, status, forecast=None, elapsed=None, error=None):
+        self.symbol = symbol
+        self.model = model
+        self.status = status  # 'ok', 'failed', 'timeout' or 'cancelled'
+        self.forecast = forecast
+        self.elapsed = elapsed
+        self.error = error
+
+    def __repr__(self):
+        return f"FitResult({self.symbol!r}, {self.model!r}, {self.status!r})"
+
+
+class FitBatch:
+    """Handle for fits submitted together; yields results as they finish"""
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, backend, futures, shared_blocks, starts=None):
+        self.backend = backend
+        self._futures = futures  # future -> (symbol, model, budget seconds, start slot)
+        self._shared_blocks = shared_blocks
+        self._starts = starts  # shared block the workers write each fit's start time into
+        self._stuck = False
+        self.results = {}
+
+    def _started_at(self, future):
+        """Wall-clock time a worker picked the fit up, or None while it is still queued"""
+        if self._starts is None:
+            return None
+        slot = self._futures[future][3]
+        started = float(np.ndarray((slot + 1,), dtype='float64', buffer=self._starts.buf)[slot])
+        return started or None
+
+    def as_completed(self, timeout=None):
+        """
+        Yield FitResult objects in completion order
+
+        A fit's budget starts when a worker process begins it (the worker
+        records the time in shared memory), so waiting in the pool's queue
+        does not count against it. Fits that exceed their model's budget are
+        reported as 'timeout'; if any were still running, the worker pool is
+        recycled once no other batch is using it, so they stop consuming CPU.
+
+        Args:
+            timeout (float): Overall wait limit in seconds; remaining fits are cancelled
+
+        Yields:
+            FitResult: One per submitted fit
+        """
+        overall = None if timeout is None else time.time() + timeout
+        pending = set(self._futures)
+        deadlines = {}
+
+        try:
+            while pending:
+                now = time.time()
+                for future in pending:
+                    if future not in deadlines:
+                        started = self._started_at(future)
+                        if started is not None:
+                            deadlines[future] = started + self._futures[future][2]
+
+                # Wake up at the next budget expiry, or poll for fits that have not started yet
+                wake_times = [deadlines[future] for future in pending if future in deadlines]
+                if len(wake_times) < len(pending):
+                    wake_times.append(now + self.POLL_INTERVAL)
+                if overall is not None:
+                    wake_times.append(overall)
+
+                done, _ = wait(pending, timeout=max(0.0, min(wake_times) - now), return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    yield self._record(future)
+
+                now = time.time()
+                for future in list(pending):
+                    symbol, model = self._futures[future][:2]
+                    expired = future in deadlines and now >= deadlines[future]
+                    if expired or (overall is not None and now >= overall):
+                        pending.discard(future)
+                        if not future.cancel():
+                            self._stuck = True
+                        yield self._store(FitResult(symbol, model, 'timeout' if expired else 'cancelled'))
+        finally:
+            for future in pending:
+                future.cancel()
+            self.close()
+
+    def collect(self, timeout=None):
+        """
+        Wait for every fit (within budgets) and group results by symbol
+
+        Returns:
+            dict: symbol -> {model: FitResult}
+        """
+        for _ in self.as_completed(timeout):
+            pass
+        return self.results
+
+    def cancel(self):
+        """Cancel fits that have not started yet"""
+        for future in self._futures:
+            future.cancel()
+
+    def close(self):
+        """Release the shared-memory blocks and hand the batch back to the backend"""
+        blocks = self._shared_blocks + ([self._starts] if self._starts is not None else [])
+        self._shared_blocks, self._starts = [], None
+        for shm in blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.backend._release(self, self._stuck)
+
+    def _record(self, future):
+        symbol, model = self._futures[future][:2]
+        if future.cancelled():
+            return self._store(FitResult(symbol, model, 'cancelled'))
+        error = future.exception()
+        if error is not None:
+            return self._store(FitResult(symbol, model, 'failed', error=error))
+        forecast, elapsed = future.result()
+        status = 'ok' if forecast is not None else 'failed'
+        return self._store(FitResult(symbol, model, status, forecast=forecast, elapsed=elapsed))
+
+    def _store(self, result):
+        self.results.setdefault(result.symbol, {})[result.model] = result
+        return result
+
+
+class ModelExecutionBackend:
+    """Fit candidate models for many symbols in a pool of worker processes
+
+    Input series are placed in shared memory once per symbol, so each fit only
+    ships a block name to the worker. Every model has a time budget; results
+    stream back in completion order, which lets callers build an ensemble from
+    the fast models while slow ones (e.g. Prophet) are still running.
+    """
+
+    def __init__(self, max_workers=None, budgets=None, start_method='spawn'):
+        """
+        Args:
+            max_workers (int): Worker processes; defaults to the CPU count
+            budgets (dict): Model name -> seconds, overriding DEFAULT_BUDGETS
+            start_method (str): multiprocessing start method ('spawn' is safe with Streamlit threads)
+        """
+        self.max_workers = max_workers
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.start_method = start_method
+        self._executor = None
+        self._lock = threading.Lock()
+        self._active = set()  # batches whose fits may still be in the pool
+        self._restart_requested = False
+
+    def _get_executor(self):
+        if self._executor is None:
+            context = multiprocessing.get_context(self.start_method)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._executor
+
+    @staticmethod
+    def available_models():
+        """Model names whose dependencies are importable in this environment"""
+        models = ['linear_trend', 'moving_average']
+        try:
+            import prophet  # noqa: F401
+            models.append('prophet')
+        except ImportError:
+            pass
+        return models
+
+    def submit(self, data_by_symbol, models=None, days_ahead=1):
+        """
+        Submit fits for every (symbol, model) pair
+
+        Args:
+            data_by_symbol (dict): Symbol -> DataFrame with date and close columns
+            models (list): Model names; defaults to available_models()
+            days_ahead (int): Forecast length
+
+        Returns:
+            FitBatch: Handle to iterate over or collect the results
+        """
+        models = models or self.available_models()
+        series = {
+            symbol: historical_data for symbol, historical_data in data_by_symbol.items()
+            if historical_data is not None and not historical_data.empty
+        }
+        futures, shared_blocks = {}, []
+        # One float64 start time per fit, zero until a worker picks the fit up
+        starts = shared_memory.SharedMemory(create=True, size=max(8 * len(series) * len(models), 8))
+        np.ndarray((starts.size // 8,), dtype='float64', buffer=starts.buf)[:] = 0.0
+
+        with self._lock:
+            executor = self._get_executor()
+            try:
+                for symbol, historical_data in series.items():
+                    shm, length = _share_series(historical_data)
+                    shared_blocks.append(shm)
+                    for model in models:
+                        slot = len(futures)
+                        future = executor.submit(_run_fit, model, shm.name, length, int(days_ahead),
+                                                 starts.name, slot)
+                        futures[future] = (symbol, model, self.budgets.get(model, 30.0), slot)
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                for shm in shared_blocks + [starts]:
+                    shm.close()
+                    shm.unlink()
+                raise
+            batch = FitBatch(self, futures, shared_blocks, starts)
+            self._active.add(batch)
+        return batch
+
+    def _release(self, batch, stuck=False):
+        """Forget a finished batch; recycle the pool once no batch still depends on it"""
+        with self._lock:
+            self._active.discard(batch)
+            self._restart_requested = self._restart_requested or stuck
+            if not self._restart_requested or self._active:
+                return
+            self._restart_requested = False
+            self._terminate()
+
+    def restart(self):
+        """Terminate the worker processes (stopping every running fit) and start fresh on next submit"""
+        with self._lock:
+            self._restart_requested = False
+            self._terminate()
+
+    def _terminate(self):
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        # ProcessPoolExecutor has no public way to stop a running task; terminate the workers
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def get_model_backend():
+    """Get the process-wide model execution backend (its worker pool starts on first submit)"""
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = ModelExecutionBackend()
+        return _default_backend
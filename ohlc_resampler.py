@@ -0,0 +1,245 @@
+"""
+Streaming OHLCV bar aggregation for tick and intraday uploads
+"""
+import numpy as np
+import pandas as pd
+from schema_inference import VOLUME_WORDS, infer_schema, parse_datetime_column, parse_numeric_column
+
+# Bar interval -> seconds
+INTERVALS = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '1h': 60 * 60,
+    '1d': 24 * 60 * 60
+}
+
+BAR_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+# Names of the close column, preferred over the schema's first price candidate (often 'Open')
+CLOSE_WORDS = ('close', 'price', 'last')
+
+# Names of the optional open/high/low/volume columns of an upload
+FIELD_WORDS = {
+    'open': ('open',),
+    'high': ('high',),
+    'low': ('low',),
+    'volume': VOLUME_WORDS
+}
+
+
+def _group_starts(keys):
+    """Start positions of the runs of equal values in a sorted int64 array"""
+    return np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+
+
+class OHLCResampler:
+    """One-pass OHLCV aggregation over int64 nanosecond timestamps
+
+    Rows arrive in chunks of any size and order. Each chunk is reduced to
+    partial bars (bar id, first/last timestamp, open, high, low, close,
+    volume) with one sort and a handful of ``reduceat`` calls. Partial bars
+    combine associatively, so bars that straddle chunks, and files stored
+    newest-first, come out the same as a single pass over sorted data. Memory
+    holds only partial bars, never the raw rows.
+    """
+
+    def __init__(self, interval='5m'):
+        """
+        Args:
+            interval (str): One of INTERVALS ('1m', '5m', '15m', '1h', '1d')
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown bar interval '{interval}'; expected one of {list(INTERVALS)}")
+        self.interval = interval
+        self.step = np.int64(INTERVALS[interval] * 1_000_000_000)
+        self.tz = None
+        self.rows = 0
+        self._partials = []
+        self._pending = 0
+
+    @staticmethod
+    def _reduce(bar, first_ts, last_ts, open_, high, low, close, volume):
+        """Combine rows (or partial bars) sharing a bar id into one partial bar per id"""
+        order = np.lexsort((first_ts, bar))
+        # The close comes from the latest row of each bar, which need not be the last by first_ts
+        by_last = np.lexsort((last_ts, bar))
+        sorted_bar = bar[order]
+        starts = _group_starts(sorted_bar)
+        ends = np.concatenate((starts[1:], [len(bar)])) - 1
+
+        return (
+            sorted_bar[starts],
+            first_ts[order][starts],
+            last_ts[by_last][ends],
+            open_[order][starts],
+            np.maximum.reduceat(high[order], starts),
+            np.minimum.reduceat(low[order], starts),
+            close[by_last][ends],
+            np.add.reduceat(volume[order], starts)
+        )
+
+    def update(self, timestamps, close, open_=None, high=None, low=None, volume=None):
+        """
+        Add a chunk of rows
+
+        Args:
+            timestamps (array-like): Row times (datetime-like)
+            close (array-like): Trade or close prices
+            open_, high, low (array-like): Optional per-row OHLC (e.g. when re-aggregating bars);
+                default to close
+            volume (array-like): Optional per-row volume; missing volume counts as 0
+
+        Returns:
+            int: Rows accepted from this chunk (rows without a time or price are skipped)
+        """
+        times = pd.DatetimeIndex(pd.to_datetime(timestamps))
+        if times.tz is not None:
+            self.tz = self.tz or times.tz
+            times = times.tz_convert('UTC').tz_localize(None)
+        ts = times.values.astype('datetime64[ns]').astype(np.int64)
+
+        close = np.asarray(close, dtype=float)
+        fields = [np.asarray(values, dtype=float) if values is not None else close
+                  for values in (open_, high, low)]
+        volume = np.nan_to_num(np.asarray(volume, dtype=float)) if volume is not None else np.zeros(len(close))
+
+        keep = ~np.isnat(times.values) & np.isfinite(close)
+        if not keep.all():
+            ts, close, volume = ts[keep], close[keep], volume[keep]
+            fields = [values[keep] for values in fields]
+        if len(ts) == 0:
+            return 0
+        # Missing open/high/low fall back to the close of the same row
+        fields = [np.where(np.isfinite(values), values, close) for values in fields]
+
+        self._partials.append(self._reduce(ts // self.step, ts, ts, fields[0], fields[1], fields[2], close, volume))
+        self._pending += 1
+        self.rows += len(ts)
+        if self._pending > 64:
+            self._compact()
+        return len(ts)
+
+    def _compact(self):
+        """Merge the pending partial bars into one set"""
+        if len(self._partials) > 1:
+            merged = [np.concatenate(parts) for parts in zip(*self._partials)]
+            self._partials = [self._reduce(*merged)]
+        self._pending = 0
+
+    def bars(self):
+        """
+        Bars aggregated so far (the last one may still be filling)
+
+        Returns:
+            pd.DataFrame: date (bar start), open, high, low, close, volume; oldest first
+        """
+        self._compact()
+        if not self._partials:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        bar, _, _, open_, high, low, close, volume = self._partials[0]
+        dates = pd.to_datetime(bar * self.step)
+        if self.tz is not None:
+            dates = dates.tz_localize('UTC').tz_convert(self.tz)
+        return pd.DataFrame({
+            'date': dates,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': volume
+        })
+
+    def reset(self):
+        """Forget every row"""
+        self.tz = None
+        self.rows = 0
+        self._partials = []
+        self._pending = 0
+
+
+def _field_columns(columns, schema):
+    """Upload column for each bar field (None when absent)"""
+    def find(words, exclude=()):
+        for col in columns:
+            name = str(col).lower()
+            if col not in exclude and any(word in name for word in words):
+                return col
+        return None
+
+    date_column = schema['date_column']
+    close_column = find(CLOSE_WORDS, exclude=(date_column,)) or schema['price_column']
+    mapping = {'date': date_column, 'close': close_column}
+    for field, words in FIELD_WORDS.items():
+        mapping[field] = find(words, exclude=(date_column, close_column))
+    return mapping
+
+
+def _feed(resampler, chunk, mapping, schema):
+    """Parse one chunk with the schema's formats and add it to the resampler"""
+    def numeric(field):
+        col = mapping.get(field)
+        if col is None or col not in chunk:
+            return None
+        return parse_numeric_column(chunk[col], schema['columns'].get(col)).to_numpy(dtype=float)
+
+    dates = parse_datetime_column(chunk[mapping['date']], schema['columns'][mapping['date']]['format'])
+    return resampler.update(dates, numeric('close'), numeric('open'), numeric('high'),
+                            numeric('low'), numeric('volume'))
+
+
+def resample_frame(df, interval='5m', date_column=None, price_column=None, chunk_rows=250_000):
+    """
+    Aggregate a parsed upload into OHLCV bars
+
+    Args:
+        df (pd.DataFrame): Upload with a date column and a price column (open/high/low/volume optional)
+        interval (str): Bar interval, one of INTERVALS
+        date_column (str): Date column; detected when None
+        price_column (str): Price (close) column; detected when None
+        chunk_rows (int): Rows parsed and reduced at a time
+
+    Returns:
+        pd.DataFrame: date, open, high, low, close, volume bars, oldest first
+    """
+    schema = infer_schema(df)
+    mapping = _field_columns(df.columns, schema)
+    mapping['date'] = date_column or mapping['date']
+    mapping['close'] = price_column or mapping['close']
+    if mapping['date'] is None or mapping['close'] is None:
+        raise ValueError("Resampling needs a date column and a price column")
+
+    resampler = OHLCResampler(interval)
+    for start in range(0, len(df), chunk_rows):
+        _feed(resampler, df.iloc[start:start + chunk_rows], mapping, schema)
+    return resampler.bars()
+
+
+def resample_csv(file, interval='5m', chunk_rows=250_000):
+    """
+    Stream a (possibly huge) CSV file into OHLCV bars without loading it whole
+
+    The schema is inferred from the first chunk; every later chunk is parsed
+    with the formats detected there.
+
+    Args:
+        file: Path or file-like object with CSV text
+        interval (str): Bar interval, one of INTERVALS
+        chunk_rows (int): Rows read per chunk
+
+    Returns:
+        pd.DataFrame: date, open, high, low, close, volume bars, oldest first
+    """
+    if hasattr(file, 'seek'):
+        file.seek(0)
+
+    resampler = OHLCResampler(interval)
+    schema = mapping = None
+    for chunk in pd.read_csv(file, chunksize=chunk_rows, encoding='utf-8-sig'):
+        if schema is None:
+            schema = infer_schema(chunk)
+            mapping = _field_columns(chunk.columns, schema)
+            if mapping['date'] is None or mapping['close'] is None:
+                raise ValueError("Resampling needs a date column and a price column")
+        _feed(resampler, chunk, mapping, schema)
+    return resampler.bars()
@@ -0,0 +1,199 @@
+"""
+Recursive-least-squares online trend model for tick-by-tick price updates
+"""
+import threading
+import numpy as np
+
+# Column layout of the per-symbol state array
+W, SX, SY, SXY, SXX, RW, SR, SR2, LAST, COUNT, LAST_T = range(11)
+_COLUMNS = 11
+
+
+class OnlineTrendModel:
+    """Per-symbol linear trend kept as running regression sums
+
+    Every symbol keeps the (optionally exponentially forgotten) sums of the
+    least-squares trend fit over its ticks, plus the moments of its tick
+    returns. The time axis is re-centred on every update so the newest tick
+    sits at x = 0, which keeps the sums well conditioned however long the
+    model runs. By default each tick is one step on that axis; with a
+    ``time_unit`` ticks are bucketed into bars of that many seconds and the
+    axis counts bars, so forecasts do not depend on how often ticks are
+    polled. Updating a symbol, or all symbols at once, and predicting are
+    O(1) per symbol; with ``forgetting=1`` the forecasts equal a full
+    ``np.polyfit`` refit of StockForecaster._linear_trend_forecast.
+    """
+
+    def __init__(self, forgetting=1.0, min_ticks=5, capacity=256, time_unit=None):
+        """
+        Args:
+            forgetting (float): Weight decay per step (1.0 keeps the whole history, 0.97 ≈ 33-step memory)
+            min_ticks (int): Ticks required before a symbol produces forecasts
+            capacity (int): Initial number of symbol rows
+            time_unit (float): Bar length in seconds when ticks carry timestamps (e.g. 300 for
+                5-minute steps); None makes every tick one step
+        """
+        self.forgetting = float(forgetting)
+        self.time_unit = time_unit
+        self.min_ticks = min_ticks
+        self.symbol_ids = {}
+        self._state = np.zeros((capacity, _COLUMNS))
+        self._lock = threading.RLock()
+
+    def symbol_id(self, symbol):
+        """Get (or assign) the row index of a symbol"""
+        index = self.symbol_ids.get(symbol)
+        if index is None:
+            with self._lock:
+                index = self.symbol_ids.get(symbol)
+                if index is None:
+                    index = len(self.symbol_ids)
+                    if index >= len(self._state):
+                        grown = np.zeros((len(self._state) * 2, _COLUMNS))
+                        grown[:len(self._state)] = self._state
+                        self._state = grown
+                    self.symbol_ids[symbol] = index
+        return index
+
+    def _update_rows(self, rows, prices, seconds=None):
+        """Fold one tick into each of the given state rows (rows must be unique)"""
+        state = self._state[rows]
+        if seconds is None or self.time_unit is None:
+            steps = np.ones(len(rows))
+        else:
+            # Ticks are bucketed into time_unit bars: the first tick of a bar is its point, and
+            # later ticks of the same bar (e.g. the same quote on a rerun) are skipped
+            bars = np.floor(seconds / self.time_unit)
+            has_time = state[:, COUNT] > 0
+            fresh = ~has_time | (bars > state[:, LAST_T])
+            rows, prices, bars, state = rows[fresh], prices[fresh], bars[fresh], state[fresh]
+            steps = np.where(has_time[fresh], bars - state[:, LAST_T], 1.0)
+            state[:, LAST_T] = bars
+
+        # Decay, then shift the time origin back by the elapsed steps: x -> x - dt for all previous ticks
+        state[:, [W, SX, SY, SXY, SXX, RW, SR, SR2]] *= (self.forgetting ** steps)[:, None]
+        state[:, SXX] += steps ** 2 * state[:, W] - 2 * steps * state[:, SX]
+        state[:, SXY] -= steps * state[:, SY]
+        state[:, SX] -= steps * state[:, W]
+
+        # New tick at x = 0 only contributes to the weight and the price sum
+        state[:, W] += 1
+        state[:, SY] += prices
+
+        has_previous = state[:, COUNT] > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.where(has_previous, prices / state[:, LAST] - 1, 0.0)
+        state[:, RW] += has_previous
+        state[:, SR] += returns
+        state[:, SR2] += returns ** 2
+
+        state[:, LAST] = prices
+        state[:, COUNT] += 1
+        self._state[rows] = state
+
+    def update(self, symbol, price, timestamp=None):
+        """
+        Fold one tick into a symbol's trend
+
+        Args:
+            symbol (str): Stock symbol
+            price (float): Latest price
+            timestamp (datetime): Time of the price; with time_unit set, only the first tick
+                of each bar is used and the step is the number of bars since the previous one
+        """
+        if price is None or not price > 0:
+            return
+        seconds = None if timestamp is None else np.array([timestamp.timestamp()])
+        with self._lock:
+            self._update_rows(np.array([self.symbol_id(symbol)]), np.array([float(price)]), seconds)
+
+    def update_many(self, symbols, prices, timestamp=None):
+        """
+        Fold one tick per symbol into every symbol's trend at once
+
+        Args:
+            symbols (list): Stock symbols (unique)
+            prices (array-like): Latest price per symbol; non-positive or NaN prices are skipped
+            timestamp (datetime): Time of the prices (see update)
+        """
+        prices = np.asarray(prices, dtype=float)
+        valid = prices > 0
+        with self._lock:
+            rows = np.array([self.symbol_id(symbol) for symbol in symbols], dtype=np.int64)
+            if valid.any():
+                seconds = None if timestamp is None else np.full(int(valid.sum()), timestamp.timestamp())
+                self._update_rows(rows[valid], prices[valid], seconds)
+
+    def coefficients(self, symbol):
+        """
+        Get the current trend fit of a symbol
+
+        Args:
+            symbol (str): Stock symbol
+
+        Returns:
+            dict: slope (per step), level (fitted value at the latest tick), volatility
+                (std of tick returns) and ticks, or None before min_ticks ticks
+        """
+        index = self.symbol_ids.get(symbol)
+        if index is None:
+            return None
+        w, sx, sy, sxy, sxx, rw, sr, sr2, last, count = self._state[index, :LAST_T]
+        if count < max(self.min_ticks, 2):
+            return None
+
+        denominator = w * sxx - sx ** 2
+        slope = (w * sxy - sx * sy) / denominator if denominator > 0 else 0.0
+        level = (sy - slope * sx) / w
+        volatility = np.sqrt(max((sr2 - sr ** 2 / rw) / (rw - 1), 0.0)) if rw > 1 else 0.0
+        return {'slope': slope, 'level': level, 'volatility': volatility, 'ticks': int(count)}
+
+    def predict(self, symbol, steps=1):
+        """
+        Forecast a symbol some steps ahead
+
+        Args:
+            symbol (str): Stock symbol
+            steps (int/array-like): Steps ahead (ticks, or time units with time_unit)
+
+        Returns:
+            tuple: (yhat, lower, upper) with the same shape as steps (±1.96·σ band),
+                or None before min_ticks ticks
+        """
+        fit = self.coefficients(symbol)
+        if fit is None:
+            return None
+        steps = np.asarray(steps, dtype=float)
+        yhat = fit['level'] + fit['slope'] * steps
+        confidence = yhat * fit['volatility'] * 1.96  # 95% confidence
+        return yhat, yhat - confidence, yhat + confidence
+
+    def predict_many(self, symbols, steps=1):
+        """
+        Forecast many symbols one horizon ahead in one array pass
+
+        Args:
+            symbols (list): Stock symbols
+            steps (int): Steps ahead
+
+        Returns:
+            np.ndarray: Forecast per symbol; NaN where a symbol has fewer than min_ticks ticks
+        """
+        rows = np.array([self.symbol_ids.get(symbol, -1) for symbol in symbols], dtype=np.int64)
+        state = self._state[np.maximum(rows, 0)]
+        w, sx, sy, sxy, sxx = state[:, W], state[:, SX], state[:, SY], state[:, SXY], state[:, SXX]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denominator = w * sxx - sx ** 2
+            slope = np.where(denominator > 0, (w * sxy - sx * sy) / denominator, 0.0)
+            level = (sy - slope * sx) / w
+        ready = (rows >= 0) & (state[:, COUNT] >= max(self.min_ticks, 2))
+        return np.where(ready, level + slope * steps, np.nan)
+
+    def reset(self, symbol=None):
+        """Forget one symbol's history, or every symbol's"""
+        with self._lock:
+            if symbol is None:
+                self._state[:] = 0
+            elif symbol in self.symbol_ids:
+                self._state[self.symbol_ids[symbol]] = 0
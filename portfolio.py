@@ -0,0 +1,265 @@
+"""
+Portfolio analytics over a (time x symbol) returns matrix
+"""
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+# Columns of PortfolioEngine.evaluate, in display order
+METRIC_COLUMNS = [
+    'total_return', 'annualized_return', 'volatility', 'sharpe', 'sortino',
+    'max_drawdown', 'var', 'cvar'
+]
+
+
+def returns_matrix(prices, how='inner'):
+    """
+    Simple returns of several price series on a common date index
+
+    Args:
+        prices (pd.DataFrame or dict): Date-indexed frame with one column per symbol, or
+            symbol -> pd.Series of prices indexed by date
+        how (str): 'inner' keeps dates every symbol has; 'outer' keeps all dates and
+            treats a missing return as flat
+
+    Returns:
+        pd.DataFrame: Returns, oldest first, one column per symbol
+    """
+    if isinstance(prices, dict):
+        prices = pd.concat(prices, axis=1, join=how)
+    prices = prices.sort_index()
+    prices = prices[~prices.index.duplicated(keep='last')]
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    if how == 'inner':
+        return returns.dropna()
+    return returns.fillna(0.0)
+
+
+def shrinkage_covariance(returns):
+    """
+    Ledoit-Wolf covariance: the sample covariance shrunk towards a scaled identity
+
+    The shrinkage intensity is estimated from the data (Ledoit & Wolf, 2004), which
+    keeps the matrix well conditioned when there are many symbols and few dates.
+
+    Args:
+        returns (np.ndarray): T x N returns without NaNs
+
+    Returns:
+        tuple: (N x N covariance per period, shrinkage intensity in [0, 1])
+    """
+    x = returns - returns.mean(axis=0)
+    t, n = x.shape
+    sample = x.T @ x / t
+    mu = np.trace(sample) / n
+    target = mu * np.eye(n)
+
+    delta = np.sum((sample - target) ** 2) / n
+    # Sum over t of ||x_t x_t' - S||^2, without forming the T outer products
+    beta = (np.sum(np.sum(x ** 2, axis=1) ** 2) - t * np.sum(sample ** 2)) / (n * t ** 2)
+    shrinkage = 0.0 if delta <= 0 else float(np.clip(beta / delta, 0.0, 1.0))
+    return shrinkage * target + (1 - shrinkage) * sample, shrinkage
+
+
+def path_metrics(returns, periods_per_year=TRADING_DAYS, risk_free=0.0, confidence=0.95):
+    """
+    Performance and risk metrics of many return series at once
+
+    Every metric is computed along axis 0 of a T x K matrix, so K assets or K
+    candidate portfolios cost one set of array operations.
+
+    Args:
+        returns (np.ndarray): T x K returns, oldest first
+        periods_per_year (int): Return periods per year
+        risk_free (float): Annual risk-free rate subtracted in Sharpe and Sortino
+        confidence (float): VaR/CVaR confidence level
+
+    Returns:
+        dict: METRIC_COLUMNS -> length-K arrays; VaR and CVaR are positive losses per period
+    """
+    t = len(returns)
+    growth = np.cumprod(1 + returns, axis=0)
+    total = growth[-1] - 1
+    annualized = (1 + total) ** (periods_per_year / t) - 1
+    volatility = returns.std(axis=0, ddof=1) * np.sqrt(periods_per_year)
+
+    # Standard deviation of the losing periods only, from their count, sum and sum of squares
+    losses = np.minimum(returns, 0.0)
+    n_losses = np.count_nonzero(returns < 0, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        loss_mean = losses.sum(axis=0) / n_losses
+        loss_var = ((losses ** 2).sum(axis=0) - n_losses * loss_mean ** 2) / (n_losses - 1)
+        downside_deviation = np.sqrt(np.where(n_losses > 1, np.maximum(loss_var, 0.0), 0.0)) * np.sqrt(periods_per_year)
+        excess = annualized - risk_free
+        sharpe = np.where(volatility > 0, excess / volatility, 0.0)
+        sortino = np.where(downside_deviation > 0, excess / downside_deviation, 0.0)
+
+    peaks = np.maximum.accumulate(growth, axis=0)
+    max_drawdown = (growth / peaks - 1).min(axis=0)
+
+    # Historical VaR/CVaR: the loss at the (1 - confidence) quantile and the mean loss beyond it
+    cutoff = max(int(np.floor(t * (1 - confidence))), 1)
+    tail = np.partition(returns, cutoff - 1, axis=0)[:cutoff]
+    var = -tail.max(axis=0)
+    cvar = -tail.mean(axis=0)
+
+    return {
+        'total_return': total,
+        'annualized_return': annualized,
+        'volatility': volatility,
+        'sharpe': np.nan_to_num(sharpe),
+        'sortino': np.nan_to_num(sortino),
+        'max_drawdown': max_drawdown,
+        'var': var,
+        'cvar': cvar
+    }
+
+
+def random_weights(n_candidates, n_assets, seed=None):
+    """
+    Long-only weight vectors spread uniformly over the simplex
+
+    Args:
+        n_candidates (int): Weight vectors to draw
+        n_assets (int): Assets per vector
+        seed: Seed for np.random.default_rng
+
+    Returns:
+        np.ndarray: n_candidates x n_assets weights, each row summing to 1
+    """
+    return np.random.default_rng(seed).dirichlet(np.ones(n_assets), size=n_candidates)
+
+
+class PortfolioEngine:
+    """Vectorized analytics for a fixed returns matrix
+
+    The returns matrix, its mean and its shrinkage covariance are prepared
+    once. Candidate allocations are then scored together: K weight vectors
+    become a K-column matrix, and ``returns @ weights.T`` produces all K
+    portfolio return series in one matrix multiply. Every metric is then
+    evaluated column-wise on that result.
+    """
+
+    def __init__(self, returns, periods_per_year=TRADING_DAYS, risk_free=0.0, confidence=0.95):
+        """
+        Args:
+            returns (pd.DataFrame): Returns, oldest first, one column per symbol (see returns_matrix)
+            periods_per_year (int): Return periods per year
+            risk_free (float): Annual risk-free rate
+            confidence (float): VaR/CVaR confidence level
+        """
+        returns = returns.dropna()
+        if returns.shape[0] < 2 or returns.shape[1] < 1:
+            raise ValueError("The portfolio engine needs at least two dates and one symbol")
+        self.returns = returns
+        self.symbols = list(returns.columns)
+        self.values = returns.to_numpy(dtype=float)
+        self.periods_per_year = periods_per_year
+        self.risk_free = risk_free
+        self.confidence = confidence
+        self.mean = self.values.mean(axis=0)
+        self.covariance, self.shrinkage = shrinkage_covariance(self.values)
+
+    def _weights(self, weights):
+        """Weights as a K x N array with rows summing to 1"""
+        if isinstance(weights, dict):
+            weights = [weights.get(symbol, 0.0) for symbol in self.symbols]
+        elif isinstance(weights, pd.Series):
+            weights = weights.reindex(self.symbols).fillna(0.0)
+        weights = np.atleast_2d(np.asarray(weights, dtype=float))
+        if weights.shape[1] != len(self.symbols):
+            raise ValueError(f"Expected {len(self.symbols)} weights per allocation, got {weights.shape[1]}")
+        totals = weights.sum(axis=1, keepdims=True)
+        return np.divide(weights, totals, out=np.zeros_like(weights), where=totals != 0)
+
+    def asset_metrics(self):
+        """
+        Per-symbol metrics
+
+        Returns:
+            pd.DataFrame: One row per symbol, METRIC_COLUMNS
+        """
+        metrics = path_metrics(self.values, self.periods_per_year, self.risk_free, self.confidence)
+        return pd.DataFrame(metrics, index=self.symbols, columns=METRIC_COLUMNS)
+
+    def correlation(self):
+        """Correlation matrix implied by the shrinkage covariance"""
+        scale = np.sqrt(np.diag(self.covariance))
+        return pd.DataFrame(self.covariance / np.outer(scale, scale), index=self.symbols, columns=self.symbols)
+
+    def evaluate(self, weights, chunk_size=4096):
+        """
+        Score many allocations at once
+
+        Args:
+            weights (array-like): K x N weights (or one weight vector, dict or Series); rows are
+                normalized to sum to 1
+            chunk_size (int): Allocations per matrix multiply, which bounds memory at T x chunk_size
+
+        Returns:
+            pd.DataFrame: One row per allocation: METRIC_COLUMNS plus 'expected_return' and
+                'expected_volatility' (annualized, from the mean and shrinkage covariance)
+        """
+        weights = self._weights(weights)
+        parts = []
+        for start in range(0, len(weights), chunk_size):
+            block = weights[start:start + chunk_size]
+            metrics = path_metrics(self.values @ block.T, self.periods_per_year, self.risk_free, self.confidence)
+            metrics['expected_return'] = block @ self.mean * self.periods_per_year
+            metrics['expected_volatility'] = np.sqrt(
+                np.einsum('kn,nm,km->k', block, self.covariance, block) * self.periods_per_year
+            )
+            parts.append(pd.DataFrame(metrics))
+        return pd.concat(parts, ignore_index=True)
+
+    def portfolio_metrics(self, weights):
+        """
+        Metrics of one allocation
+
+        Args:
+            weights (array-like, dict or pd.Series): Weight per symbol
+
+        Returns:
+            dict: Metric name -> value (see evaluate)
+        """
+        return self.evaluate(weights).iloc[0].to_dict()
+
+    def rolling_drawdown(self, weights=None, window=63):
+        """
+        Drawdown from the rolling peak over a trailing window
+
+        Args:
+            weights (array-like): Allocation (or K x N allocations); per-symbol drawdowns when None
+            window (int): Periods in the trailing peak window
+
+        Returns:
+            pd.DataFrame: Date-indexed drawdowns (<= 0), one column per symbol or allocation
+        """
+        if weights is None:
+            paths, columns = self.values, self.symbols
+        else:
+            block = self._weights(weights)
+            paths, columns = self.values @ block.T, list(range(len(block)))
+        growth = pd.DataFrame(np.cumprod(1 + paths, axis=0), index=self.returns.index, columns=columns)
+        return growth / growth.rolling(window, min_periods=1).max() - 1
+
+    def rank_allocations(self, n_candidates=5000, by='sharpe', seed=None, include_equal=True):
+        """
+        Draw random long-only allocations and rank them
+
+        Args:
+            n_candidates (int): Random allocations to score
+            by (str): Metric to sort by (descending; ascending for volatility, var and cvar)
+            seed: Seed for the candidate draw
+            include_equal (bool): Also score the equal-weight allocation
+
+        Returns:
+            pd.DataFrame: Weights per symbol and metrics, best allocation first
+        """
+        weights = random_weights(n_candidates, len(self.symbols), seed)
+        if include_equal:
+            weights = np.vstack([np.full(len(self.symbols), 1.0 / len(self.symbols)), weights])
+        ranked = pd.concat([pd.DataFrame(weights, columns=self.symbols), self.evaluate(weights)], axis=1)
+        ascending = by in ('volatility', 'expected_volatility', 'var', 'cvar')
+        return ranked.sort_values(by, ascending=ascending, kind='stable').reset_index(drop=True)
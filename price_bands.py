@@ -0,0 +1,229 @@
+"""
+Adaptive price-validation bands maintained incrementally from tick history
+"""
+import threading
+from datetime import datetime
+import numpy as np
+
+# Column layout of the per-symbol state array
+LAST, ATR, REF_CLOSE, DAY, COUNT, SLOW_ATR, LAST_TIME, REJECTS = range(8)
+N_COLUMNS = 8
+
+# Index readings below this are misparsed numbers; used only before an index has a band
+INDEX_FLOOR = 10000.0
+
+
+class AdaptivePriceBands:
+    """Rolling per-symbol validation bands stored in one compact array
+
+    Each symbol gets an integer id and one row of state: last price, a fast
+    and a slow exponentially smoothed average true range (ATR), the reference
+    close of the previous trading day, a tick count, the time of the last tick
+    and the number of consecutive rejections. A price is accepted when it lies
+    inside ``last ± k·max(ATR, slow ATR)`` and inside the exchange
+    circuit-breaker limits around the reference close. Both updating and
+    checking are O(1).
+
+    Rejected prices never move the state, so a band that narrowed on quiet
+    ticks could otherwise lock out a genuine move for good. The band
+    therefore reopens to the full circuit-breaker range around the reference
+    close at the first check of a new day, after a gap without ticks and after
+    several consecutive rejections.
+    """
+
+    def __init__(self, k=4.0, alpha=0.1, slow_alpha=0.01, circuit_limit=0.075, circuit_floor=1.0,
+                 initial_atr_pct=0.02, min_band_pct=0.01, max_gap=1800.0, max_rejections=3,
+                 capacity=256):
+        """
+        Args:
+            k (float): Band half-width in ATR units
+            alpha (float): Smoothing factor of the ATR average
+            slow_alpha (float): Smoothing factor of the longer-horizon ATR that floors the band
+            circuit_limit (float): Daily circuit-breaker limit as a fraction of the reference close
+            circuit_floor (float): Minimum circuit-breaker move in PKR
+            initial_atr_pct (float): ATR assumed after the first tick, as a fraction of price
+            min_band_pct (float): Narrowest allowed half-width, as a fraction of the last price
+            max_gap (float): Seconds without ticks after which the band reopens
+            max_rejections (int): Consecutive rejections after which the band reopens
+            capacity (int): Initial number of symbol rows
+        """
+        self.k = k
+        self.alpha = alpha
+        self.slow_alpha = slow_alpha
+        self.circuit_limit = circuit_limit
+        self.circuit_floor = circuit_floor
+        self.initial_atr_pct = initial_atr_pct
+        self.min_band_pct = min_band_pct
+        self.max_gap = max_gap
+        self.max_rejections = max_rejections
+        self.symbol_ids = {}
+        self.no_circuit = set()
+        self._state = np.zeros((capacity, N_COLUMNS))
+        self._lock = threading.RLock()
+
+    def symbol_id(self, symbol):
+        """Get (or assign) the row index of a symbol"""
+        index = self.symbol_ids.get(symbol)
+        if index is None:
+            with self._lock:
+                index = self.symbol_ids.get(symbol)
+                if index is None:
+                    index = len(self.symbol_ids)
+                    if index >= len(self._state):
+                        grown = np.zeros((len(self._state) * 2, N_COLUMNS))
+                        grown[:len(self._state)] = self._state
+                        self._state = grown
+                    self.symbol_ids[symbol] = index
+        return index
+
+    def exempt_from_circuit(self, symbol):
+        """Disable circuit-breaker limits for a symbol (e.g. an index)"""
+        self.no_circuit.add(symbol)
+
+    def update(self, symbol, price, high=None, low=None, timestamp=None):
+        """
+        Fold one accepted tick into the symbol's statistics
+
+        Args:
+            symbol (str): Stock symbol
+            price (float): Last traded price
+            high (float): Bar high, if known
+            low (float): Bar low, if known
+            timestamp (datetime): Tick time; defaults to now
+        """
+        if price is None or price <= 0:
+            return
+
+        timestamp = timestamp or datetime.now()
+        day = int(timestamp.strftime('%Y%m%d'))
+        with self._lock:
+            index = self.symbol_id(symbol)
+            row = self._state[index]
+            previous = row[LAST]
+
+            if row[COUNT] == 0:
+                row[ATR] = row[SLOW_ATR] = price * self.initial_atr_pct
+                row[REF_CLOSE] = price
+                row[DAY] = day
+            else:
+                # Roll the circuit-breaker reference at the first tick of a new day
+                if day != row[DAY]:
+                    row[REF_CLOSE] = previous
+                    row[DAY] = day
+
+                high = price if high is None else high
+                low = price if low is None else low
+                true_range = max(high - low, abs(high - previous), abs(low - previous))
+                row[ATR] += self.alpha * (true_range - row[ATR])
+                row[SLOW_ATR] += self.slow_alpha * (true_range - row[SLOW_ATR])
+
+            row[LAST] = price
+            row[LAST_TIME] = timestamp.timestamp()
+            row[COUNT] += 1
+            row[REJECTS] = 0
+
+    def seed(self, symbol, close, timestamp=None):
+        """
+        Start a symbol's band from a known close (e.g. the last daily close or an official level)
+
+        Args:
+            symbol (str): Stock symbol
+            close (float): Reference close
+            timestamp (datetime): Time of the close; defaults to now
+
+        Returns:
+            bool: True when the band was seeded; False when the symbol already has history
+        """
+        if close is None or close <= 0:
+            return False
+        with self._lock:
+            if self.last_price(symbol) is not None:
+                return False
+            self.update(symbol, close, timestamp=timestamp)
+            return True
+
+    def bounds(self, symbol, timestamp=None):
+        """
+        Get the current validation band for a symbol
+
+        Args:
+            symbol (str): Stock symbol
+            timestamp (datetime): Time of the candidate price; defaults to now
+
+        Returns:
+            tuple: (low, high), or None when the symbol has no history yet
+        """
+        index = self.symbol_ids.get(symbol)
+        if index is None:
+            return None
+
+        last, atr, ref_close, day, count, slow_atr, last_time, rejects = self._state[index]
+        if count == 0:
+            return None
+
+        timestamp = timestamp or datetime.now()
+        new_day = int(timestamp.strftime('%Y%m%d')) != day
+        # No tick yet today: yesterday's last price is today's reference close
+        if new_day:
+            ref_close = last
+
+        limit = max(ref_close * self.circuit_limit, self.circuit_floor)
+        reopen = (new_day or rejects >= self.max_rejections
+                  or timestamp.timestamp() - last_time > self.max_gap)
+        if reopen:
+            # The ticks behind the narrow band are stale or keep disagreeing with the market
+            if symbol in self.no_circuit:
+                half_width = max(self.k * max(atr, slow_atr), last * self.circuit_limit)
+                return last - half_width, last + half_width
+            return ref_close - limit, ref_close + limit
+
+        half_width = max(self.k * max(atr, slow_atr), last * self.min_band_pct)
+        low, high = last - half_width, last + half_width
+
+        if symbol not in self.no_circuit:
+            low = max(low, ref_close - limit)
+            high = min(high, ref_close + limit)
+
+        return low, high
+
+    def is_valid(self, symbol, price, timestamp=None):
+        """
+        Check a price against the symbol's adaptive band
+
+        A rejection is counted towards reopening the band; accepted prices
+        reset the count once they are recorded with update().
+
+        Args:
+            symbol (str): Stock symbol
+            price (float): Candidate price
+            timestamp (datetime): Time of the candidate price; defaults to now
+
+        Returns:
+            bool: True/False when a band exists, None when the symbol has no history
+        """
+        band = self.bounds(symbol, timestamp)
+        if band is None:
+            return None
+        if band[0] <= price <= band[1]:
+            return True
+        with self._lock:
+            self._state[self.symbol_ids[symbol], REJECTS] += 1
+        return False
+
+    def last_price(self, symbol):
+        """Get the last accepted price for a symbol, or None"""
+        index = self.symbol_ids.get(symbol)
+        if index is None or self._state[index, COUNT] == 0:
+            return None
+        return float(self._state[index, LAST])
+
+
+# Rolling per-symbol validation bands, shared by every fetcher so a tick accepted by one warms the others
+_default_bands = AdaptivePriceBands()
+for _index_symbol in ('KSE-100', 'KSE100'):
+    _default_bands.exempt_from_circuit(_index_symbol)
+
+
+def get_price_bands():
+    """Get the process-wide adaptive price bands shared by all fetchers"""
+    return _default_bands
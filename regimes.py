@@ -0,0 +1,131 @@
+"""
+Vectorized rolling market-regime classification for many symbols
+"""
+import numpy as np
+import pandas as pd
+
+# Label codes returned by classify_regimes; -1 marks windows without enough data
+REGIME_LABELS = (
+    "Strong Uptrend",
+    "Strong Downtrend",
+    "Moderate Uptrend",
+    "Moderate Downtrend",
+    "High Volatility",
+    "Sideways/Ranging"
+)
+INSUFFICIENT_DATA = "Insufficient data"
+
+
+def _window_sums(values, window):
+    """Trailing-window sums along axis 0; row t covers rows t-window+1..t (NaN before that)"""
+    cumulative = np.zeros((values.shape[0] + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=cumulative[1:])
+    out = np.full(values.shape, np.nan)
+    out[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return out
+
+
+def rolling_regime_stats(prices, window=20):
+    """
+    Trend slope, R² and coefficient of variation of every trailing window
+
+    Each window is fitted as in StockForecaster.detect_market_regime (OLS of
+    price on 0..window-1) but all windows of all symbols are computed at once
+    from running sums of y, y² and k·y, so the cost is O(T·N) instead of one
+    polyfit per window.
+
+    Args:
+        prices (np.ndarray/pd.DataFrame): (time x symbol) closes, or a 1-D series
+        window (int): Window length in bars
+
+    Returns:
+        tuple: (slope, r_squared, volatility) arrays shaped like prices; rows before the
+            first full window, and windows containing NaN, are NaN
+    """
+    values = np.asarray(prices, dtype=float)
+    one_dimensional = values.ndim == 1
+    if one_dimensional:
+        values = values[:, None]
+    n_rows = values.shape[0]
+    w = float(window)
+    if n_rows < window:
+        empty = np.full(values.shape, np.nan)
+        return (empty[:, 0],) * 3 if one_dimensional else (empty, empty.copy(), empty.copy())
+
+    # Shift each column by its mean price; slope, R² and spread are shift invariant,
+    # and the running sums of squares then stay small
+    missing = np.isnan(values)
+    filled = np.where(missing, 0.0, values)
+    reference = filled.sum(axis=0) / np.maximum((~missing).sum(axis=0), 1)
+    centred = np.where(missing, 0.0, filled - reference)
+
+    k = np.arange(n_rows, dtype=float)[:, None]
+    sum_y = _window_sums(centred, window)
+    sum_yy = _window_sums(centred ** 2, window)
+    sum_ky = _window_sums(k * centred, window)
+    n_missing = _window_sums(missing.astype(float), window)
+
+    # Local x runs 0..window-1 from the window start s = t - window + 1
+    start = k - (w - 1)
+    sum_x = w * (w - 1) / 2.0
+    sum_xx = (w - 1) * w * (2 * w - 1) / 6.0
+    sum_xy = sum_ky - start * sum_y
+
+    sxx = sum_xx - sum_x ** 2 / w
+    syy = np.maximum(sum_yy - sum_y ** 2 / w, 0.0)
+    sxy = sum_xy - sum_x * sum_y / w
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = sxy / sxx
+        r_squared = np.where(syy > 0, sxy ** 2 / (sxx * syy), 0.0)
+        mean = sum_y / w + reference
+        volatility = np.where(mean != 0, np.sqrt(syy / (w - 1)) / mean, 0.0)
+
+    invalid = ~(n_missing == 0)
+    for array in (slope, r_squared, volatility):
+        array[invalid] = np.nan
+
+    if one_dimensional:
+        return slope[:, 0], r_squared[:, 0], volatility[:, 0]
+    return slope, r_squared, volatility
+
+
+def classify_regimes(slope, r_squared, volatility):
+    """
+    Map window statistics to regime codes (indices into REGIME_LABELS)
+
+    Uses the thresholds of StockForecaster.detect_market_regime.
+
+    Returns:
+        np.ndarray: int8 codes, -1 where the statistics are NaN
+    """
+    up = slope > 0
+    codes = np.select(
+        [r_squared > 0.7, r_squared > 0.4, volatility > 0.05],
+        [np.where(up, 0, 1), np.where(up, 2, 3), 4],
+        default=5
+    ).astype(np.int8)
+    codes[np.isnan(slope) | np.isnan(r_squared) | np.isnan(volatility)] = -1
+    return codes
+
+
+def regime_labels(codes):
+    """Convert regime codes to label strings"""
+    lookup = np.array(REGIME_LABELS + (INSUFFICIENT_DATA,), dtype=object)
+    return lookup[np.where(codes < 0, len(REGIME_LABELS), codes)]
+
+
+def rolling_regimes(panel, window=20):
+    """
+    Regime label at every timestamp for every symbol
+
+    Args:
+        panel (pd.DataFrame): Wide frame (time x symbol) of closes
+        window (int): Window length in bars
+
+    Returns:
+        pd.DataFrame: Regime labels shaped like panel
+    """
+    slope, r_squared, volatility = rolling_regime_stats(panel.to_numpy(dtype=float), window)
+    labels = regime_labels(classify_regimes(slope, r_squared, volatility))
+    return pd.DataFrame(labels, index=panel.index, columns=panel.columns)
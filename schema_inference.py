@@ -0,0 +1,372 @@
+"""
+Typed schema inference for uploaded price files, from a bounded row sample
+"""
+import hashlib
+import re
+import threading
+import warnings
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    guess_datetime_format = None
+
+SAMPLE_ROWS = 2000
+NUMERIC_SHARE = 0.5    # share of sampled values that must parse for a text column to be numeric
+DATETIME_SHARE = 0.9   # share of sampled values a datetime format must parse
+PRICE_WORDS = ('price', 'close', 'last', 'value', 'high', 'low', 'open')
+DATE_WORDS = ('date', 'time', 'datetime', 'timestamp')
+SYMBOL_WORDS = ('symbol', 'ticker', 'instrument', 'brand', 'asset')
+VOLUME_WORDS = ('volume', 'vol')
+
+# Tried in order after pandas' guess from the first value; day-first before month-first
+DATETIME_FORMATS = (
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S',
+    '%Y.%m.%d', '%Y.%m.%d %H:%M', '%Y.%m.%d %H:%M:%S', '%Y/%m/%d', '%Y%m%d',
+    '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%m-%d-%Y', '%d.%m.%Y',
+    '%d/%m/%Y %H:%M', '%m/%d/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%m/%d/%Y %H:%M:%S',
+    '%d-%b-%Y', '%d %b %Y', '%b %d, %Y', '%d-%b-%y', '%b %d %Y',
+)
+
+
+def _clean_numeric(values):
+    """Text values with thousands separators and quotes removed, parsed as numbers"""
+    cleaned = values.astype(str).str.replace('"', '', regex=False).str.replace(',', '', regex=False)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def sample_rows(df, n=SAMPLE_ROWS):
+    """
+    Evenly spaced rows of a frame, so a format change anywhere in the file is seen
+
+    Args:
+        df (pd.DataFrame): Full frame (or a single column)
+        n (int): Rows to keep
+
+    Returns:
+        pd.DataFrame: At most n rows of df, in order
+    """
+    if len(df) <= n:
+        return df
+    return df.iloc[np.linspace(0, len(df) - 1, n).astype(np.int64)]
+
+
+def detect_datetime_format(values, dayfirst=False):
+    """
+    strftime format that parses (nearly) all of a sample of date strings
+
+    Args:
+        values (pd.Series): Sampled values of one column
+        dayfirst (bool): Prefer day-first when pandas guesses from the first value
+
+    Returns:
+        str: The format, or None when no candidate parses DATETIME_SHARE of the sample
+    """
+    values = values.dropna().astype(str).str.strip()
+    values = values[values != '']
+    if values.empty:
+        return None
+
+    candidates = list(DATETIME_FORMATS)
+    if guess_datetime_format is not None:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            guess = guess_datetime_format(values.iloc[0], dayfirst=dayfirst)
+        if guess:
+            candidates.insert(0, guess)
+
+    for fmt in dict.fromkeys(candidates):
+        try:
+            parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+        except (ValueError, TypeError):
+            continue
+        if parsed.notna().mean() >= DATETIME_SHARE:
+            return fmt
+    return None
+
+
+def _column_schema(values):
+    """Kind, dtype and parse settings of one column from its sampled values"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return {'kind': 'datetime', 'dtype': str(values.dtype), 'format': None, 'clean': False}
+    if pd.api.types.is_bool_dtype(values):
+        return {'kind': 'text', 'dtype': str(values.dtype), 'format': None, 'clean': False}
+    if pd.api.types.is_numeric_dtype(values):
+        return {'kind': 'numeric', 'dtype': str(values.dtype), 'format': None, 'clean': False}
+
+    present = values.dropna()
+    if len(present) and _clean_numeric(present).notna().mean() > NUMERIC_SHARE:
+        return {'kind': 'numeric', 'dtype': str(values.dtype), 'format': None, 'clean': True}
+    fmt = detect_datetime_format(present)
+    if fmt is not None:
+        return {'kind': 'datetime', 'dtype': str(values.dtype), 'format': fmt, 'clean': False}
+    return {'kind': 'text', 'dtype': str(values.dtype), 'format': None, 'clean': False}
+
+
+def infer_schema(df, sample_size=SAMPLE_ROWS):
+    """
+    Column kinds and price/date candidates of a frame, looking at a bounded sample only
+
+    Args:
+        df (pd.DataFrame): Uploaded data
+        sample_size (int): Rows examined per column
+
+    Returns:
+        dict: n_rows, columns (name -> kind, dtype, format, clean), price_candidates,
+            date_candidates, price_column and date_column
+    """
+    sample = sample_rows(df, sample_size)
+    columns = {col: _column_schema(sample[col]) for col in df.columns}
+
+    price_candidates = [col for col in df.columns
+                        if any(word in str(col).lower() for word in PRICE_WORDS)]
+    if not price_candidates:
+        price_candidates = [col for col, info in columns.items() if info['kind'] == 'numeric']
+
+    date_candidates = [col for col in df.columns
+                       if any(word in str(col).lower() for word in DATE_WORDS)]
+    if not date_candidates:
+        date_candidates = [col for col, info in columns.items() if info['kind'] == 'datetime']
+
+    return {
+        'n_rows': len(df),
+        'columns': columns,
+        'price_candidates': price_candidates,
+        'date_candidates': date_candidates,
+        'price_column': price_candidates[0] if price_candidates else None,
+        'date_column': date_candidates[0] if date_candidates else None
+    }
+
+
+def date_range(df, schema):
+    """
+    First and last timestamp of the schema's date column
+
+    The full column has to be parsed for this, so the result is stored in the
+    (cached) schema and later calls on the same file return at once.
+
+    Args:
+        df (pd.DataFrame): The frame the schema was inferred from
+        schema (dict): infer_schema(df)
+
+    Returns:
+        tuple: (start, end) Timestamps, or None without a parseable date column
+    """
+    if 'date_range' not in schema:
+        bounds = None
+        col = schema['date_column']
+        if col is not None and col in df:
+            dates = parse_datetime_column(df[col], schema['columns'][col]['format']).dropna()
+            if len(dates) > 0:
+                bounds = (dates.min(), dates.max())
+        schema['date_range'] = bounds
+    return schema['date_range']
+
+
+def downcast(series):
+    """
+    Narrow a numeric column to int32/float32 when that loses nothing
+
+    Args:
+        series (pd.Series): Numeric column
+
+    Returns:
+        pd.Series: The column in the narrowest lossless dtype of int32/float32, else unchanged
+    """
+    if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+        info = np.iinfo(np.int32)
+        if len(series) == 0 or (series.min() >= info.min and series.max() <= info.max):
+            return series.astype(np.int32)
+        return series
+    if pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+        values = series.to_numpy()
+        narrow = values.astype(np.float32)
+        with np.errstate(over='ignore', invalid='ignore'):
+            lossless = np.array_equal(narrow.astype(values.dtype), values, equal_nan=True)
+        if lossless:
+            return pd.Series(narrow, index=series.index, name=series.name)
+    return series
+
+
+def _iso_rewrite(fmt):
+    """Regex and replacement turning strings in a numeric format into ISO 8601, or None"""
+    fields = {'%Y': r'(\d{4})', '%m': r'(\d{2})', '%d': r'(\d{2})',
+              '%H': r'(\d{2})', '%M': r'(\d{2})', '%S': r'(\d{2})'}
+    pattern, order, i = '^', [], 0
+    while i < len(fmt):
+        directive = fmt[i:i + 2]
+        if directive in fields:
+            pattern += fields[directive]
+            order.append(directive)
+            i += 2
+        elif fmt[i] == '%' or fmt[i].isalnum():
+            return None
+        else:
+            pattern += r'\s+' if fmt[i] == ' ' else re.escape(fmt[i])
+            i += 1
+    if not {'%Y', '%m', '%d'} <= set(order) or len(set(order)) != len(order):
+        return None
+    group = {directive: f'\\{k + 1}' for k, directive in enumerate(order)}
+    replacement = f"{group['%Y']}-{group['%m']}-{group['%d']}"
+    time = [directive for directive in ('%H', '%M', '%S') if directive in group]
+    if time not in ([], ['%H', '%M'], ['%H', '%M', '%S']):
+        return None
+    if time:
+        replacement += ' ' + ':'.join(group[directive] for directive in time)
+    return pattern + '$', replacement
+
+
+def parse_datetime_column(series, fmt=None):
+    """
+    Parse a full date column with one explicit format
+
+    The format is detected on a sample when not given. Purely numeric formats
+    (e.g. '%d/%m/%Y %H:%M') are first rewritten to ISO 8601 with one vectorized
+    regex, which pandas parses several times faster than strptime; only values
+    that do not fit the rewrite fall back to strptime.
+
+    Args:
+        series (pd.Series): Raw date values
+        fmt (str): strftime format, e.g. from infer_schema
+
+    Returns:
+        pd.Series: datetime64 values, NaT where a value does not parse
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if fmt is None:
+        fmt = detect_datetime_format(sample_rows(series))
+    if fmt is None:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return pd.to_datetime(series, errors='coerce')
+
+    text = series.astype(str).str.strip()
+    rewrite = None if fmt.startswith('%Y-%m-%d') else _iso_rewrite(fmt)
+    if rewrite is None:
+        return pd.to_datetime(text, format=fmt, errors='coerce')
+
+    parsed = pd.to_datetime(text.str.replace(rewrite[0], rewrite[1], regex=True), format='ISO8601', errors='coerce')
+    missed = parsed.isna() & series.notna()
+    if missed.any():
+        parsed[missed] = pd.to_datetime(text[missed], format=fmt, errors='coerce')
+    return parsed
+
+
+def parse_numeric_column(series, info=None):
+    """
+    Parse a full column as numbers, stripping separators only when the schema says so
+
+    Args:
+        series (pd.Series): Raw values
+        info (dict): The column's entry in infer_schema()['columns']
+
+    Returns:
+        pd.Series: Numeric values (NaN where a value does not parse), losslessly downcast
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return downcast(series)
+    if info is None or info.get('clean', True):
+        return downcast(_clean_numeric(series))
+    return downcast(pd.to_numeric(series, errors='coerce'))
+
+
+def apply_schema(df, schema, downcast_numeric=True):
+    """
+    Frame with numeric and datetime columns converted to their inferred types
+
+    Args:
+        df (pd.DataFrame): Uploaded data
+        schema (dict): infer_schema(df)
+        downcast_numeric (bool): Narrow numeric columns to int32/float32 where lossless
+
+    Returns:
+        pd.DataFrame: New frame; text columns are left as they are
+    """
+    typed = df.copy(deep=False)
+    for col, info in schema['columns'].items():
+        if col not in typed:
+            continue
+        if info['kind'] == 'numeric' and (info['clean'] or downcast_numeric):
+            values = parse_numeric_column(typed[col], info)
+            typed[col] = values if downcast_numeric else values.astype(float)
+        elif info['kind'] == 'datetime':
+            typed[col] = parse_datetime_column(typed[col], info['format'])
+    return typed
+
+
+def schema_key(df, sample_size=SAMPLE_ROWS):
+    """Cache key of a frame: its shape, columns, dtypes and a hash of the sampled rows"""
+    sample = sample_rows(df, sample_size)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((len(df), [str(col) for col in df.columns], [str(t) for t in df.dtypes])).encode())
+    try:
+        digest.update(pd.util.hash_pandas_object(sample, index=False).to_numpy().tobytes())
+    except TypeError:
+        digest.update(sample.to_csv(index=False).encode())
+    return digest.hexdigest()
+
+
+class SchemaCache:
+    """In-memory LRU of inferred schemas keyed by schema_key
+
+    Streamlit reruns the upload flow on every interaction with the same
+    frame; with the cache the sample is only typed once per file.
+    """
+
+    def __init__(self, max_entries=32):
+        """
+        Args:
+            max_entries (int): Schemas kept before the least recently used is dropped
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, df):
+        """
+        Schema of a frame, inferred on first request
+
+        Args:
+            df (pd.DataFrame): Uploaded data
+
+        Returns:
+            dict: infer_schema(df); shared, so treat it as read-only (date_range fills in its
+                'date_range' entry)
+        """
+        key = schema_key(df)
+        with self._lock:
+            schema = self._entries.get(key)
+            if schema is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return schema
+
+        schema = infer_schema(df)
+        with self._lock:
+            self._entries[key] = schema
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stats['misses'] += 1
+        return schema
+
+    def clear(self):
+        """Drop every cached schema"""
+        with self._lock:
+            self._entries.clear()
+
+
+_default_cache = None
+
+
+def get_schema_cache():
+    """Get the process-wide schema cache"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SchemaCache()
+    return _default_cache
@@ -3,11 +3,18 @@ Simple and robust file reader for universal file upload
 """
 import pandas as pd
 import io
+from schema_inference import get_schema_cache, parse_numeric_column, date_range
+from columnar_io import COLUMNAR_FORMATS, read_columnar, get_arrow_store
 # import chardet
 
-def read_any_file(uploaded_file):
+def read_any_file(uploaded_file, use_arrow_cache=False, columns='auto'):
     """
-    Read any CSV or Excel file with maximum compatibility
+    Read any CSV, Excel, Parquet or Feather/Arrow file with maximum compatibility
+    
+    Parquet and Feather files are memory-mapped and, by default, only their
+    date, price, symbol and volume columns are read; pass columns=None to read
+    every column (see columnar_io.read_columnar). With use_arrow_cache a parsed CSV/Excel upload is kept as
+    an Arrow file, and the same upload is read back from it on later calls.
     Returns: (dataframe, error_message)
     """
     try:
@@ -17,6 +24,39 @@ def read_any_file(uploaded_file):
         # Get file extension
         file_extension = uploaded_file.name.split('.')[-1].lower()
         
+        if file_extension in COLUMNAR_FORMATS:
+            try:
+                df = read_columnar(uploaded_file, COLUMNAR_FORMATS[file_extension], columns)
+                if df.empty:
+                    return None, f"{file_extension.capitalize()} file is empty"
+                return df, None
+            except Exception as e:
+                return None, f"{file_extension.capitalize()} reading failed: {str(e)}"
+        
+        if not use_arrow_cache or file_extension not in ['csv', 'xlsx', 'xls']:
+            return _read_text_or_excel(uploaded_file, file_extension)
+        
+        store = get_arrow_store()
+        arrow_key = store.key(uploaded_file)
+        df = store.get(arrow_key)
+        if df is not None:
+            return df, None
+        df, error_message = _read_text_or_excel(uploaded_file, file_extension)
+        if df is not None:
+            store.put(arrow_key, df)
+        return df, error_message
+            
+    except Exception as e:
+        return None, f"File reading error: {str(e)}"
+
+def _read_text_or_excel(uploaded_file, file_extension):
+    """
+    Parse a CSV or Excel upload
+    Returns: (dataframe, error_message)
+    """
+    try:
+        uploaded_file.seek(0)
+        
         if file_extension in ['xlsx', 'xls']:
             # Excel files
             try:
@@ -64,18 +104,12 @@ def read_any_file(uploaded_file):
                     if not df.empty and len(df.columns) > 0:
                         # Check if we have meaningful data (not just one column with everything)
                         if len(df.columns) > 1 or df.iloc[0, 0] != text_content.split('\n')[0]:
-                            # Clean up numeric columns by removing commas and quotes
-                            for col in df.columns:
-                                if df[col].dtype == 'object':
-                                    # Try to clean and convert numeric columns
+                            # Convert text columns the sampled schema marks numeric (commas and quotes removed)
+                            schema = get_schema_cache().get(df)
+                            for col, info in schema['columns'].items():
+                                if info['kind'] == 'numeric' and info['clean']:
                                     try:
-                                        # Remove quotes and commas from potential numeric data
-                                        cleaned_series = df[col].astype(str).str.replace('"', '').str.replace(',', '')
-                                        # Try to convert to numeric
-                                        numeric_series = pd.to_numeric(cleaned_series, errors='coerce')
-                                        # If more than 50% are numeric, replace the column
-                                        if numeric_series.notna().sum() > len(numeric_series) * 0.5:
-                                            df[col] = numeric_series
+                                        df[col] = parse_numeric_column(df[col], info)
                                     except:
                                         continue
                             return df, None
@@ -122,38 +156,11 @@ def analyze_dataframe(df, brand_name="Unknown"):
             'data_range': None
         }
         
-        # Try to identify price column
-        price_candidates = []
-        date_candidates = []
-        
-        for col in df.columns:
-            col_lower = str(col).lower()
-            
-            # Check for price-related columns
-            if any(word in col_lower for word in ['price', 'close', 'last', 'value', 'high', 'low', 'open']):
-                price_candidates.append(col)
-            
-            # Check for date-related columns
-            if any(word in col_lower for word in ['date', 'time', 'datetime', 'timestamp']):
-                date_candidates.append(col)
-        
-        # If no obvious candidates, check data types and use first numeric column
-        if not price_candidates:
-            for col in df.columns:
-                try:
-                    # Try to convert to numeric
-                    numeric_data = pd.to_numeric(df[col], errors='coerce')
-                    if numeric_data.notna().sum() > len(numeric_data) * 0.5:  # More than 50% numeric
-                        price_candidates.append(col)
-                except:
-                    pass
-        
-        # If still no candidates, use first column with numeric data
-        if not price_candidates:
-            for col in df.columns:
-                if df[col].dtype in ['float64', 'int64'] or any(isinstance(val, (int, float)) for val in df[col].dropna().iloc[:5]):
-                    price_candidates.append(col)
-                    break
+        # Column kinds and price/date candidates come from a bounded row sample
+        schema = get_schema_cache().get(df)
+        price_candidates = list(schema['price_candidates'])
+        date_candidates = list(schema['date_candidates'])
+        analysis['schema'] = schema
         
         analysis['price_candidates'] = price_candidates
         analysis['date_candidates'] = date_candidates
@@ -170,15 +177,13 @@ def analyze_dataframe(df, brand_name="Unknown"):
             
             # Calculate date range if date column exists
             try:
-                date_col = date_candidates[0]
-                date_data = pd.to_datetime(df[date_col], errors='coerce')
-                date_data = date_data.dropna()
+                bounds = date_range(df, schema)
                 
-                if len(date_data) > 0:
+                if bounds is not None:
                     analysis['data_range'] = {
-                        'start': date_data.min().strftime('%Y-%m-%d'),
-                        'end': date_data.max().strftime('%Y-%m-%d'),
-                        'total_days': (date_data.max() - date_data.min()).days
+                        'start': bounds[0].strftime('%Y-%m-%d'),
+                        'end': bounds[1].strftime('%Y-%m-%d'),
+                        'total_days': (bounds[1] - bounds[0]).days
                     }
             except Exception as e:
                 analysis['data_range'] = {'error': f'Cannot analyze date data: {str(e)}'}
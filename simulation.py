@@ -0,0 +1,138 @@
+"""
+Deterministic seeded simulation service for estimated price movements
+"""
+import zlib
+import numpy as np
+
+DEFAULT_BASE_SEED = 20240101
+
+
+def stable_key(value):
+    """
+    Map a string to a stable non-negative integer
+
+    Python's built-in hash() is salted per process, so it cannot be used to
+    derive seeds that must agree across Streamlit workers.
+
+    Args:
+        value (str): Symbol or stream name
+
+    Returns:
+        int: CRC32 of the UTF-8 encoded value
+    """
+    return zlib.crc32(str(value).encode('utf-8'))
+
+
+class SimulationService:
+    """Per-symbol random streams derived from a single SeedSequence
+
+    Every (day, symbol, stream) triple owns an independent
+    ``numpy.random.Generator`` spawned from the service's root entropy.
+    Generators are built on demand and never shared, so concurrent sessions
+    cannot disturb each other and the global ``np.random`` state is left alone.
+    """
+
+    def __init__(self, base_seed=DEFAULT_BASE_SEED):
+        self.base_seed = int(base_seed)
+        self._symbol_keys = {}
+
+    def _symbol_key(self, symbol):
+        key = self._symbol_keys.get(symbol)
+        if key is None:
+            key = stable_key(symbol)
+            self._symbol_keys[symbol] = key
+        return key
+
+    def seed_sequence(self, symbol, day, stream='price'):
+        """
+        Build the SeedSequence for one symbol stream
+
+        Args:
+            symbol (str): Stock symbol
+            day (int): Day key, e.g. 20250714
+            stream (str): Purpose of the draws ('price', 'volume', 'chart', ...)
+
+        Returns:
+            np.random.SeedSequence: Child sequence for this stream
+        """
+        return np.random.SeedSequence(
+            entropy=self.base_seed,
+            spawn_key=(int(day), self._symbol_key(symbol), stable_key(stream))
+        )
+
+    def generator(self, symbol, day, stream='price'):
+        """
+        Get a fresh Generator for one symbol stream
+
+        Args:
+            symbol (str): Stock symbol
+            day (int): Day key, e.g. 20250714
+            stream (str): Purpose of the draws
+
+        Returns:
+            np.random.Generator: PCG64 generator positioned at the stream start
+        """
+        return np.random.Generator(np.random.PCG64(self.seed_sequence(symbol, day, stream)))
+
+    def standard_normal(self, symbols, day, size=None, stream='price'):
+        """
+        Draw standard normal variates for many symbols at once
+
+        Row ``i`` always comes from the stream of ``symbols[i]``, so the values
+        for a symbol do not depend on which other symbols are requested.
+
+        Args:
+            symbols (list): Stock symbols
+            day (int): Day key
+            size (int): Draws per symbol; None returns one draw per symbol
+            stream (str): Purpose of the draws
+
+        Returns:
+            np.ndarray: Shape (n,) when size is None, otherwise (n, size)
+        """
+        width = 1 if size is None else int(size)
+        out = np.empty((len(symbols), width))
+        for i, symbol in enumerate(symbols):
+            self.generator(symbol, day, stream).standard_normal(out=out[i])
+        return out[:, 0] if size is None else out
+
+    def uniform(self, symbols, day, size=None, stream='uniform'):
+        """
+        Draw U[0, 1) variates for many symbols at once
+
+        Args:
+            symbols (list): Stock symbols
+            day (int): Day key
+            size (int): Draws per symbol; None returns one draw per symbol
+            stream (str): Purpose of the draws
+
+        Returns:
+            np.ndarray: Shape (n,) when size is None, otherwise (n, size)
+        """
+        width = 1 if size is None else int(size)
+        out = np.empty((len(symbols), width))
+        for i, symbol in enumerate(symbols):
+            self.generator(symbol, day, stream).random(out=out[i])
+        return out[:, 0] if size is None else out
+
+    def unit_value(self, symbol, day, stream='trend'):
+        """
+        Stable value in [0, 1) for a symbol and day
+
+        Args:
+            symbol (str): Stock symbol
+            day (int): Day key
+            stream (str): Purpose of the value
+
+        Returns:
+            float: Deterministic pseudo-random value
+        """
+        return float(self.generator(symbol, day, stream).random())
+
+
+_default_service = SimulationService()
+
+
+def get_simulation_service():
+    """Get the process-wide simulation service"""
+    return _default_service
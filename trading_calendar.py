@@ -0,0 +1,280 @@
+"""
+PSX trading calendar with cached intraday session grids
+"""
+import threading
+from datetime import date, datetime, time
+import numpy as np
+import pandas as pd
+
+try:
+    import holidays
+except ImportError:  # holidays is optional; only weekends are closed without it
+    holidays = None
+
+NS_PER_MINUTE = 60 * 10 ** 9
+
+# Normal trading sessions per weekday (Monday=0), local Pakistan time; both ends are bars.
+# Friday trading breaks for Jumu'ah prayers.
+SESSION_HOURS = {
+    0: (('09:30', '15:30'),),
+    1: (('09:30', '15:30'),),
+    2: (('09:30', '15:30'),),
+    3: (('09:30', '15:30'),),
+    4: (('09:15', '12:00'), ('14:30', '16:30'))
+}
+
+# Named time-of-day windows applied on top of the sessions
+SESSION_WINDOWS = {
+    'full': None,
+    'morning': ('00:00', '12:00'),
+    'afternoon': ('12:00', '23:59')
+}
+
+
+def _minutes(value):
+    """Minutes after midnight of an 'HH:MM' string or a time/datetime"""
+    if isinstance(value, str):
+        hours, minutes = value.split(':')
+        return int(hours) * 60 + int(minutes)
+    return value.hour * 60 + value.minute
+
+
+def _to_day(value):
+    """Coerce a date, datetime, Timestamp or string to numpy datetime64[D]"""
+    if isinstance(value, np.datetime64):
+        return value.astype('datetime64[D]')
+    if isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        value = pd.Timestamp(value).date()
+    return np.datetime64(value, 'D')
+
+
+class TradingCalendar:
+    """PSX trading days and intraday bar grids, precomputed per year and bar size
+
+    For each (year, freq) the calendar builds, once, a sorted int64 array of
+    every bar timestamp of every trading day together with the index where
+    each day starts. Any date range is then a contiguous slice found with two
+    binary searches, and time-of-day windows are a mask over that slice, so
+    callers never loop over ``timedelta`` steps. Weekends, Pakistan public
+    holidays and the Friday prayer break are all reflected in the grid.
+    Timestamps are naive Pakistan wall-clock times, like the rest of the app.
+    """
+
+    def __init__(self, session_hours=None, extra_holidays=None):
+        """
+        Args:
+            session_hours (dict): Weekday -> ((start, end), ...) overriding SESSION_HOURS
+            extra_holidays (iterable): Additional closure dates (e.g. exchange-declared holidays)
+        """
+        self.session_hours = dict(SESSION_HOURS, **(session_hours or {}))
+        self.extra_holidays = {_to_day(day) for day in (extra_holidays or ())}
+        self._grids = {}
+        self._days = {}
+        self._lock = threading.Lock()
+
+    def _holidays(self, year):
+        closed = {day for day in self.extra_holidays if day.astype(object).year == year}
+        if holidays is not None:
+            try:
+                closed.update(np.datetime64(day, 'D') for day in holidays.Pakistan(years=year))
+            except Exception:
+                pass
+        return closed
+
+    def _trading_days_of_year(self, year):
+        days = self._days.get(year)
+        if days is None:
+            all_days = np.arange(np.datetime64(f'{year}-01-01'), np.datetime64(f'{year + 1}-01-01'))
+            weekdays = (all_days.astype('int64') + 3) % 7  # 1970-01-01 was a Thursday
+            open_weekday = np.isin(weekdays, [weekday for weekday, hours in self.session_hours.items() if hours])
+            closed = np.isin(all_days, np.array(sorted(self._holidays(year)), dtype='datetime64[D]'))
+            days = all_days[open_weekday & ~closed]
+            self._days[year] = days
+        return days
+
+    def _bar_offsets(self, weekday, step):
+        """Bar offsets from midnight (ns) for one weekday's sessions"""
+        segments = [
+            np.arange(_minutes(start) * NS_PER_MINUTE, _minutes(end) * NS_PER_MINUTE + 1, step, dtype=np.int64)
+            for start, end in self.session_hours.get(weekday, ())
+        ]
+        return np.concatenate(segments) if segments else np.empty(0, dtype=np.int64)
+
+    def _year_grid(self, year, freq):
+        """(days, day_start, bars, time_of_day) for one year and bar size, built once"""
+        key = (year, freq)
+        grid = self._grids.get(key)
+        if grid is None:
+            with self._lock:
+                grid = self._grids.get(key)
+                if grid is None:
+                    step = pd.Timedelta(freq).value
+                    days = self._trading_days_of_year(year)
+                    weekdays = (days.astype('int64') + 3) % 7
+                    offsets = {weekday: self._bar_offsets(weekday, step) for weekday in np.unique(weekdays)}
+
+                    counts = np.array([len(offsets[weekday]) for weekday in weekdays], dtype=np.int64)
+                    day_start = np.zeros(len(days) + 1, dtype=np.int64)
+                    np.cumsum(counts, out=day_start[1:])
+                    time_of_day = (
+                        np.concatenate([offsets[weekday] for weekday in weekdays])
+                        if len(days) else np.empty(0, dtype=np.int64)
+                    )
+                    bars = np.repeat(days.astype('datetime64[ns]').astype(np.int64), counts) + time_of_day
+
+                    grid = (days, day_start, bars, time_of_day)
+                    self._grids[key] = grid
+        return grid
+
+    def is_trading_day(self, day):
+        """Whether the exchange trades on a date"""
+        day = _to_day(day)
+        days = self._trading_days_of_year(day.astype(object).year)
+        i = np.searchsorted(days, day)
+        return bool(i < len(days) and days[i] == day)
+
+    def trading_days(self, start, end):
+        """
+        Trading days between two dates, inclusive
+
+        Returns:
+            pd.DatetimeIndex: Midnight timestamps of the trading days
+        """
+        start, end = _to_day(start), _to_day(end)
+        parts = []
+        for year in range(start.astype(object).year, end.astype(object).year + 1):
+            days = self._trading_days_of_year(year)
+            parts.append(days[np.searchsorted(days, start):np.searchsorted(days, end, side='right')])
+        days = np.concatenate(parts) if parts else np.empty(0, dtype='datetime64[D]')
+        return pd.DatetimeIndex(days.astype('datetime64[ns]'))
+
+    def next_trading_days(self, start, count, include_start=True):
+        """
+        The next ``count`` trading days from a date
+
+        Args:
+            start (date): First candidate date
+            count (int): Number of trading days
+            include_start (bool): Whether start itself counts when it is a trading day
+
+        Returns:
+            pd.DatetimeIndex: Midnight timestamps of the trading days
+        """
+        day = _to_day(start)
+        if not include_start:
+            day = day + np.timedelta64(1, 'D')
+        found = []
+        year = day.astype(object).year
+        while len(found) < count:
+            days = self._trading_days_of_year(year)
+            found.extend(days[np.searchsorted(days, day):][:count - len(found)])
+            year += 1
+            day = np.datetime64(f'{year}-01-01')
+        return pd.DatetimeIndex(np.array(found, dtype='datetime64[D]').astype('datetime64[ns]'))
+
+    def next_trading_day(self, day, include_start=True):
+        """The first trading day on or after (or strictly after) a date, as a date"""
+        return self.next_trading_days(day, 1, include_start)[0].date()
+
+    def previous_trading_day(self, day, include_start=True):
+        """The last trading day on or before (or strictly before) a date, as a date"""
+        day = _to_day(day)
+        if not include_start:
+            day = day - np.timedelta64(1, 'D')
+        year = day.astype(object).year
+        while True:
+            days = self._trading_days_of_year(year)
+            i = np.searchsorted(days, day, side='right')
+            if i > 0:
+                return days[i - 1].astype(object)
+            year -= 1
+            day = np.datetime64(f'{year}-12-31')
+
+    def grid_array(self, start, end=None, freq='5min', session='full', window=None):
+        """
+        Bar timestamps of every trading session in a date range
+
+        Args:
+            start (date): First date
+            end (date): Last date (inclusive); defaults to start
+            freq (str): Bar size, e.g. '5min', '30min'
+            session (str): 'full', 'morning' or 'afternoon'
+            window (tuple): Explicit (start, end) time of day, 'HH:MM' or time; overrides session
+
+        Returns:
+            np.ndarray: int64 nanosecond timestamps (naive PKT), sorted
+        """
+        start = _to_day(start)
+        end = start if end is None else _to_day(end)
+        window = window if window is not None else SESSION_WINDOWS[session]
+
+        parts = []
+        for year in range(start.astype(object).year, end.astype(object).year + 1):
+            days, day_start, bars, time_of_day = self._year_grid(year, freq)
+            first = day_start[np.searchsorted(days, start)]
+            last = day_start[np.searchsorted(days, end, side='right')]
+            chunk = bars[first:last]
+            if window is not None:
+                lo, hi = _minutes(window[0]) * NS_PER_MINUTE, _minutes(window[1]) * NS_PER_MINUTE
+                tod = time_of_day[first:last]
+                chunk = chunk[(tod >= lo) & (tod <= hi)]
+            parts.append(chunk)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def session_grid(self, start, end=None, freq='5min', session='full', window=None):
+        """
+        Bar timestamps of every trading session in a date range
+
+        Takes the same arguments as grid_array.
+
+        Returns:
+            pd.DatetimeIndex: Naive PKT bar timestamps (empty on non-trading days)
+        """
+        return pd.DatetimeIndex(self.grid_array(start, end, freq, session, window).view('datetime64[ns]'))
+
+    def time_labels(self, weekday=0, freq='5min', session='full', window=None):
+        """
+        'HH:MM' labels of one weekday's bars
+
+        Args:
+            weekday (int): Monday=0 ... Friday=4
+            freq (str): Bar size
+            session (str): 'full', 'morning' or 'afternoon'
+            window (tuple): Explicit (start, end) time of day; overrides session
+
+        Returns:
+            list: Bar labels such as ['09:30', '09:35', ...]
+        """
+        offsets = self._bar_offsets(weekday, pd.Timedelta(freq).value)
+        window = window if window is not None else SESSION_WINDOWS[session]
+        if window is not None:
+            lo, hi = _minutes(window[0]) * NS_PER_MINUTE, _minutes(window[1]) * NS_PER_MINUTE
+            offsets = offsets[(offsets >= lo) & (offsets <= hi)]
+        minutes = offsets // NS_PER_MINUTE
+        return [f"{m // 60:02d}:{m % 60:02d}" for m in minutes]
+
+    def session_bounds(self, day):
+        """
+        Opening and closing time of a trading day
+
+        Returns:
+            tuple: (open, close) as datetime.time, or None when the exchange is closed
+        """
+        if not self.is_trading_day(day):
+            return None
+        hours = self.session_hours[int((_to_day(day).astype('int64') + 3) % 7)]
+        opening, closing = _minutes(hours[0][0]), _minutes(hours[-1][1])
+        return time(opening // 60, opening % 60), time(closing // 60, closing % 60)
+
+
+_default_calendar = None
+
+
+def get_trading_calendar():
+    """Get the process-wide trading calendar"""
+    global _default_calendar
+    if _default_calendar is None:
+        _default_calendar = TradingCalendar()
+    return _default_calendar
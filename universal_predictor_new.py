@@ -13,18 +13,28 @@ import io
 import re
 import pytz
 from simple_file_reader import read_any_file, analyze_dataframe
+from schema_inference import parse_datetime_column
+from monte_carlo import MonteCarloEngine, log_returns
+from simulation import get_simulation_service
 
 class UniversalPredictor:
     """Universal predictor for any uploaded financial data"""
     
+    # Days ahead covered by the short (1-7 days), medium (4 weeks) and long-term (3 months) predictions
+    FAN_HORIZONS = list(range(1, 8)) + [14, 21, 28, 30, 60, 90]
+    # Histories with fewer log returns are simulated with GBM from the given trend and volatility
+    MIN_BOOTSTRAP_RETURNS = 2
+    
     def __init__(self):
-        self.supported_formats = ['.csv', '.xlsx', '.xls']
+        self.supported_formats = ['.csv', '.xlsx', '.xls', '.parquet', '.pq', '.feather', '.arrow']
+        self.monte_carlo = MonteCarloEngine(n_paths=10000, method='bootstrap')
+        self.gbm = MonteCarloEngine(n_paths=10000, method='gbm')
         
     def process_uploaded_file(self, uploaded_file, brand_name="Unknown"):
         """Process uploaded file and extract financial data"""
         try:
             # Use robust file reader
-            df, error_message = read_any_file(uploaded_file)
+            df, error_message = read_any_file(uploaded_file, use_arrow_cache=True)
             
             if df is None:
                 return {'error': error_message}
@@ -149,11 +159,14 @@ class UniversalPredictor:
             date_data = None
             if date_column and date_column in df.columns:
                 try:
-                    date_data = pd.to_datetime(df[date_column], errors='coerce')
+                    date_data = parse_datetime_column(df[date_column])
                     date_data = date_data.dropna()
                 except:
                     date_data = None
             
+            # One Monte Carlo run covers the short, medium and long-term horizons
+            fan = self._simulate_fan(price_data, current_price, brand_name, trend, volatility)
+            
             # Generate predictions
             predictions = {
                 'current_price': current_price,
@@ -176,9 +189,9 @@ class UniversalPredictor:
                 'predictions': {
                     'next_7_days': self._generate_next_7_days_prediction(current_price, trend, volatility, brand_name),
                     'intraday_5min': self._generate_intraday_5min_prediction(current_price, volatility, brand_name),
-                    'short_term': self._generate_short_term_prediction(current_price, trend, volatility, brand_name),
-                    'medium_term': self._generate_medium_term_prediction(current_price, trend, volatility, brand_name),
-                    'long_term': self._generate_long_term_prediction(current_price, trend, volatility, brand_name)
+                    'short_term': self._generate_short_term_prediction(current_price, trend, volatility, brand_name, fan),
+                    'medium_term': self._generate_medium_term_prediction(current_price, trend, volatility, brand_name, fan),
+                    'long_term': self._generate_long_term_prediction(current_price, trend, volatility, brand_name, fan)
                 },
                 'technical_analysis': self._perform_technical_analysis(price_data)
             }
@@ -188,60 +201,72 @@ class UniversalPredictor:
         except Exception as e:
             return {'error': f'Error generating predictions: {str(e)}'}
     
-    def _generate_short_term_prediction(self, current_price, trend, volatility, brand_name):
+    def _simulate_fan(self, price_data, current_price, brand_name, trend=0.0, volatility=0.02):
+        """Monte Carlo price fan over FAN_HORIZONS days from the uploaded history"""
+        # Uploaded files list the most recent price first
+        returns = log_returns(price_data.values[::-1])
+        day = int(datetime.now().strftime('%Y%m%d'))
+        seed = get_simulation_service().seed_sequence(brand_name, day, stream='monte_carlo')
+        if len(returns) >= self.MIN_BOOTSTRAP_RETURNS:
+            fan = self.monte_carlo.simulate(current_price, returns, self.FAN_HORIZONS, seed=seed)
+        else:
+            # Too few returns to resample: GBM with the same daily trend component as next_7_days
+            volatility = volatility if np.isfinite(volatility) and volatility > 0 else 0.02
+            fan = self.gbm.simulate(current_price, returns, self.FAN_HORIZONS, seed=seed,
+                                    drift=np.log1p(trend * 0.1), volatility=volatility)
+        fan['confidence'] = self.monte_carlo.band_confidence(fan)
+        return fan
+    
+    @staticmethod
+    def _fan_point(fan, horizon):
+        """Median, 90% band, confidence and probability of a rise at one horizon"""
+        i = int(np.searchsorted(fan['horizons'], horizon))
+        return {
+            'predicted_price': round(float(fan['quantiles'][0.5][i]), 4),
+            'lower_bound': round(float(fan['quantiles'][0.05][i]), 4),
+            'upper_bound': round(float(fan['quantiles'][0.95][i]), 4),
+            'confidence': round(float(fan['confidence'][i]), 4),
+            'prob_up': round(float(fan['prob_up'][i]), 4)
+        }
+    
+    def _generate_short_term_prediction(self, current_price, trend, volatility, brand_name, fan=None):
         """Generate short-term predictions (1-7 days)"""
+        fan = fan or self._simulate_fan(pd.Series([current_price]), current_price, brand_name, trend, volatility)
         predictions = []
         
         for i in range(1, 8):  # Next 7 days
-            # Simple prediction model with trend and volatility
-            daily_change = trend + np.random.normal(0, volatility) * 0.1
-            predicted_price = current_price * (1 + daily_change)
-            
             predictions.append({
                 'date': (datetime.now() + timedelta(days=i)).strftime('%Y-%m-%d'),
-                'predicted_price': round(predicted_price, 4),
-                'confidence': max(0.5, 1 - abs(daily_change))
+                **self._fan_point(fan, i)
             })
-            
-            current_price = predicted_price
         
         return predictions
     
-    def _generate_medium_term_prediction(self, current_price, trend, volatility, brand_name):
+    def _generate_medium_term_prediction(self, current_price, trend, volatility, brand_name, fan=None):
         """Generate medium-term predictions (1-4 weeks)"""
+        fan = fan or self._simulate_fan(pd.Series([current_price]), current_price, brand_name, trend, volatility)
         predictions = []
         
         for i in range(1, 5):  # Next 4 weeks
-            weekly_change = trend * 7 + np.random.normal(0, volatility) * 0.3
-            predicted_price = current_price * (1 + weekly_change)
-            
             predictions.append({
                 'week': i,
                 'date': (datetime.now() + timedelta(weeks=i)).strftime('%Y-%m-%d'),
-                'predicted_price': round(predicted_price, 4),
-                'confidence': max(0.3, 1 - abs(weekly_change))
+                **self._fan_point(fan, 7 * i)
             })
-            
-            current_price = predicted_price
         
         return predictions
     
-    def _generate_long_term_prediction(self, current_price, trend, volatility, brand_name):
+    def _generate_long_term_prediction(self, current_price, trend, volatility, brand_name, fan=None):
         """Generate long-term predictions (1-3 months)"""
+        fan = fan or self._simulate_fan(pd.Series([current_price]), current_price, brand_name, trend, volatility)
         predictions = []
         
         for i in range(1, 4):  # Next 3 months
-            monthly_change = trend * 30 + np.random.normal(0, volatility) * 0.5
-            predicted_price = current_price * (1 + monthly_change)
-            
             predictions.append({
                 'month': i,
                 'date': (datetime.now() + timedelta(days=30*i)).strftime('%Y-%m-%d'),
-                'predicted_price': round(predicted_price, 4),
-                'confidence': max(0.2, 1 - abs(monthly_change))
+                **self._fan_point(fan, 30 * i)
             })
-            
-            current_price = predicted_price
         
         return predictions
     
@@ -2,6 +2,23 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from indicators import get_indicator_cache
+from trading_calendar import get_trading_calendar
+
+# Columns calculate_technical_indicators adds to a price frame
+INDICATOR_COLUMNS = (
+    'SMA_5', 'SMA_10', 'SMA_20', 'EMA_5', 'EMA_10', 'RSI',
+    'MACD', 'MACD_Signal', 'MACD_Histogram', 'BB_Upper', 'BB_Lower', 'BB_Middle'
+)
+
+# validate_data_quality: rows per chunk of a column sweep, frame size from which columns are
+# swept in parallel, and robust deviations (MADs) of a log return that count as a spike
+VALIDATION_CHUNK_ROWS = 1 << 20
+PARALLEL_VALIDATION_ROWS = 500_000
+SPIKE_MADS = 10.0
+NS_PER_DAY = 24 * 60 * 60 * 10 ** 9
 
 def format_currency(amount, currency_symbol="PKR"):
     """
@@ -81,39 +98,12 @@ def calculate_technical_indicators(data):
         return data
     
     try:
+        # Overlays come from the shared indicator cache, so charts and panels
+        # drawing the same history reuse one computation
+        indicators = get_indicator_cache().get(data)
         df = data.copy()
-        
-        # Simple Moving Averages
-        df['SMA_5'] = df['close'].rolling(window=5).mean()
-        df['SMA_10'] = df['close'].rolling(window=10).mean()
-        df['SMA_20'] = df['close'].rolling(window=20).mean()
-        
-        # Exponential Moving Averages
-        df['EMA_5'] = df['close'].ewm(span=5).mean()
-        df['EMA_10'] = df['close'].ewm(span=10).mean()
-        
-        # RSI (Relative Strength Index)
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # MACD (Moving Average Convergence Divergence)
-        ema12 = df['close'].ewm(span=12).mean()
-        ema26 = df['close'].ewm(span=26).mean()
-        df['MACD'] = ema12 - ema26
-        df['MACD_Signal'] = df['MACD'].ewm(span=9).mean()
-        df['MACD_Histogram'] = df['MACD'] - df['MACD_Signal']
-        
-        # Bollinger Bands
-        bb_period = 20
-        bb_std = 2
-        bb_ma = df['close'].rolling(window=bb_period).mean()
-        bb_std_dev = df['close'].rolling(window=bb_period).std()
-        df['BB_Upper'] = bb_ma + (bb_std_dev * bb_std)
-        df['BB_Lower'] = bb_ma - (bb_std_dev * bb_std)
-        df['BB_Middle'] = bb_ma
+        for column in INDICATOR_COLUMNS:
+            df[column] = indicators[column]
         
         return df
         
@@ -178,15 +168,117 @@ def export_to_csv(data, filename_prefix="stock_data"):
     except Exception:
         return ""
 
-def validate_data_quality(data):
+def _column_sweep(values, check_positive):
+    """Null, non-positive and negative counts of one column, one chunk at a time"""
+    stats = {'nulls': 0, 'non_positive': 0, 'negative': 0}
+    numeric = values.dtype.kind in 'fiu'
+    for start in range(0, len(values), VALIDATION_CHUNK_ROWS):
+        chunk = values[start:start + VALIDATION_CHUNK_ROWS]
+        if not numeric:
+            stats['nulls'] += int(pd.isna(chunk).sum())
+            continue
+        if chunk.dtype.kind == 'f':
+            stats['nulls'] += int(np.count_nonzero(np.isnan(chunk)))
+        if check_positive:
+            stats['non_positive'] += int(np.count_nonzero(chunk <= 0))
+        stats['negative'] += int(np.count_nonzero(chunk < 0))
+    return stats
+
+def _high_low_sweep(high, low):
+    """Rows whose high is below their low"""
+    count = 0
+    for start in range(0, len(high), VALIDATION_CHUNK_ROWS):
+        count += int(np.count_nonzero(high[start:start + VALIDATION_CHUNK_ROWS] < low[start:start + VALIDATION_CHUNK_ROWS]))
+    return count
+
+def _date_sweep(dates):
+    """Nulls, duplicates, range and distinct days of a date column, one chunk at a time"""
+    stats = {'nulls': 0, 'duplicates': 0, 'first': None, 'last': None, 'days': np.empty(0, dtype=np.int64)}
+    ordered, previous = True, None
+    for start in range(0, len(dates), VALIDATION_CHUNK_ROWS):
+        chunk = pd.DatetimeIndex(pd.to_datetime(dates.iloc[start:start + VALIDATION_CHUNK_ROWS], errors='coerce'))
+        if chunk.tz is not None:
+            chunk = chunk.tz_convert('Asia/Karachi').tz_localize(None)
+        missing = chunk.isna()
+        stats['nulls'] += int(missing.sum())
+        ts = chunk.values[~missing].astype('datetime64[ns]').astype(np.int64)
+        if len(ts) == 0:
+            continue
+
+        stats['first'] = ts.min() if stats['first'] is None else min(stats['first'], ts.min())
+        stats['last'] = ts.max() if stats['last'] is None else max(stats['last'], ts.max())
+
+        # Duplicates are adjacent in sorted (or reverse-sorted) data; anything else is checked at the end
+        steps = np.diff(ts if previous is None else np.concatenate(([previous], ts)))
+        sorted_chunk = np.all(steps >= 0) or np.all(steps <= 0)
+        if ordered and sorted_chunk:
+            stats['duplicates'] += int(np.count_nonzero(steps == 0))
+        else:
+            ordered = False
+        previous = ts[-1]
+
+        days = ts // NS_PER_DAY
+        if sorted_chunk:
+            days = days[np.concatenate(([True], days[1:] != days[:-1]))]
+        stats['days'] = np.union1d(stats['days'], days)
+
+    if not ordered:
+        stats['duplicates'] = int(dates.duplicated().sum())
+    return stats
+
+def _spike_sweep(close):
+    """
+    Positions of price spikes: log returns beyond SPIKE_MADS robust deviations of their chunk
+
+    A single bad print shows up as a jump followed by the opposite jump back; the
+    pair is reported once, at the outlier row.
+    """
+    positions, signs = [], []
+    previous = np.nan
+    for start in range(0, len(close), VALIDATION_CHUNK_ROWS):
+        chunk = close[start:start + VALIDATION_CHUNK_ROWS].astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(np.log(np.concatenate(([previous], chunk))))
+        previous = chunk[-1]
+        moves = np.abs(returns)
+        valid = np.isfinite(moves)
+        if valid.sum() < 20:
+            continue
+        # Returns are centred close to zero, so the median absolute return is their MAD
+        scale = 1.4826 * np.median(moves[valid])
+        if scale > 0:
+            with np.errstate(invalid='ignore'):
+                flagged = np.flatnonzero(moves > SPIKE_MADS * scale)
+            positions.append(start + flagged)
+            signs.append(np.sign(returns[flagged]))
+    if not positions:
+        return np.empty(0, dtype=np.int64)
+
+    positions, signs = np.concatenate(positions), np.concatenate(signs)
+    keep = np.ones(len(positions), dtype=bool)
+    for i in range(1, len(positions)):
+        # The reversal right after a kept jump is the same bad print (also across chunk edges)
+        if keep[i - 1] and positions[i] == positions[i - 1] + 1 and signs[i] == -signs[i - 1]:
+            keep[i] = False
+    return positions[keep]
+
+def validate_data_quality(data, calendar=None, max_workers=None):
     """
     Validate data quality and return quality metrics
     
+    Every column is swept once, in fixed-size chunks, so memory stays constant
+    as uploads grow; on large frames the per-column sweeps run in parallel
+    threads (NumPy releases the GIL). Completeness is the share of PSX trading
+    days between the first and last date that have data.
+    
     Args:
         data (pd.DataFrame): Stock data to validate
+        calendar (TradingCalendar): Calendar for gap detection; the shared PSX calendar when None
+        max_workers (int): Threads for large frames; one per column (up to the CPU count) when None
         
     Returns:
-        dict: Data quality metrics
+        dict: Data quality metrics (status, issues, data_points, completeness, null_percentage,
+            null_counts, missing_trading_days, gap_dates, spikes, spike_dates)
     """
     if data is None or data.empty:
         return {'status': 'failed', 'issues': ['No data available']}
@@ -200,36 +292,83 @@ def validate_data_quality(data):
         if missing_columns:
             issues.append(f"Missing columns: {missing_columns}")
         
+        # One sweep per column (plus the cross-column high/low check and the close spike scan)
+        price_columns = ['open', 'high', 'low', 'close']
+        tasks = {
+            col: (_column_sweep, data[col].to_numpy(), col in price_columns)
+            for col in data.columns if col != 'date'
+        }
+        if 'date' in data.columns:
+            tasks['date'] = (_date_sweep, data['date'])
+        if 'high' in data.columns and 'low' in data.columns:
+            tasks[('high', 'low')] = (_high_low_sweep, data['high'].to_numpy(), data['low'].to_numpy())
+        if 'close' in data.columns and data['close'].dtype.kind in 'fiu':
+            tasks[('spikes',)] = (_spike_sweep, data['close'].to_numpy())
+        
+        workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+        if len(data) >= PARALLEL_VALIDATION_ROWS and workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {name: executor.submit(*task) for name, task in tasks.items()}
+                results = {name: future.result() for name, future in futures.items()}
+        else:
+            results = {name: task[0](*task[1:]) for name, task in tasks.items()}
+        
         # Check for null values
-        null_counts = data.isnull().sum()
-        if null_counts.sum() > 0:
-            issues.append(f"Null values found: {null_counts.to_dict()}")
+        null_counts = {col: results[col]['nulls'] for col in data.columns}
+        if sum(null_counts.values()) > 0:
+            issues.append(f"Null values found: {null_counts}")
         
         # Check for negative prices
-        price_columns = ['open', 'high', 'low', 'close']
         for col in price_columns:
-            if col in data.columns and (data[col] <= 0).any():
+            if col in results and results[col]['non_positive']:
                 issues.append(f"Non-positive values in {col}")
+        if 'volume' in results and results['volume']['negative']:
+            issues.append("Negative values in volume")
         
         # Check price consistency (high >= low, etc.)
-        if 'high' in data.columns and 'low' in data.columns:
-            if (data['high'] < data['low']).any():
-                issues.append("High prices lower than low prices")
+        if results.get(('high', 'low')):
+            issues.append("High prices lower than low prices")
         
-        # Check for duplicate dates
-        if 'date' in data.columns:
-            if data['date'].duplicated().any():
+        null_percentage = sum(null_counts.values()) / (len(data) * len(data.columns)) * 100
+        data_completeness = 100 - null_percentage
+        missing_days = np.empty(0, dtype='datetime64[D]')
+        
+        # Check for duplicate dates and for trading days without data
+        if 'date' in results:
+            date_stats = results['date']
+            if date_stats['duplicates']:
                 issues.append("Duplicate dates found")
+            if date_stats['first'] is not None:
+                calendar = calendar or get_trading_calendar()
+                expected = calendar.trading_days(pd.Timestamp(date_stats['first']), pd.Timestamp(date_stats['last']))
+                expected_days = expected.values.astype('datetime64[ns]').astype(np.int64) // NS_PER_DAY
+                missing = np.setdiff1d(expected_days, date_stats['days'])
+                missing_days = missing.astype('datetime64[D]')
+                if len(expected_days):
+                    data_completeness = (1 - len(missing) / len(expected_days)) * 100
+                if len(missing):
+                    issues.append(f"{len(missing)} PSX trading days without data")
         
-        # Data completeness
-        data_completeness = len(data) / 30 * 100  # Assuming 30 days is complete
+        # Check for price spikes
+        spike_positions = results.get(('spikes',), np.empty(0, dtype=np.int64))
+        if len(spike_positions):
+            issues.append(f"{len(spike_positions)} price spikes detected")
+        if 'date' in data.columns:
+            spike_dates = [str(value) for value in data['date'].iloc[spike_positions[:10]]]
+        else:
+            spike_dates = [int(position) for position in spike_positions[:10]]
         
         quality_metrics = {
             'status': 'passed' if not issues else 'warning',
             'issues': issues,
             'data_points': len(data),
             'completeness': min(data_completeness, 100),
-            'null_percentage': (data.isnull().sum().sum() / (len(data) * len(data.columns))) * 100
+            'null_percentage': null_percentage,
+            'null_counts': null_counts,
+            'missing_trading_days': len(missing_days),
+            'gap_dates': [str(day) for day in missing_days[:10]],
+            'spikes': len(spike_positions),
+            'spike_dates': spike_dates
         }
         
         return quality_metrics
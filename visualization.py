@@ -3,11 +3,22 @@ from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from downsampling import decimate
+from indicators import get_indicator_cache
 
 class ChartVisualizer:
     """Class to handle chart visualizations for stock data"""
     
-    def __init__(self):
+    def __init__(self, width_px=1200, downsample='lttb', gl_threshold=2000):
+        """
+        Args:
+            width_px (int): Plot width in pixels; long traces are decimated to about one point per pixel
+            downsample (str): 'lttb', 'minmax', or None to send every point
+            gl_threshold (int): Traces with more points than this are drawn with WebGL (Scattergl)
+        """
+        self.width_px = width_px
+        self.downsample = downsample
+        self.gl_threshold = gl_threshold
         self.colors = {
             'primary': '#1f77b4',
             'secondary': '#ff7f0e',
@@ -19,18 +30,41 @@ class ChartVisualizer:
             'dark': '#343a40'
         }
     
-    def create_price_chart(self, data, title="Stock Price Chart"):
+    def _points_index(self, x, y, x_range=None, method=None):
+        """Indices of the points of one trace to send to the browser"""
+        method = method or self.downsample
+        if method is None:
+            n_out, method = len(y), 'lttb'
+        else:
+            # LTTB keeps one point per pixel; min/max keeps a low and a high per pixel
+            n_out = self.width_px * (2 if method == 'minmax' else 1)
+        return decimate(x, y, n_out, method, x_range)
+    
+    def _scatter(self, x, y, x_range=None, method=None, **kwargs):
+        """Line trace decimated to the plot width, switching to Scattergl above gl_threshold points"""
+        x, y = np.asarray(x), np.asarray(y, dtype=float)
+        index = self._points_index(x, y, x_range, method)
+        trace = go.Scattergl if len(index) > self.gl_threshold else go.Scatter
+        return trace(x=x[index], y=y[index], **kwargs)
+    
+    def create_price_chart(self, data, title="Stock Price Chart", x_range=None, indicators=None):
         """
         Create an interactive price chart with OHLC data
         
         Args:
             data (pd.DataFrame): Stock data with OHLC values
             title (str): Chart title
+            x_range (tuple): Zoomed (start, end) date range, drawn at full resolution
+            indicators (pd.DataFrame): Precomputed overlays (indicators.compute_indicators);
+                taken from the shared indicator cache when omitted
             
         Returns:
             plotly.graph_objects.Figure: Interactive chart
         """
         
+        if indicators is None:
+            indicators = get_indicator_cache().get(data)
+        
         fig = make_subplots(
             rows=2, cols=1,
             shared_xaxes=True,
@@ -41,9 +75,10 @@ class ChartVisualizer:
         
         # Linear price chart (replacing candlestick with linear line)
         fig.add_trace(
-            go.Scatter(
-                x=data['date'],
-                y=data['close'],
+            self._scatter(
+                data['date'],
+                data['close'],
+                x_range,
                 mode='lines',
                 name="Price",
                 line=dict(color=self.colors['primary'], width=2),
@@ -54,11 +89,11 @@ class ChartVisualizer:
         
         # Add moving averages
         if len(data) >= 5:
-            ma5 = data['close'].rolling(window=5).mean()
             fig.add_trace(
-                go.Scatter(
-                    x=data['date'],
-                    y=ma5,
+                self._scatter(
+                    data['date'],
+                    indicators['SMA_5'],
+                    x_range,
                     mode='lines',
                     name='MA5',
                     line=dict(color=self.colors['primary'], width=1),
@@ -68,11 +103,11 @@ class ChartVisualizer:
             )
         
         if len(data) >= 10:
-            ma10 = data['close'].rolling(window=10).mean()
             fig.add_trace(
-                go.Scatter(
-                    x=data['date'],
-                    y=ma10,
+                self._scatter(
+                    data['date'],
+                    indicators['SMA_10'],
+                    x_range,
                     mode='lines',
                     name='MA10',
                     line=dict(color=self.colors['secondary'], width=1),
@@ -81,16 +116,15 @@ class ChartVisualizer:
                 row=1, col=1
             )
         
-        # Volume bars
-        colors = ['red' if close < open else 'green' 
-                 for close, open in zip(data['close'], data['open'])]
+        # Volume bars (min/max decimation keeps volume spikes visible)
+        bars = self._points_index(data['date'], data['volume'], x_range, 'minmax' if self.downsample else None)
         
         fig.add_trace(
             go.Bar(
-                x=data['date'],
-                y=data['volume'],
+                x=data['date'].to_numpy()[bars],
+                y=data['volume'].to_numpy()[bars],
                 name="Volume",
-                marker_color=colors,
+                marker_color=indicators['volume_color'].to_numpy()[bars],
                 opacity=0.6
             ),
             row=2, col=1
@@ -122,7 +156,7 @@ class ChartVisualizer:
         
         return fig
     
-    def create_forecast_chart(self, historical_data, forecast_data, title="Stock Price Forecast"):
+    def create_forecast_chart(self, historical_data, forecast_data, title="Stock Price Forecast", x_range=None):
         """
         Create forecast visualization with confidence intervals
         
@@ -130,6 +164,7 @@ class ChartVisualizer:
             historical_data (pd.DataFrame): Historical stock data
             forecast_data (pd.DataFrame): Forecast predictions
             title (str): Chart title
+            x_range (tuple): Zoomed (start, end) date range, drawn at full resolution
             
         Returns:
             plotly.graph_objects.Figure: Interactive forecast chart
@@ -139,9 +174,10 @@ class ChartVisualizer:
         
         # Historical prices - LINEAR STYLE
         fig.add_trace(
-            go.Scatter(
-                x=historical_data['date'],
-                y=historical_data['close'],
+            self._scatter(
+                historical_data['date'],
+                historical_data['close'],
+                x_range,
                 mode='lines+markers',
                 name='Historical Prices',
                 line=dict(color='#1f77b4', width=3),
@@ -151,9 +187,10 @@ class ChartVisualizer:
         
         # Forecast line - LINEAR STYLE
         fig.add_trace(
-            go.Scatter(
-                x=forecast_data['ds'],
-                y=forecast_data['yhat'],
+            self._scatter(
+                forecast_data['ds'],
+                forecast_data['yhat'],
+                x_range,
                 mode='lines+markers',
                 name='Linear Forecast',
                 line=dict(color='#ff7f0e', width=3),
@@ -163,9 +200,10 @@ class ChartVisualizer:
         
         # Confidence intervals
         fig.add_trace(
-            go.Scatter(
-                x=forecast_data['ds'],
-                y=forecast_data['yhat_upper'],
+            self._scatter(
+                forecast_data['ds'],
+                forecast_data['yhat_upper'],
+                x_range,
                 mode='lines',
                 line=dict(width=0),
                 showlegend=False,
@@ -174,9 +212,10 @@ class ChartVisualizer:
         )
         
         fig.add_trace(
-            go.Scatter(
-                x=forecast_data['ds'],
-                y=forecast_data['yhat_lower'],
+            self._scatter(
+                forecast_data['ds'],
+                forecast_data['yhat_lower'],
+                x_range,
                 mode='lines',
                 line=dict(width=0),
                 fillcolor='rgba(214, 39, 40, 0.2)',
@@ -238,13 +277,14 @@ class ChartVisualizer:
         
         return fig
     
-    def create_comparison_chart(self, companies_data, title="Companies Comparison"):
+    def create_comparison_chart(self, companies_data, title="Companies Comparison", x_range=None):
         """
         Create comparison chart for multiple companies
         
         Args:
             companies_data (dict): Dictionary of company data
             title (str): Chart title
+            x_range (tuple): Zoomed (start, end) date range, drawn at full resolution
             
         Returns:
             plotly.graph_objects.Figure: Interactive comparison chart
@@ -261,9 +301,10 @@ class ChartVisualizer:
                 normalized_prices = (data['close'] / data['close'].iloc[0] - 1) * 100
                 
                 fig.add_trace(
-                    go.Scatter(
-                        x=data['date'],
-                        y=normalized_prices,
+                    self._scatter(
+                        data['date'],
+                        normalized_prices,
+                        x_range,
                         mode='lines',
                         name=company,
                         line=dict(color=colors[i % len(colors)], width=2)
@@ -292,6 +333,95 @@ class ChartVisualizer:
         
         return fig
     
+    def create_market_map(self, snapshot, title="KSE-100 Market Map", size_column='market_cap',
+                          color_column='change_pct', sector_column='sector'):
+        """
+        Treemap of every constituent, grouped by sector, as a single trace
+        
+        Tile areas, sector totals and value-weighted sector changes are computed
+        in one vectorized pass over the columnar snapshot.
+        
+        Args:
+            snapshot (pd.DataFrame): One row per symbol with a symbol column (or index),
+                change and size columns, and optionally a sector column
+            title (str): Chart title
+            size_column (str): Tile size; when missing, traded value (price x volume) is used
+            color_column (str): Percentage change used for the tile color
+            sector_column (str): Grouping column; symbols without one go to 'Other'
+            
+        Returns:
+            plotly.graph_objects.Figure: Interactive treemap
+        """
+        
+        symbols = (snapshot['symbol'] if 'symbol' in snapshot else snapshot.index.to_series()).astype(str).to_numpy()
+        if size_column in snapshot:
+            sizes = snapshot[size_column].to_numpy(dtype=float)
+        else:
+            sizes = snapshot['current_price'].to_numpy(dtype=float) * snapshot['volume'].to_numpy(dtype=float)
+        sizes = np.clip(np.nan_to_num(sizes), 0, None)
+        if not sizes.any():
+            sizes = np.ones(len(symbols))
+        changes = np.nan_to_num(snapshot[color_column].to_numpy(dtype=float))
+        sectors = (
+            snapshot[sector_column].fillna('Other').astype(str).to_numpy()
+            if sector_column in snapshot else np.full(len(symbols), 'Other')
+        )
+        
+        # Sector and market totals; colors are size-weighted average changes
+        codes, sector_names = pd.factorize(sectors)
+        sector_names = sector_names.astype(str)
+        sector_sizes = np.bincount(codes, weights=sizes, minlength=len(sector_names))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sector_changes = np.nan_to_num(
+                np.bincount(codes, weights=sizes * changes, minlength=len(sector_names)) / sector_sizes
+            )
+        total = sizes.sum()
+        market_change = (sizes * changes).sum() / total if total else 0.0
+        
+        root = 'KSE-100'
+        sector_ids = np.char.add('sector:', sector_names)
+        ids = np.concatenate(([root], sector_ids, symbols))
+        labels = np.concatenate(([root], sector_names, symbols))
+        parents = np.concatenate(([''], np.full(len(sector_names), root), sector_ids[codes]))
+        # Branch nodes carry no own value; with 'remainder' their area is the sum of their
+        # tiles, which avoids float round-off making children exceed a 'total' parent
+        values = np.concatenate((np.zeros(1 + len(sector_names)), sizes))
+        colors = np.concatenate(([market_change], sector_changes, changes))
+        
+        limit = max(float(np.abs(changes).max()) if len(changes) else 0.0, 0.5)
+        fig = go.Figure(
+            go.Treemap(
+                ids=ids,
+                labels=labels,
+                parents=parents,
+                values=values,
+                branchvalues='remainder',
+                customdata=colors,
+                marker=dict(
+                    colors=colors,
+                    colorscale='RdYlGn',
+                    cmin=-limit,
+                    cmid=0,
+                    cmax=limit,
+                    colorbar=dict(title='Change %')
+                ),
+                texttemplate='<b>%{label}</b><br>%{customdata:+.2f}%',
+                hovertemplate='<b>%{label}</b><br>Change: %{customdata:+.2f}%<br>Share: %{percentRoot:.1%}<extra></extra>'
+            )
+        )
+        
+        fig.update_layout(
+            title=dict(
+                text=title,
+                font=dict(size=20),
+                x=0.5
+            ),
+            height=600,
+            margin=dict(t=60, l=10, r=10, b=10)
+        )
+        
+        return fig
+    
     def create_performance_metrics_chart(self, metrics_data, title="Performance Metrics"):
         """
         Create performance metrics visualization